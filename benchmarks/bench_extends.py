@@ -0,0 +1,86 @@
+"""
+Benchmark for extends expansion with and without structural sharing.
+
+Builds a synthetic configuration of 5,000 jobs whose templates form a
+6-level extends hierarchy, then expands it with expand_all_jobs() in the
+default deep-copy mode and in shared mode, reporting wall time, peak traced
+memory and the memory retained by the result.
+
+Usage:
+    python benchmarks/bench_extends.py [--jobs N] [--depth D] [--roots R]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from cimulator.job_expander import expand_all_jobs
+
+def generate_extends_hierarchy(num_jobs: int = 5000, depth: int = 6, roots: int = 4) -> Dict[str, Any]:
+    """
+    Generate job definitions with a template hierarchy `depth` levels deep.
+
+    Each level has `roots` templates; every template at level N extends one
+    template of level N-1, and every job extends a template of the last level.
+    """
+    all_jobs: Dict[str, Any] = {}
+    for level in range(depth):
+        for root in range(roots):
+            name = f".base-{level}-{root}"
+            template: Dict[str, Any] = {
+                "variables": {f"LEVEL_{level}_VAR": f"value-{level}-{root}", "SHARED": f"level-{level}"},
+                "script": [f"echo level {level} step {step}" for step in range(20)],
+                "artifacts": {"paths": [f"build/{level}/{root}/"], "expire_in": "1 day"},
+                "cache": {"key": f"cache-{level}", "paths": [".cache/"]},
+                "tags": [f"runner-{root}"],
+            }
+            if level > 0:
+                template["extends"] = f".base-{level - 1}-{root}"
+            all_jobs[name] = template
+
+    for index in range(num_jobs):
+        all_jobs[f"job-{index}"] = {
+            "extends": f".base-{depth - 1}-{index % roots}",
+            "variables": {"JOB_INDEX": str(index)},
+            "stage": "test",
+        }
+    return all_jobs
+
+def measure(all_jobs: Dict[str, Any], shared: bool) -> Dict[str, float]:
+    """Expand all jobs once and return time and memory measurements."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    expanded = expand_all_jobs(all_jobs, shared=shared)
+    elapsed = time.perf_counter() - start
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(expanded) == len(all_jobs)
+    return {
+        "seconds": elapsed,
+        "peak_mb": (peak - before) / 1024 / 1024,
+        "retained_mb": (after - before) / 1024 / 1024,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark extends expansion.")
+    parser.add_argument("--jobs", type=int, default=5000, help="Number of concrete jobs (default: 5000)")
+    parser.add_argument("--depth", type=int, default=6, help="Depth of the extends hierarchy (default: 6)")
+    parser.add_argument("--roots", type=int, default=4, help="Templates per level (default: 4)")
+    args = parser.parse_args()
+
+    all_jobs = generate_extends_hierarchy(args.jobs, args.depth, args.roots)
+    print(f"{len(all_jobs)} job definitions, extends depth {args.depth}")
+
+    results = {mode: measure(all_jobs, shared) for mode, shared in (("deepcopy", False), ("shared", True))}
+    print(f"{'mode':<10}{'time (s)':>12}{'peak (MB)':>12}{'retained (MB)':>15}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['seconds']:>12.3f}{result['peak_mb']:>12.1f}{result['retained_mb']:>15.1f}")
+    print(f"speedup: {results['deepcopy']['seconds'] / results['shared']['seconds']:.1f}x, "
+          f"retained memory: {results['shared']['retained_mb'] / results['deepcopy']['retained_mb']:.1%} of deepcopy")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for plan mode against a full simulation.
+
+Builds a synthetic configuration with the extends hierarchy of
+bench_extends.py, gives the jobs rules and needs, then measures:
+  - simulate: simulate_pipeline() with every summary section,
+  - sections: simulate_pipeline() restricted to jobs_list and dependency_errors,
+  - plan: plan_pipeline(), which only reads rules, variables and needs,
+checking that all three agree on which jobs run and on the dependency errors.
+
+Usage:
+    python benchmarks/bench_plan.py [--jobs N] [--depth D] [--roots R] [--repeat R]
+"""
+
+import argparse
+import gc
+import time
+from typing import Any, Callable, Dict
+
+from bench_extends import generate_extends_hierarchy
+
+from cimulator.plan import plan_pipeline
+from cimulator.simulation_engine import simulate_pipeline
+
+WORKFLOW = {"rules": [{"if": '$CI_PIPELINE_SOURCE == "merge_request_event"'}, {"if": "$CI_COMMIT_BRANCH"}]}
+
+GLOBAL_VARIABLES = {
+    "CI_PIPELINE_SOURCE": "merge_request_event",
+    "CI_COMMIT_BRANCH": "feature/plan",
+    "CI_COMMIT_REF_NAME": "feature/plan",
+}
+
+def generate_configuration(num_jobs: int, depth: int, roots: int) -> Dict[str, Any]:
+    """Add rules and needs to the jobs of generate_extends_hierarchy()."""
+    all_jobs = generate_extends_hierarchy(num_jobs, depth, roots)
+    for index in range(num_jobs):
+        job = all_jobs[f"job-{index}"]
+        job["rules"] = [
+            {"if": f'$CI_COMMIT_BRANCH =~ /^release\\/{index % 7}/', "when": "never"},
+            {"if": '$CI_PIPELINE_SOURCE == "merge_request_event" && $JOB_INDEX =~ /[02468]$/',
+             "variables": {"RULE_VAR": "merge-request"}},
+            {"when": "manual"} if index % 3 else {"if": "$SCHEDULED", "when": "always"},
+        ]
+        if index:
+            job["needs"] = [f"job-{index - 1}"]
+    return all_jobs
+
+def measure(label: str, run: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Run `run` `repeat` times and return the best time and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return {"label": label, "seconds": best, "result": result}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark plan mode against a full simulation.")
+    parser.add_argument("--jobs", type=int, default=5000, help="Number of concrete jobs (default: 5000)")
+    parser.add_argument("--depth", type=int, default=6, help="Depth of the extends hierarchy (default: 6)")
+    parser.add_argument("--roots", type=int, default=4, help="Templates per level (default: 4)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    all_jobs = generate_configuration(args.jobs, args.depth, args.roots)
+    print(f"{len(all_jobs)} job definitions, extends depth {args.depth}")
+
+    runs = [
+        measure("simulate", lambda: simulate_pipeline(all_jobs, WORKFLOW, GLOBAL_VARIABLES), args.repeat),
+        measure("sections", lambda: simulate_pipeline(all_jobs, WORKFLOW, GLOBAL_VARIABLES,
+                                                      sections=["jobs_list", "dependency_errors"]), args.repeat),
+        measure("plan", lambda: plan_pipeline(all_jobs, WORKFLOW, GLOBAL_VARIABLES).to_summary(), args.repeat),
+    ]
+
+    print(f"{'mode':<10}{'time (s)':>12}{'speedup':>10}")
+    baseline = runs[0]["seconds"]
+    for run in runs:
+        print(f"{run['label']:<10}{run['seconds']:>12.3f}{baseline / run['seconds']:>9.1f}x")
+
+    reference = runs[0]["result"]
+    identical = all(
+        run["result"]["jobs_list"] == reference["jobs_list"]
+        and run["result"]["dependency_errors"] == reference["dependency_errors"]
+        for run in runs
+    )
+    print(f"{len(reference['jobs_list'])} jobs run; identical run sets and dependency errors: {identical}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark for the YAML backends of GitLabCILoader.
+
+Scales up the examples/complete tree by concatenating renamed copies of its
+files into one large document, then parses it with the pure-Python
+SafeLoader and with the libyaml-based CSafeLoader (when PyYAML was built with
+it), checking that both produce the same document.
+
+Usage:
+    python benchmarks/bench_yaml_loader.py [--copies N] [--repeat R]
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import yaml
+
+from cimulator.loader import GitLabCILoader, ReferenceTag, YAML_BACKEND, reference_constructor
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "complete")
+
+RESERVED_KEYS = {"include", "workflow", "variables", "stages", "default"}
+
+_TOP_LEVEL_KEY_RE = re.compile(r'^([^\s#][^:]*):', re.MULTILINE)
+
+class PythonGitLabCILoader(yaml.SafeLoader):
+    """GitLabCILoader on top of the pure-Python SafeLoader."""
+
+PythonGitLabCILoader.add_constructor('!reference', reference_constructor)
+
+def generate_scaled_document(copies: int) -> str:
+    """
+    Concatenate `copies` copies of the example files, with job names made unique.
+    """
+    sources = []
+    for name in sorted(os.listdir(EXAMPLE_DIR)):
+        if name.endswith(".yml") and name != "ci-config.yml":
+            with open(os.path.join(EXAMPLE_DIR, name)) as f:
+                content = f.read()
+            # Keep the reserved sections only once, in the root file.
+            if name != ".gitlab-ci.yml":
+                sources.append(content)
+
+    parts: List[str] = []
+    with open(os.path.join(EXAMPLE_DIR, ".gitlab-ci.yml")) as f:
+        parts.append(re.sub(r'^include:\n(?:[ -].*\n)*', '', f.read(), flags=re.MULTILINE))
+    for copy in range(copies):
+        for content in sources:
+            parts.append(_TOP_LEVEL_KEY_RE.sub(
+                lambda match: match.group(0) if match.group(1) in RESERVED_KEYS else f"{match.group(1)}-{copy}:",
+                content,
+            ))
+    return "\n".join(parts)
+
+def normalize(value: Any) -> Any:
+    """Make documents comparable by replacing ReferenceTag objects with their paths."""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, ReferenceTag):
+        return ("!reference", tuple(value.path_components))
+    return value
+
+def measure(path: str, loader: Any, repeat: int) -> Dict[str, Any]:
+    """Parse the file `repeat` times and return the best time and the document."""
+    best = float("inf")
+    document = None
+    for _ in range(repeat):
+        with open(path, 'rb') as f:
+            start = time.perf_counter()
+            document = yaml.load(f, Loader=loader)
+            best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "document": document}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the YAML backends of GitLabCILoader.")
+    parser.add_argument("--copies", type=int, default=200, help="Copies of the example files (default: 200)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, ".gitlab-ci.yml")
+        with open(path, 'w') as f:
+            f.write(generate_scaled_document(args.copies))
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        results = {"python": measure(path, PythonGitLabCILoader, args.repeat)}
+        if YAML_BACKEND == "libyaml":
+            results["libyaml"] = measure(path, GitLabCILoader, args.repeat)
+
+    jobs = len(results["python"]["document"])
+    print(f"{size_mb:.1f} MB document, {jobs} top-level keys; GitLabCILoader backend: {YAML_BACKEND}")
+    print(f"{'backend':<10}{'time (s)':>12}{'MB/s':>10}")
+    for backend, result in results.items():
+        print(f"{backend:<10}{result['seconds']:>12.3f}{size_mb / result['seconds']:>10.1f}")
+
+    if "libyaml" in results:
+        identical = normalize(results["python"]["document"]) == normalize(results["libyaml"]["document"])
+        print(f"speedup: {results['python']['seconds'] / results['libyaml']['seconds']:.1f}x, "
+              f"identical documents: {identical}")
+    else:
+        print("PyYAML was built without libyaml; only the pure-Python backend is available.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Synthetic benchmark suite for cimulator.
+
+Generates GitLab CI trees of a chosen shape (jobs, include files, extends
+depth, rules per job, variable nesting depth and !reference density) and
+measures the time and peak memory of each phase of a simulation, so that
+performance changes can be compared against a stored baseline.
+
+Usage:
+    python -m benchmarks.synthetic --help
+"""
+
+from benchmarks.synthetic.generators import PIPELINE_DEFAULTS, generate_pipeline
+from benchmarks.synthetic.runner import PHASES, SCENARIOS, compare_results, run_scenario
@@ -0,0 +1,173 @@
+"""
+Generators of synthetic GitLab CI trees.
+
+A generated tree has a root .gitlab-ci.yml (stages, nested global variables,
+workflow rules, snippets for !reference tags and the list of includes) and
+include files holding the template hierarchy and the jobs, plus a simulation
+configuration with one profile per kind of pipeline. The same parameters and
+seed always produce the same files.
+"""
+
+import os
+import random
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+# Default shape of a generated pipeline.
+PIPELINE_DEFAULTS: Dict[str, Any] = {
+    "jobs": 1000,
+    "includes": 10,
+    "extends_depth": 4,
+    "rules": 3,
+    "variable_depth": 3,
+    "reference_density": 0.1,
+}
+
+STAGES = ["setup", "build", "test", "deploy"]
+
+# Number of independent template hierarchies the jobs are spread over.
+TEMPLATE_CHAINS = 4
+
+PROFILES = {
+    "merge_request": {"CI_PIPELINE_SOURCE": "merge_request_event", "CI_COMMIT_BRANCH": "feature/synthetic",
+                      "CI_MERGE_REQUEST_TITLE": "Draft: synthetic change"},
+    "main": {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main"},
+    "tag": {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_TAG": "v1.2.3"},
+}
+
+class _Reference:
+    """A !reference tag to emit in a generated file."""
+
+    def __init__(self, *path: str) -> None:
+        self.path = list(path)
+
+class _GeneratorDumper(yaml.SafeDumper):
+    """Dumper writing _Reference objects as !reference tags, without aliases."""
+
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+_GeneratorDumper.add_representer(
+    _Reference, lambda dumper, ref: dumper.represent_sequence('!reference', ref.path, flow_style=True)
+)
+
+def _write_yaml(path: str, data: Dict[str, Any]) -> None:
+    with open(path, 'w') as f:
+        yaml.dump(data, f, Dumper=_GeneratorDumper, default_flow_style=False, sort_keys=False)
+
+def _nested_variables(depth: int) -> Dict[str, str]:
+    """Global variables where each one references the previous one, `depth` levels deep."""
+    variables = {"NEST_0": "root"}
+    for level in range(1, depth):
+        variables[f"NEST_{level}"] = f"${{NEST_{level - 1}}}/level-{level}"
+    return variables
+
+def _templates(extends_depth: int, deepest_variable: str) -> Dict[str, Any]:
+    """Template hierarchies `extends_depth` levels deep."""
+    templates: Dict[str, Any] = {}
+    for chain in range(TEMPLATE_CHAINS):
+        for level in range(extends_depth):
+            template: Dict[str, Any] = {
+                "variables": {f"TPL_{level}": f"chain-{chain}-level-{level}", "TPL_PATH": f"${deepest_variable}/{level}"},
+                "script": [f"echo template {chain}.{level} step {step} in $TPL_PATH" for step in range(5)],
+                "artifacts": {"paths": [f"out/{chain}/{level}/"], "expire_in": "1 day"},
+                "cache": {"key": f"cache-{chain}-{level}", "paths": [".cache/"]},
+            }
+            if level:
+                template["extends"] = f".tpl-{chain}-{level - 1}"
+            templates[f".tpl-{chain}-{level}"] = template
+    return templates
+
+def _job_rules(index: int, count: int) -> List[Dict[str, Any]]:
+    """`count` rules of varied shapes; the last one always matches."""
+    candidates = [
+        {"if": f'$CI_COMMIT_BRANCH =~ /^release\\/{index % 5}/', "when": "never"},
+        {"if": '$CI_PIPELINE_SOURCE == "merge_request_event" && $CI_MERGE_REQUEST_TITLE !~ /^Draft:/',
+         "variables": {"RULE_SOURCE": "merge-request"}},
+        {"if": f'$CI_COMMIT_TAG || $JOB_ID == "{index}"', "when": "always"},
+        {"if": '$CI_COMMIT_BRANCH == "main" || $FORCE_ALL', "variables": {"RULE_SOURCE": "main"}},
+        {"if": f'$TPL_PATH =~ /level-{index % 3}/', "when": "manual"},
+    ]
+    rules = [candidates[(index + offset) % len(candidates)] for offset in range(max(count - 1, 0))]
+    if count:
+        rules.append({"when": "on_success"} if index % 4 else {"when": "never"})
+    return rules
+
+def _job(index: int, rng: random.Random, extends_depth: int, rules: int, deepest_variable: str,
+         reference_density: float) -> Dict[str, Any]:
+    job: Dict[str, Any] = {"stage": STAGES[index % len(STAGES)]}
+    if extends_depth:
+        job["extends"] = f".tpl-{index % TEMPLATE_CHAINS}-{extends_depth - 1}"
+    job["variables"] = {"JOB_ID": str(index), "JOB_PATH": f"${{{deepest_variable}}}/job-{index}"}
+
+    script: List[Any] = [f"echo job {index} in $JOB_PATH", "make build", f"./run.sh --id $JOB_ID --source $RULE_SOURCE"]
+    if rng.random() < reference_density:
+        script.insert(0, _Reference(".snippets", "script"))
+        job["before_script"] = [_Reference(".snippets", "before_script")]
+    job["script"] = script
+    if rules:
+        job["rules"] = _job_rules(index, rules)
+    if index >= len(STAGES) and rng.random() < 0.5:
+        job["needs"] = [{"job": f"job-{index - len(STAGES)}", "optional": index % 3 == 0}]
+    return job
+
+def generate_pipeline(directory: str, jobs: int = PIPELINE_DEFAULTS["jobs"],
+                      includes: int = PIPELINE_DEFAULTS["includes"],
+                      extends_depth: int = PIPELINE_DEFAULTS["extends_depth"],
+                      rules: int = PIPELINE_DEFAULTS["rules"],
+                      variable_depth: int = PIPELINE_DEFAULTS["variable_depth"],
+                      reference_density: float = PIPELINE_DEFAULTS["reference_density"],
+                      seed: int = 0) -> Tuple[str, str]:
+    """
+    Write a synthetic GitLab CI tree and its simulation configuration.
+
+    Parameters:
+        directory (str): Directory to write the files to (created if needed).
+        jobs (int): Number of concrete jobs.
+        includes (int): Number of included files the templates and jobs are spread over.
+        extends_depth (int): Depth of the template hierarchies jobs extend (0 for none).
+        rules (int): Rules per job (0 for none).
+        variable_depth (int): Depth of the chain of nested global variable references.
+        reference_density (float): Fraction of jobs using !reference tags.
+        seed (int): Seed of the random choices.
+
+    Returns:
+        tuple: Paths to the root .gitlab-ci.yml and to the simulation configuration.
+    """
+    rng = random.Random(seed)
+    includes = max(includes, 1)
+    variable_depth = max(variable_depth, 1)
+    deepest_variable = f"NEST_{variable_depth - 1}"
+    os.makedirs(os.path.join(directory, "ci"), exist_ok=True)
+
+    root = {
+        "stages": STAGES,
+        "variables": _nested_variables(variable_depth),
+        "workflow": {"rules": [
+            {"if": '$CI_PIPELINE_SOURCE == "merge_request_event"', "variables": {"PIPELINE_KIND": "mr"}},
+            {"if": "$CI_COMMIT_TAG", "variables": {"PIPELINE_KIND": "release"}},
+            {"if": '$CI_COMMIT_BRANCH == "main"'},
+        ]},
+        ".snippets": {
+            "before_script": ["echo preparing $JOB_ID", "source env.sh"],
+            "script": ["echo shared step one", "echo shared step two in $TPL_PATH"],
+        },
+        "include": [{"local": f"ci/part-{part}.yml"} for part in range(includes)],
+    }
+
+    parts: List[Dict[str, Any]] = [{} for _ in range(includes)]
+    parts[0].update(_templates(extends_depth, deepest_variable))
+    for index in range(jobs):
+        parts[index % includes][f"job-{index}"] = _job(
+            index, rng, extends_depth, rules, deepest_variable, reference_density
+        )
+
+    ci_file = os.path.join(directory, ".gitlab-ci.yml")
+    _write_yaml(ci_file, root)
+    for part, content in enumerate(parts):
+        _write_yaml(os.path.join(directory, "ci", f"part-{part}.yml"), content)
+
+    config_file = os.path.join(directory, "ci-config.yml")
+    _write_yaml(config_file, PROFILES)
+    return ci_file, config_file
@@ -0,0 +1,248 @@
+"""
+Runner of the synthetic benchmark suite.
+
+Each scenario generates a pipeline, then measures these phases in order:
+  - load: load_and_resolve() with an empty parse cache (parsing, include
+    merging and !reference resolution),
+  - expand: expand_all_jobs() in shared mode,
+  - rules: resolving each job's variables and evaluating its rules,
+  - simulate: simulate_pipeline() on the expanded jobs,
+  - write: writing the summary as YAML.
+Times are the best of several runs; peak memory is measured by tracemalloc in
+a separate run, so that tracing does not skew the times.
+
+Results are written as JSON and can be compared against a previous results
+file used as a baseline; the runner exits with status 1 when a phase got
+slower (or grew) by more than the tolerance.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import ChainMap
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic.generators import PIPELINE_DEFAULTS, generate_pipeline
+
+from cimulator.config import get_profile_variables, load_simulation_config
+from cimulator.job_expander import expand_all_jobs
+from cimulator.loader import YAML_BACKEND, extract_jobs, load_and_resolve
+from cimulator.parse_cache import yaml_parse_cache
+from cimulator.simulation_engine import evaluate_pipeline_variables, simulate_pipeline
+from cimulator.variable_resolver import resolve_variables
+from cimulator.workflow import evaluate_rules
+from cimulator.yaml_writer import write_summary
+
+# Bump when the layout of the results file changes.
+RESULTS_SCHEMA_VERSION = 1
+
+PHASES = ("load", "expand", "rules", "simulate", "write")
+
+# Named pipeline shapes; parameters not given use PIPELINE_DEFAULTS.
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "small": {"jobs": 200, "includes": 5, "extends_depth": 3, "rules": 2, "variable_depth": 2},
+    "medium": {"jobs": 2000, "includes": 20},
+    "large": {"jobs": 10000, "includes": 100, "extends_depth": 6, "rules": 4, "variable_depth": 4,
+              "reference_density": 0.2},
+    "deep-extends": {"jobs": 2000, "extends_depth": 12},
+    "many-rules": {"jobs": 2000, "rules": 10},
+    "references": {"jobs": 2000, "reference_density": 0.8},
+}
+
+DEFAULT_SCENARIOS = ["small", "medium"]
+
+PROFILE = "merge_request"
+
+# Differences below these are treated as noise when comparing with a baseline.
+MIN_SECONDS_DELTA = 0.005
+MIN_PEAK_MB_DELTA = 1.0
+
+def _measure(function: Callable[[], Any], repeat: int) -> Tuple[Any, Dict[str, float]]:
+    """Return the result of function, its best time over `repeat` runs and its peak traced memory."""
+    best = float("inf")
+    result = None
+    for _ in range(max(repeat, 1)):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"seconds": best, "peak_mb": peak / 1024 / 1024}
+
+def _evaluate_all_rules(expanded_jobs: Dict[str, Any], simulation_variables: Dict[str, Any]) -> int:
+    """Evaluate the rules of every job; return the number of jobs that run."""
+    running = 0
+    for job in expanded_jobs.values():
+        if not isinstance(job, dict):
+            continue
+        scope = ChainMap(resolve_variables(job.get("variables", {}), simulation_variables), simulation_variables)
+        if not job.get("rules") or evaluate_rules(job["rules"], scope)[0]:
+            running += 1
+    return running
+
+def run_scenario(parameters: Dict[str, Any], repeat: int = 3, directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate a pipeline and measure each phase of its simulation.
+
+    Parameters:
+        parameters (dict): Arguments of generate_pipeline() (see PIPELINE_DEFAULTS).
+        repeat (int): Runs per phase; the best time is kept.
+        directory (str): Directory for the generated files; a temporary
+                         directory is used and removed if None.
+
+    Returns:
+        dict: The parameters, the size of the generated pipeline and, for each
+              phase in PHASES, its time in seconds and peak memory in MB.
+    """
+    if directory is None:
+        with tempfile.TemporaryDirectory() as temp_directory:
+            return run_scenario(parameters, repeat, temp_directory)
+
+    ci_file, config_file = generate_pipeline(directory, **parameters)
+    phases: Dict[str, Dict[str, float]] = {}
+
+    def load() -> Dict[str, Any]:
+        # Measure parsing too, not only lookups in the parse cache.
+        yaml_parse_cache.clear()
+        config, _ = load_and_resolve(ci_file)
+        return config
+
+    config, phases["load"] = _measure(load, repeat)
+    jobs = extract_jobs(config)
+    expanded_jobs, phases["expand"] = _measure(lambda: expand_all_jobs(jobs, shared=True), repeat)
+
+    global_variables = {**config.get("variables", {}),
+                        **get_profile_variables(load_simulation_config(config_file), PROFILE)}
+    workflow_config = config.get("workflow", {})
+    _, _, _, simulation_variables = evaluate_pipeline_variables(workflow_config, global_variables)
+    _, phases["rules"] = _measure(lambda: _evaluate_all_rules(expanded_jobs, simulation_variables), repeat)
+
+    summary, phases["simulate"] = _measure(
+        lambda: simulate_pipeline(jobs, workflow_config, global_variables, expanded_jobs=expanded_jobs), repeat
+    )
+
+    def write() -> None:
+        with open(os.devnull, 'w') as f:
+            write_summary(summary, f)
+
+    _, phases["write"] = _measure(write, repeat)
+
+    input_bytes = sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names
+    )
+    return {
+        "parameters": parameters,
+        "size": {"job_definitions": len(jobs), "running_jobs": len(summary["jobs_list"]),
+                 "input_mb": input_bytes / 1024 / 1024},
+        "phases": phases,
+    }
+
+def compare_results(results: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compare benchmark results with a baseline.
+
+    Parameters:
+        results (dict): Results written by this runner.
+        baseline (dict): Earlier results of the same runner.
+        tolerance (float): Allowed relative increase of a phase's time or peak memory.
+
+    Returns:
+        list: One entry per scenario, phase and metric present in both, with
+              the baseline and current values, their ratio and whether it is
+              a regression (beyond the tolerance and above the noise floor).
+    """
+    comparisons = []
+    for scenario, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        for phase in PHASES:
+            if phase not in result["phases"] or phase not in base["phases"]:
+                continue
+            for metric, noise in (("seconds", MIN_SECONDS_DELTA), ("peak_mb", MIN_PEAK_MB_DELTA)):
+                before = base["phases"][phase][metric]
+                after = result["phases"][phase][metric]
+                ratio = after / before if before else float("inf") if after else 1.0
+                comparisons.append({
+                    "scenario": scenario,
+                    "phase": phase,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": ratio,
+                    "regression": ratio > 1 + tolerance and after - before > noise,
+                })
+    return comparisons
+
+def _print_results(results: Dict[str, Any]) -> None:
+    for scenario, result in results["scenarios"].items():
+        size = result["size"]
+        print(f"\n{scenario}: {size['job_definitions']} job definitions, {size['running_jobs']} running, "
+              f"{size['input_mb']:.1f} MB of YAML")
+        print(f"  {'phase':<10}{'time (s)':>12}{'peak (MB)':>12}")
+        for phase in PHASES:
+            measurement = result["phases"][phase]
+            print(f"  {phase:<10}{measurement['seconds']:>12.3f}{measurement['peak_mb']:>12.1f}")
+
+def _print_comparisons(comparisons: List[Dict[str, Any]]) -> None:
+    print(f"\n{'scenario':<14}{'phase':<10}{'metric':<9}{'baseline':>10}{'current':>10}{'change':>9}")
+    for comparison in comparisons:
+        marker = "  REGRESSION" if comparison["regression"] else ""
+        print(f"{comparison['scenario']:<14}{comparison['phase']:<10}{comparison['metric']:<9}"
+              f"{comparison['baseline']:>10.3f}{comparison['current']:>10.3f}"
+              f"{(comparison['ratio'] - 1) * 100:>+8.0f}%{marker}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the synthetic cimulator benchmark suite.")
+    parser.add_argument("--scenario", "-s", action="append", choices=sorted(SCENARIOS),
+                        help=f"Scenario to run (repeatable; default: {', '.join(DEFAULT_SCENARIOS)})")
+    for name, default in PIPELINE_DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default),
+                            help=f"Override '{name}' in every selected scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generators (default: 0)")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Runs per phase, best is kept (default: 3)")
+    parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", "-b", help="Compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown or memory growth per phase (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    overrides = {name: getattr(args, name) for name in PIPELINE_DEFAULTS if getattr(args, name) is not None}
+    results: Dict[str, Any] = {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "yaml_backend": YAML_BACKEND},
+        "scenarios": {},
+    }
+    for scenario in args.scenario or DEFAULT_SCENARIOS:
+        parameters = {**PIPELINE_DEFAULTS, **SCENARIOS[scenario], **overrides, "seed": args.seed}
+        results["scenarios"][scenario] = run_scenario(parameters, args.repeat)
+    _print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nResults saved to {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparisons = compare_results(results, baseline, args.tolerance)
+        _print_comparisons(comparisons)
+        if any(comparison["regression"] for comparison in comparisons):
+            sys.exit(1)
@@ -1,18 +1,35 @@
 import argparse
+import json
 import sys
 import yaml
 import logging
 import os
 import traceback
-from typing import List, Optional, Union, Tuple, Set, NoReturn
+from typing import Dict, List, Optional, Union, Tuple, Set, NoReturn
 from logging import DEBUG, INFO, WARNING, ERROR, CRITICAL
 from cimulator.types import ConfigDict, JobDict, JobSourcesDict
-from cimulator.loader import load_and_resolve
+from cimulator.loader import extract_jobs
 from cimulator.job_expander import expand_all_jobs
-from cimulator.simulation_engine import simulate_pipeline
-from cimulator.config import load_simulation_config
+from cimulator.simulation_engine import (
+    simulate_pipeline, simulate_profiles, build_profile_matrix, select_sections, SUMMARY_SECTIONS
+)
+from cimulator.plan import plan_pipeline
+from cimulator.pipeline import Pipeline
+from cimulator.variants import enumerate_variants
+from cimulator.config import load_simulation_config, get_profile_variables
+from cimulator.incremental import simulate_incremental, DEFAULT_CACHE_DIR
+from cimulator.parse_cache import yaml_parse_cache
+from cimulator.workspace import Workspace, load_configuration
+from cimulator.server import serve
+from cimulator.watch import WatchedPipeline, watch_pipeline, write_simulation_atomically
+from cimulator.profiling import PhaseProfiler, phase
+from cimulator.yaml_writer import write_summary
+from cimulator.output_formats import OUTPUT_FORMATS, FORMAT_EXTENSIONS, write_simulation, write_validation
 from cimulator.validator import validate_job_dependencies, detect_duplicate_jobs
 
+# Configurations kept loaded between commands by 'cimulator serve' (None otherwise).
+workspace: Optional[Workspace] = None
+
 def setup_logging(level: int) -> None:
     """
     Set up logging configuration for the entire application.
@@ -35,7 +52,70 @@ def setup_logging(level: int) -> None:
     ch.setFormatter(formatter)
     root_logger.addHandler(ch)
 
-def main() -> None:
+def write_simulation_output(simulation_summary: ConfigDict, output_path: str) -> None:
+    """
+    Save a simulation summary as YAML, with empty lines between jobs.
+
+    Parameters:
+        simulation_summary (dict): The summary returned by simulate_pipeline().
+        output_path (str): Path to the output file.
+    """
+    # Stream the summary job by job instead of building the whole YAML text in memory
+    with open(output_path, 'w') as f:
+        write_summary(simulation_summary, f)
+
+def report_dependency_errors(simulation_summary: ConfigDict, header: str = "Warnings about job dependencies:") -> bool:
+    """
+    Print the dependency errors of a simulation summary to stderr as warnings.
+
+    Parameters:
+        simulation_summary (dict): The summary returned by simulate_pipeline().
+        header (str): Line printed before the warnings.
+
+    Returns:
+        bool: True if at least one non-optional dependency error was found.
+    """
+    has_non_optional_dependency_error = False
+    if simulation_summary.get("dependency_errors"):
+        print(f"\n{header}", file=sys.stderr)
+        for error in simulation_summary["dependency_errors"]:
+            # Check if this is a non-optional dependency error
+            if not error.get("is_optional", False):
+                has_non_optional_dependency_error = True
+
+            # Add [Optional] prefix for optional dependencies
+            prefix = "[Optional] " if error.get("is_optional", False) else ""
+            print(f"  - {prefix}{error['message']}", file=sys.stderr)
+    return has_non_optional_dependency_error
+
+def parse_sections(value: str) -> List[str]:
+    """
+    Parse a comma-separated list of simulation summary sections.
+
+    Raises:
+        argparse.ArgumentTypeError: If a section name is unknown.
+    """
+    sections = [section.strip() for section in value.split(",") if section.strip()]
+    unknown = [section for section in sections if section not in SUMMARY_SECTIONS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown section(s): {', '.join(unknown)} (choose from {', '.join(SUMMARY_SECTIONS)})"
+        )
+    return sections
+
+def parse_variable(value: str) -> Tuple[str, str]:
+    """
+    Parse a VAR=VALUE variable assignment.
+
+    Raises:
+        argparse.ArgumentTypeError: If there is no '=' or no variable name.
+    """
+    name, separator, variable_value = value.partition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"expected VAR=VALUE, got '{value}'")
+    return name, variable_value
+
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(
         description="GitLab CI Simulator - Validate and simulate GitLab CI pipelines."
     )
@@ -47,6 +127,40 @@ def main() -> None:
         default="info",
         help="Set the logging level (default: info)"
     )
+    parser.add_argument(
+        "--parse-cache-dir",
+        help="Directory where parsed YAML files are cached between runs "
+             "(default: no on-disk cache; <cache-dir>/parsed with --incremental)"
+    )
+    parser.add_argument(
+        "--profile-phases",
+        action="store_true",
+        help="Measure the wall time, CPU time, allocations and peak RSS of each phase of the run, "
+             "and report them with the slowest files and jobs"
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["table", "json"],
+        default="table",
+        help="Format of the --profile-phases report (default: table)"
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="File to write the --profile-phases report to (default: stderr)"
+    )
+    parser.add_argument(
+        "--profile-allocations",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Trace allocations with tracemalloc when profiling phases; tracing slows the run down, "
+             "so use --no-profile-allocations for accurate times (default: on)"
+    )
+    parser.add_argument(
+        "--include-workers",
+        type=int,
+        default=1,
+        help="Number of threads loading included files concurrently (default: 1)"
+    )
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -55,8 +169,13 @@ def main() -> None:
     validate_parser.add_argument("ci_file", help="Path to the .gitlab-ci.yml file")
     validate_parser.add_argument(
         "--output", "-o",
-        help="Path to the output file (default: validation_output.yml)",
-        default="validation_output.yml"
+        help="Path to the output file (default: validation_output.<format extension>)"
+    )
+    validate_parser.add_argument(
+        "--format", "-f",
+        choices=OUTPUT_FORMATS,
+        default="yaml",
+        help="Output format (default: yaml)"
     )
 
     # 'simulate' subcommand: runs the simulation and saves the results to a file.
@@ -72,11 +191,152 @@ def main() -> None:
     )
     simulate_parser.add_argument(
         "--output", "-o",
-        help="Path to the output file (default: simulation_output.yml)",
-        default="simulation_output.yml"
+        help="Path to the output file (default: simulation_output.<format extension>)"
+    )
+    simulate_parser.add_argument(
+        "--format", "-f",
+        choices=OUTPUT_FORMATS,
+        default="yaml",
+        help="Output format; jsonl writes a header record followed by one record per job (default: yaml)"
+    )
+    simulate_parser.add_argument(
+        "--sections",
+        type=parse_sections,
+        help="Comma-separated summary sections to compute and write, e.g. jobs_list,dependency_errors "
+             "(default: all but regex_cache). Leaving out jobs and all_expanded_jobs skips expanding the job bodies"
+    )
+    simulate_parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used to simulate jobs (default: 1; ignored with --incremental)"
+    )
+    simulate_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-simulate jobs whose definition or variables changed since the previous run"
+    )
+    simulate_parser.add_argument(
+        "--cache-dir",
+        help=f"Directory storing the state used by --incremental (default: {DEFAULT_CACHE_DIR})",
+        default=DEFAULT_CACHE_DIR
+    )
+    simulate_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: simulate again and rewrite the output whenever a CI file or the "
+             "simulation configuration changes"
+    )
+    simulate_parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        help="Seconds between checks for changed files with --watch (default: 0.5)"
+    )
+    simulate_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.2,
+        help="Seconds files must stay unchanged before simulating again with --watch (default: 0.2)"
+    )
+
+    # 'plan' subcommand: decides which jobs run without expanding their bodies.
+    plan_parser = subparsers.add_parser(
+        "plan", help="Compute which jobs run and why, only expanding the jobs asked for"
+    )
+    plan_parser.add_argument("ci_file", help="Path to the .gitlab-ci.yml file")
+    plan_parser.add_argument(
+        "simulation_config",
+        help="Path to the simulation configuration YAML file (defines global variables, etc.)"
+    )
+    plan_parser.add_argument(
+        "profile",
+        help="Name of the profile in the simulation configuration file to use"
+    )
+    plan_parser.add_argument(
+        "--output", "-o",
+        help="Path to the output file (default: plan_output.<format extension>)"
+    )
+    plan_parser.add_argument(
+        "--format", "-f",
+        choices=("yaml", "json"),
+        default="yaml",
+        help="Output format (default: yaml)"
+    )
+    plan_parser.add_argument(
+        "--expand",
+        action="append",
+        metavar="JOB",
+        help="Name of a job whose fully expanded definition is included in the plan (repeatable)"
+    )
+
+    # 'variants' subcommand: enumerates the distinct run sets over the variables read by rules.
+    variants_parser = subparsers.add_parser(
+        "variants", help="Enumerate the distinct sets of jobs the pipeline can run, with an example for each"
+    )
+    variants_parser.add_argument("ci_file", help="Path to the .gitlab-ci.yml file")
+    variants_parser.add_argument(
+        "--set",
+        action="append",
+        type=parse_variable,
+        metavar="VAR=VALUE",
+        help="Give a variable a fixed value instead of treating it as an input (repeatable)"
+    )
+    variants_parser.add_argument(
+        "--output", "-o",
+        help="Path to the output file (default: variants_output.<format extension>)"
+    )
+    variants_parser.add_argument(
+        "--format", "-f",
+        choices=("yaml", "json"),
+        default="yaml",
+        help="Output format (default: yaml)"
+    )
+    variants_parser.add_argument(
+        "--no-verify",
+        dest="verify",
+        action="store_false",
+        help="Do not evaluate the pipeline with the example variables of each variant to check it"
+    )
+
+    # 'simulate-all' subcommand: simulates every profile of the configuration at once.
+    simulate_all_parser = subparsers.add_parser(
+        "simulate-all", help="Simulate GitLab CI pipeline for every profile of a simulation configuration"
+    )
+    simulate_all_parser.add_argument("ci_file", help="Path to the .gitlab-ci.yml file")
+    simulate_all_parser.add_argument(
+        "simulation_config",
+        help="Path to the simulation configuration YAML file (defines the profiles)"
+    )
+    simulate_all_parser.add_argument(
+        "--output-dir", "-d",
+        help="Directory for the per-profile outputs and the profile matrix (default: simulation_outputs)",
+        default="simulation_outputs"
+    )
+    simulate_all_parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used to simulate profiles (default: 1)"
     )
 
-    args = parser.parse_args()
+    # 'serve' subcommand: keeps configurations loaded and answers cimulator-client requests.
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a server keeping configurations loaded for cimulator-client (Unix only)"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=None,
+        help="Path of the Unix socket (default: $CIMULATOR_SOCKET or cimulator-<uid>.sock in the temp directory)"
+    )
+    serve_parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks for changed CI files, reloaded in the background; 0 disables (default: 1.0)"
+    )
+
+    args = parser.parse_args(argv)
 
     # Set up logging based on the specified level
     log_level_map = {
@@ -88,13 +348,104 @@ def main() -> None:
     }
     setup_logging(log_level_map[args.log_level])
 
+    # Keep parsed YAML files on disk if requested, so unchanged files are not parsed again.
+    # The cache is shared by the whole process (e.g. every request of a server),
+    # so the directory only applies to this command.
+    previous_parse_cache_directory = yaml_parse_cache.directory
+    if args.parse_cache_dir:
+        yaml_parse_cache.directory = os.path.abspath(args.parse_cache_dir)
+    elif getattr(args, "incremental", False):
+        yaml_parse_cache.directory = os.path.abspath(os.path.join(args.cache_dir, "parsed"))
+
+    try:
+        if not args.profile_phases:
+            run_command(args)
+            return
+
+        profiler = PhaseProfiler(trace_allocations=args.profile_allocations)
+        try:
+            with profiler:
+                run_command(args)
+        finally:
+            write_profile(profiler, args.profile_format, args.profile_output)
+    finally:
+        yaml_parse_cache.directory = previous_parse_cache_directory
+
+def write_profile(profiler: PhaseProfiler, output_format: str, output_path: Optional[str] = None) -> None:
+    """
+    Write the report of a phase profiler.
+
+    Parameters:
+        profiler (PhaseProfiler): The profiler of the run.
+        output_format (str): "table" or "json".
+        output_path (str): File to write to; stderr if None.
+    """
+    report = json.dumps(profiler.to_dict(), indent=2) if output_format == "json" else profiler.format_table()
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(f"\n{report}", file=sys.stderr)
+
+def simulate_watch(args: argparse.Namespace) -> None:
+    """Simulate a pipeline, then simulate it again whenever its files change (simulate --watch)."""
+    if args.incremental:
+        print("Error: --watch cannot be combined with --incremental", file=sys.stderr)
+        sys.exit(2)
+    if args.output is None:
+        args.output = f"simulation_output.{FORMAT_EXTENSIONS[args.format]}"
+
+    def simulate_and_write(pipeline: WatchedPipeline) -> None:
+        job_results: Dict[str, ConfigDict] = {}
+        with phase("simulate"):
+            simulation_summary = pipeline.simulate(args.jobs, args.sections, job_results)
+        with phase("write"):
+            write_simulation_atomically(simulation_summary, args.output, args.format,
+                                        pipeline.job_sources, job_results)
+        report_dependency_errors(simulation_summary)
+        print(f"Simulation successful. Output saved to {os.path.abspath(args.output)}", flush=True)
+
+    try:
+        with phase("load"):
+            pipeline = WatchedPipeline(args.ci_file, args.simulation_config, args.profile, args.include_workers)
+        simulate_and_write(pipeline)
+    except Exception as e:
+        print(f"Error during simulation: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Watching {len(pipeline.files)} files for changes (Ctrl+C to stop)", flush=True)
+
+    def on_change(changed_files: List[str], reexpanded: List[str]) -> None:
+        print(f"\n{len(changed_files)} file(s) changed; expanded {len(reexpanded)} of "
+              f"{len(pipeline.jobs)} jobs again", flush=True)
+        try:
+            simulate_and_write(pipeline)
+        except Exception as e:
+            print(f"Error during simulation: {e}", file=sys.stderr)
+
+    try:
+        watch_pipeline(pipeline, on_change, args.watch_interval, args.debounce)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+def run_command(args: argparse.Namespace) -> None:
+    """Run the subcommand selected on the command line."""
+    if workspace is not None:
+        # The server answers one request at a time from a multithreaded
+        # process: a command that never returns would block every later
+        # client, and forking a process pool there is not safe.
+        if args.command == "simulate" and args.watch:
+            print("Error: 'simulate --watch' cannot be run through the server", file=sys.stderr)
+            sys.exit(2)
+        if getattr(args, "jobs", 1) > 1:
+            args.jobs = 1
+
     if args.command == "validate":
         try:
-            config, job_sources = load_and_resolve(args.ci_file)
+            with phase("load"):
+                config, job_sources, _ = load_configuration(args.ci_file, args.include_workers, workspace)
 
             # Extract jobs from the configuration
-            reserved_keys = {"include", "workflow", "variables", "stages"}
-            jobs = {k: v for k, v in config.items() if k not in reserved_keys and isinstance(v, dict)}
+            jobs = extract_jobs(config)
 
             # Validate job dependencies
             validation_errors = validate_job_dependencies(jobs)
@@ -115,8 +466,10 @@ def main() -> None:
                     print(f"  - {warning}", file=sys.stderr)
 
             # Save the output to a file instead of printing it
-            with open(args.output, 'w') as f:
-                f.write(yaml.dump(config, default_flow_style=False))
+            if args.output is None:
+                args.output = f"validation_output.{FORMAT_EXTENSIONS[args.format]}"
+            with phase("write"):
+                write_validation(config, args.output, args.format, job_sources)
             print(f"Validation successful. Output saved to {os.path.abspath(args.output)}")
         except Exception as e:
             exc_type, exc_value, exc_traceback = sys.exc_info()
@@ -125,97 +478,107 @@ def main() -> None:
             print(f"Error during validation: {e} (File: {filename}, line {line})", file=sys.stderr)
             sys.exit(1)
 
+    elif args.command == "simulate" and args.watch:
+        simulate_watch(args)
+
     elif args.command == "simulate":
         try:
-            # Load the GitLab CI configuration.
-            ci_config, job_sources = load_and_resolve(args.ci_file)
-            # Extract jobs from the configuration.
-            # For simplicity, we treat all keys that are not reserved as jobs.
-            # Also filter out non-dictionary values as they can't be valid jobs
-            reserved_keys = {"include", "workflow", "variables", "stages"}
-            jobs = {k: v for k, v in ci_config.items() if k not in reserved_keys and isinstance(v, dict)}
+            job_results: Dict[str, ConfigDict] = {}
+            if args.incremental:
+                # Reuse the results of the previous run for unchanged inputs.
+                job_sources: JobSourcesDict = {}
+                with phase("simulate"):
+                    simulation_summary, duplicate_warnings = simulate_incremental(
+                        args.ci_file, args.simulation_config, args.profile, args.cache_dir,
+                        include_workers=args.include_workers,
+                        job_results=job_results, job_sources=job_sources
+                    )
+                simulation_summary = select_sections(simulation_summary, args.sections)
+            else:
+                # Load the GitLab CI configuration.
+                with phase("load"):
+                    ci_config, job_sources, expanded_jobs = load_configuration(
+                        args.ci_file, args.include_workers, workspace, expand=True
+                    )
+                # Extract jobs from the configuration.
+                jobs = extract_jobs(ci_config)
+
+                # Check for duplicate jobs
+                duplicate_warnings = detect_duplicate_jobs(jobs, job_sources)
+
+                # Get the workflow configuration (if any).
+                workflow_config = ci_config.get("workflow", {})
+
+                # Get global variables from the GitLab CI file
+                gitlab_vars = ci_config.get("variables", {})
+
+                # Load simulation configuration (global variables etc.)
+                sim_config = load_simulation_config(args.simulation_config)
+                # Get the variables from the specified profile
+                profile_vars = get_profile_variables(sim_config, args.profile)
+
+                # Merge GitLab CI variables with profile variables
+                # Profile variables take precedence over GitLab CI variables
+                global_vars = {**gitlab_vars, **profile_vars}
+
+                # Run the simulation.
+                with phase("simulate"):
+                    simulation_summary = simulate_pipeline(jobs, workflow_config, global_vars, processes=args.jobs,
+                                                           job_results=job_results, sections=args.sections,
+                                                           expanded_jobs=expanded_jobs)
+
+            # Save the simulation summary to the output file
+            if args.output is None:
+                args.output = f"simulation_output.{FORMAT_EXTENSIONS[args.format]}"
+            with phase("write"):
+                write_simulation(simulation_summary, args.output, args.format, job_sources, job_results)
 
-            # Check for duplicate jobs
-            duplicate_warnings = detect_duplicate_jobs(jobs, job_sources)
+            # Check for dependency errors (show as warnings, not hard errors)
+            has_non_optional_dependency_error = report_dependency_errors(simulation_summary)
 
-            # Get the workflow configuration (if any).
-            workflow_config = ci_config.get("workflow", {})
+            # Display warnings about duplicate jobs
+            if duplicate_warnings:
+                print("\nWarnings about duplicate jobs:", file=sys.stderr)
+                for warning in duplicate_warnings:
+                    print(f"  - {warning}", file=sys.stderr)
 
-            # Get global variables from the GitLab CI file
-            gitlab_vars = ci_config.get("variables", {})
+            print(f"Simulation successful. Output saved to {os.path.abspath(args.output)}")
 
-            # Load simulation configuration (global variables etc.)
-            sim_config = load_simulation_config(args.simulation_config)
-            # Get the variables from the specified profile
-            if args.profile not in sim_config:
-                raise ValueError(f"'{args.profile}' is not a valid key in the simulation configuration file. Expected keys: {list(sim_config.keys())}")
-            profile_vars = sim_config.get(args.profile, {})
+            # Exit with 1 if there's at least one non-optional dependency error, 0 otherwise
+            if has_non_optional_dependency_error:
+                sys.exit(1)
+        except Exception as e:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            tb = traceback.extract_tb(exc_traceback)
+            filename, line, func, text = tb[-1]
+            print(f"Error during simulation: {e} (File: {filename}, line {line})", file=sys.stderr)
+            sys.exit(1)
 
-            # Merge GitLab CI variables with profile variables
+    elif args.command == "plan":
+        try:
+            with phase("load"):
+                ci_config, job_sources, _ = load_configuration(args.ci_file, args.include_workers, workspace)
+            jobs = extract_jobs(ci_config)
+            duplicate_warnings = detect_duplicate_jobs(jobs, job_sources)
+
+            sim_config = load_simulation_config(args.simulation_config)
+            profile_vars = get_profile_variables(sim_config, args.profile)
             # Profile variables take precedence over GitLab CI variables
-            global_vars = {**gitlab_vars, **profile_vars}
-
-            # Run the simulation.
-            simulation_summary = simulate_pipeline(jobs, workflow_config, global_vars)
-
-            # First, dump the simulation summary to YAML
-            yaml_content = yaml.dump(simulation_summary, default_flow_style=False)
-
-            # Post-process the YAML content to add empty lines between jobs
-            lines = yaml_content.split('\n')
-            processed_lines = []
-            in_jobs_section = False
-            job_indent = None
-
-            # Keep track of whether we've seen the first job
-            first_job = True
-
-            for i, line in enumerate(lines):
-                # Check if we're entering the jobs section
-                if line.startswith('jobs:'):
-                    in_jobs_section = True
-                    processed_lines.append(line)
-                    continue
-
-                # If we're in the jobs section and this line defines a job (not indented)
-                if in_jobs_section and line and not line.startswith(' '):
-                    # We've moved past the jobs section
-                    in_jobs_section = False
-                    processed_lines.append(line)
-                    continue
-
-                # If we're in the jobs section and this is a job entry
-                if in_jobs_section and line.strip() and line.startswith('  '):
-                    # Determine the indentation level of job entries if not already set
-                    if job_indent is None and not line.startswith('    '):
-                        job_indent = len(line) - len(line.lstrip())
-
-                    # If this is a job entry (not a property of a job)
-                    if job_indent is not None and line.startswith(' ' * job_indent) and not line.startswith(' ' * (job_indent + 2)):
-                        # Add an empty line before the job, but not before the first job
-                        if not first_job:
-                            processed_lines.append('')
-                        else:
-                            first_job = False
-
-                processed_lines.append(line)
-
-            # Save the processed content to the output file
-            with open(args.output, 'w') as f:
-                f.write('\n'.join(processed_lines))
+            global_vars = {**ci_config.get("variables", {}), **profile_vars}
 
-            # Check for dependency errors (show as warnings, not hard errors)
-            has_non_optional_dependency_error = False
-            if simulation_summary.get("dependency_errors"):
-                print("\nWarnings about job dependencies:", file=sys.stderr)
-                for error in simulation_summary["dependency_errors"]:
-                    # Check if this is a non-optional dependency error
-                    if not error.get("is_optional", False):
-                        has_non_optional_dependency_error = True
+            with phase("plan"):
+                plan = plan_pipeline(jobs, ci_config.get("workflow", {}), global_vars)
+            unknown_jobs = [job_name for job_name in args.expand or [] if job_name not in plan.decisions]
+            if unknown_jobs:
+                raise ValueError(f"Unknown job(s) to expand: {', '.join(unknown_jobs)}")
+            plan_summary = plan.to_summary(expand=args.expand)
+
+            if args.output is None:
+                args.output = f"plan_output.{FORMAT_EXTENSIONS[args.format]}"
+            with phase("write"):
+                write_simulation(plan_summary, args.output, args.format)
 
-                    # Add [Optional] prefix for optional dependencies
-                    prefix = "[Optional] " if error.get("is_optional", False) else ""
-                    print(f"  - {prefix}{error['message']}", file=sys.stderr)
+            has_non_optional_dependency_error = report_dependency_errors(plan_summary)
 
             # Display warnings about duplicate jobs
             if duplicate_warnings:
@@ -223,11 +586,90 @@ def main() -> None:
                 for warning in duplicate_warnings:
                     print(f"  - {warning}", file=sys.stderr)
 
-            print(f"Simulation successful. Output saved to {os.path.abspath(args.output)}")
+            print(f"Plan computed: {len(plan.jobs_list)} jobs run. Output saved to {os.path.abspath(args.output)}")
 
             # Exit with 1 if there's at least one non-optional dependency error, 0 otherwise
             if has_non_optional_dependency_error:
                 sys.exit(1)
+        except Exception as e:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            tb = traceback.extract_tb(exc_traceback)
+            filename, line, func, text = tb[-1]
+            print(f"Error during planning: {e} (File: {filename}, line {line})", file=sys.stderr)
+            sys.exit(1)
+
+    elif args.command == "variants":
+        try:
+            with phase("load"):
+                ci_config, job_sources, _ = load_configuration(args.ci_file, args.include_workers, workspace)
+            with phase("variants"):
+                pipeline = Pipeline(ci_config, job_sources)
+                variants_summary = enumerate_variants(pipeline, dict(args.set or []), verify=args.verify)
+
+            if args.output is None:
+                args.output = f"variants_output.{FORMAT_EXTENSIONS[args.format]}"
+            with phase("write"):
+                write_simulation(variants_summary, args.output, args.format)
+
+            unverified = [variant for variant in variants_summary["variants"] if variant.get("verified") is False]
+            if unverified:
+                print(f"\nWarning: {len(unverified)} variant(s) give a different run set when simulated "
+                      "with their example variables", file=sys.stderr)
+
+            print(f"Found {len(variants_summary['variants'])} pipeline variants over "
+                  f"{len(variants_summary['symbolic_variables'])} input variables. "
+                  f"Output saved to {os.path.abspath(args.output)}")
+        except Exception as e:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            tb = traceback.extract_tb(exc_traceback)
+            filename, line, func, text = tb[-1]
+            print(f"Error during variant enumeration: {e} (File: {filename}, line {line})", file=sys.stderr)
+            sys.exit(1)
+
+    elif args.command == "simulate-all":
+        try:
+            # Load, extract and expand the GitLab CI configuration once for all profiles.
+            with phase("load"):
+                ci_config, job_sources, _ = load_configuration(args.ci_file, args.include_workers, workspace)
+            jobs = extract_jobs(ci_config)
+            duplicate_warnings = detect_duplicate_jobs(jobs, job_sources)
+
+            sim_config = load_simulation_config(args.simulation_config)
+            if not isinstance(sim_config, dict) or not sim_config:
+                raise ValueError(f"No profiles found in simulation config {args.simulation_config}")
+
+            with phase("simulate"):
+                summaries = simulate_profiles(
+                    jobs, ci_config.get("workflow", {}), ci_config.get("variables", {}), sim_config,
+                    processes=args.jobs
+                )
+
+            os.makedirs(args.output_dir, exist_ok=True)
+            has_non_optional_dependency_error = False
+            for profile, simulation_summary in summaries.items():
+                # Profile names may contain path separators; keep every output in the directory.
+                file_name = str(profile).replace(os.sep, "_").replace("/", "_")
+                write_simulation_output(simulation_summary, os.path.join(args.output_dir, f"{file_name}.yml"))
+                if report_dependency_errors(simulation_summary,
+                                            f"Warnings about job dependencies (profile '{profile}'):"):
+                    has_non_optional_dependency_error = True
+
+            # Save the cross-profile matrix of which jobs run in which profile.
+            matrix_path = os.path.join(args.output_dir, "matrix.yml")
+            with open(matrix_path, 'w') as f:
+                f.write(yaml.dump(build_profile_matrix(jobs, summaries), default_flow_style=False, sort_keys=False))
+
+            # Display warnings about duplicate jobs
+            if duplicate_warnings:
+                print("\nWarnings about duplicate jobs:", file=sys.stderr)
+                for warning in duplicate_warnings:
+                    print(f"  - {warning}", file=sys.stderr)
+
+            print(f"Simulated {len(summaries)} profiles. Outputs saved to {os.path.abspath(args.output_dir)}")
+
+            # Exit with 1 if any profile has a non-optional dependency error, 0 otherwise
+            if has_non_optional_dependency_error:
+                sys.exit(1)
         except Exception as e:
             exc_type, exc_value, exc_traceback = sys.exc_info()
             tb = traceback.extract_tb(exc_traceback)
@@ -235,5 +677,15 @@ def main() -> None:
             print(f"Error during simulation: {e} (File: {filename}, line {line})", file=sys.stderr)
             sys.exit(1)
 
+    elif args.command == "serve":
+        if workspace is not None:
+            print("Error: 'serve' cannot be run through the server", file=sys.stderr)
+            sys.exit(2)
+        try:
+            serve(args.socket, args.watch_interval, logging.getLogger().level)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
 if __name__ == "__main__":
     main()
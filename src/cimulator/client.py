@@ -0,0 +1,95 @@
+"""
+Thin client of the cimulator server.
+
+Sends a cimulator command line to a running `cimulator serve` process over its
+Unix socket and prints the command's output, so that a command only costs a
+round trip instead of the interpreter start-up, imports and loading of the
+CI configuration. This module only imports the standard library; when no
+server is listening, the command runs in-process as `cimulator` would.
+
+Usage:
+    cimulator-client [--socket PATH] <cimulator arguments...>
+"""
+
+import os
+import sys
+import json
+import socket
+import tempfile
+from typing import Any, Dict, List, Optional
+
+# Environment variable overriding the default socket path.
+SOCKET_ENV_VAR = "CIMULATOR_SOCKET"
+
+class ServerUnavailable(ConnectionError):
+    """No server is listening on the socket (or Unix sockets are not supported)."""
+
+def default_socket_path() -> str:
+    """Return the socket path used when none is given: $CIMULATOR_SOCKET or a per-user file in the temp directory."""
+    if os.environ.get(SOCKET_ENV_VAR):
+        return os.environ[SOCKET_ENV_VAR]
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"cimulator-{user}.sock")
+
+def send_request(request: Dict[str, Any], socket_path: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Send one request to the server and return its response.
+
+    Parameters:
+        request (dict): Either {"argv": [...], "cwd": ...} to run a command, or
+                        {"command": "ping" | "stats" | "shutdown"}.
+        socket_path (str): Path of the server socket (default: default_socket_path()).
+        timeout (float): Optional socket timeout in seconds.
+
+    Returns:
+        dict: The server's response.
+
+    Raises:
+        ServerUnavailable: If no server is listening on the socket; the
+                           request was not sent.
+        OSError: If the connection failed after it was established; the
+                 server may have received the request.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise ServerUnavailable("Unix sockets are not supported on this platform")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        try:
+            connection.connect(socket_path or default_socket_path())
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ServerUnavailable(str(e)) from e
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    socket_path = None
+    if argv[:1] == ["--socket"] and len(argv) > 1:
+        socket_path, argv = argv[1], argv[2:]
+
+    try:
+        response = send_request({"argv": argv, "cwd": os.getcwd()}, socket_path)
+    except ServerUnavailable:
+        # No server (or no Unix sockets on this platform): run the command here.
+        from cimulator.cli import main as cli_main
+        cli_main(argv)
+        return
+    except (OSError, ValueError) as e:
+        # The server may already have run the command: do not run it a second time.
+        print(f"Error: request to the cimulator server failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    sys.exit(response.get("exit_code", 1))
+
+if __name__ == "__main__":
+    main()
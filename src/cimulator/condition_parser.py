@@ -0,0 +1,324 @@
+"""
+Parser and compiler for GitLab CI rule conditions.
+
+A condition such as '$CI_PIPELINE_SOURCE == "push" && $CI_COMMIT_BRANCH =~ /^release/'
+is tokenized and parsed once into a small expression tree. The resulting
+CompiledCondition can be evaluated against any variables mapping without
+re-parsing the text, and compiled conditions are kept in an LRU-bounded cache
+keyed by the condition string.
+
+Supported syntax:
+  - Operands: $VAR / ${VAR}, "string" / 'string', /regex/flags and null.
+  - Comparison operators: ==, !=, =~ and !~.
+  - Logical operators: && and || (&& binds tighter than ||).
+  - Parentheses for grouping, and bare operands (true when the value is
+    defined and not empty).
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, FrozenSet, List, Mapping, Optional, Tuple
+from cimulator.regex_cache import compile_regex_literal, rule_regex_cache
+
+# Maximum number of distinct condition strings kept in the compiled cache.
+CONDITION_CACHE_SIZE = 4096
+
+class ConditionSyntaxError(ValueError):
+    """Raised when a rule condition cannot be parsed."""
+
+# Token kinds produced by the tokenizer.
+VAR = "VAR"
+STRING = "STRING"
+REGEX = "REGEX"
+NULL = "NULL"
+OP = "OP"
+AND = "AND"
+OR = "OR"
+LPAREN = "LPAREN"
+RPAREN = "RPAREN"
+EOF = "EOF"
+
+Token = Tuple[str, str]
+
+_VARIABLE_RE = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+_REGEX_FLAGS_RE = re.compile(r'[a-z]*')
+_NULL_RE = re.compile(r'null\b')
+
+def tokenize_condition(condition: str) -> List[Token]:
+    """
+    Split a condition string into a list of (kind, value) tokens.
+
+    Parameters:
+        condition (str): The condition text from a rule's 'if' clause.
+
+    Returns:
+        list: The tokens, terminated by an EOF token.
+
+    Raises:
+        ConditionSyntaxError: If the condition contains an unexpected character
+                              or an unterminated string or regex literal.
+    """
+    tokens: List[Token] = []
+    position = 0
+    length = len(condition)
+
+    while position < length:
+        char = condition[position]
+
+        if char.isspace():
+            position += 1
+        elif char == "$":
+            match = _VARIABLE_RE.match(condition, position)
+            if match is None:
+                raise ConditionSyntaxError(f"Invalid variable reference at position {position}")
+            tokens.append((VAR, match.group(1) or match.group(2)))
+            position = match.end()
+        elif char in "\"'":
+            end = condition.find(char, position + 1)
+            if end == -1:
+                raise ConditionSyntaxError(f"Unterminated string starting at position {position}")
+            tokens.append((STRING, condition[position + 1:end]))
+            position = end + 1
+        elif char == "/":
+            # Find the closing slash, skipping escaped characters such as '\/'.
+            end = position + 1
+            while end < length and condition[end] != "/":
+                end += 2 if condition[end] == "\\" else 1
+            if end >= length:
+                raise ConditionSyntaxError(f"Unterminated regex starting at position {position}")
+            flags_match = _REGEX_FLAGS_RE.match(condition, end + 1)
+            assert flags_match is not None
+            tokens.append((REGEX, condition[position:flags_match.end()]))
+            position = flags_match.end()
+        elif condition.startswith(("==", "!=", "=~", "!~"), position):
+            tokens.append((OP, condition[position:position + 2]))
+            position += 2
+        elif condition.startswith("&&", position):
+            tokens.append((AND, "&&"))
+            position += 2
+        elif condition.startswith("||", position):
+            tokens.append((OR, "||"))
+            position += 2
+        elif char == "(":
+            tokens.append((LPAREN, char))
+            position += 1
+        elif char == ")":
+            tokens.append((RPAREN, char))
+            position += 1
+        elif _NULL_RE.match(condition, position):
+            tokens.append((NULL, "null"))
+            position += 4
+        else:
+            raise ConditionSyntaxError(f"Unexpected character '{char}' at position {position}")
+
+    tokens.append((EOF, ""))
+    return tokens
+
+def _as_string(value: Any) -> str:
+    """Convert a variable value to the string GitLab would compare against."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+class Node:
+    """Base class for nodes of a compiled condition."""
+
+    def evaluate(self, variables: Mapping[str, Any]) -> Any:
+        raise NotImplementedError
+
+    def is_true(self, variables: Mapping[str, Any]) -> bool:
+        """Evaluate the node in a boolean context."""
+        value = self.evaluate(variables)
+        return value is not None and value != "" and value is not False
+
+class Variable(Node):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def evaluate(self, variables: Mapping[str, Any]) -> Any:
+        value = variables.get(self.name)
+        if value is None or isinstance(value, str):
+            return value
+        return str(value)
+
+class Literal(Node):
+    def __init__(self, value: Optional[str]) -> None:
+        self.value = value
+
+    def evaluate(self, variables: Mapping[str, Any]) -> Any:
+        return self.value
+
+class RegexLiteral(Node):
+    def __init__(self, literal: str) -> None:
+        self.literal = literal
+
+    def evaluate(self, variables: Mapping[str, Any]) -> Any:
+        return self.literal
+
+class Comparison(Node):
+    def __init__(self, left: Node, operator: str, right: Node) -> None:
+        self.left = left
+        self.operator = operator
+        self.right = right
+        # A pattern written in the condition is compiled once, here.
+        self.constant_pattern = operator in ("=~", "!~") and isinstance(right, (Literal, RegexLiteral))
+        self.pattern = compile_regex_literal(_as_string(right.evaluate({}))) if self.constant_pattern else None
+
+    def evaluate(self, variables: Mapping[str, Any]) -> bool:
+        left_value = self.left.evaluate(variables)
+
+        if self.operator in ("=~", "!~"):
+            if self.constant_pattern:
+                pattern = self.pattern
+            else:
+                # Patterns read from variables go through the shared rule regex cache.
+                pattern = rule_regex_cache.get_literal(_as_string(self.right.evaluate(variables)))
+            if pattern is None:
+                # An invalid pattern never matches.
+                return self.operator == "!~"
+            matched = pattern.search(_as_string(left_value)) is not None
+            return matched if self.operator == "=~" else not matched
+
+        right_value = self.right.evaluate(variables)
+        if isinstance(self.left, Literal) and self.left.value is None:
+            equal = right_value is None
+        elif isinstance(self.right, Literal) and self.right.value is None:
+            equal = left_value is None
+        else:
+            # Undefined variables compare as empty strings.
+            equal = _as_string(left_value) == _as_string(right_value)
+        return equal if self.operator == "==" else not equal
+
+    def is_true(self, variables: Mapping[str, Any]) -> bool:
+        return self.evaluate(variables)
+
+class And(Node):
+    def __init__(self, operands: List[Node]) -> None:
+        self.operands = operands
+
+    def evaluate(self, variables: Mapping[str, Any]) -> bool:
+        return all(operand.is_true(variables) for operand in self.operands)
+
+    def is_true(self, variables: Mapping[str, Any]) -> bool:
+        return self.evaluate(variables)
+
+class Or(Node):
+    def __init__(self, operands: List[Node]) -> None:
+        self.operands = operands
+
+    def evaluate(self, variables: Mapping[str, Any]) -> bool:
+        return any(operand.is_true(variables) for operand in self.operands)
+
+    def is_true(self, variables: Mapping[str, Any]) -> bool:
+        return self.evaluate(variables)
+
+class _Parser:
+    """Recursive descent parser over the token list of a single condition."""
+
+    def __init__(self, tokens: List[Token]) -> None:
+        self.tokens = tokens
+        self.position = 0
+        self.variables: set = set()
+
+    def peek(self) -> Token:
+        return self.tokens[self.position]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        kind, value = self.peek()
+        if kind != EOF:
+            raise ConditionSyntaxError(f"Unexpected token '{value}'")
+        return node
+
+    def parse_or(self) -> Node:
+        operands = [self.parse_and()]
+        while self.peek()[0] == OR:
+            self.advance()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def parse_and(self) -> Node:
+        operands = [self.parse_primary()]
+        while self.peek()[0] == AND:
+            self.advance()
+            operands.append(self.parse_primary())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def parse_primary(self) -> Node:
+        if self.peek()[0] == LPAREN:
+            self.advance()
+            node = self.parse_or()
+            if self.advance()[0] != RPAREN:
+                raise ConditionSyntaxError("Missing closing parenthesis")
+            return node
+
+        left = self.parse_operand()
+        if self.peek()[0] != OP:
+            return left
+        operator = self.advance()[1]
+        right = self.parse_operand()
+        return Comparison(left, operator, right)
+
+    def parse_operand(self) -> Node:
+        kind, value = self.advance()
+        if kind == VAR:
+            self.variables.add(value)
+            return Variable(value)
+        if kind == STRING:
+            return Literal(value)
+        if kind == NULL:
+            return Literal(None)
+        if kind == REGEX:
+            return RegexLiteral(value)
+        if kind == EOF:
+            raise ConditionSyntaxError("Unexpected end of condition")
+        raise ConditionSyntaxError(f"Unexpected token '{value}'")
+
+class CompiledCondition:
+    """
+    A parsed rule condition that can be evaluated repeatedly.
+
+    Attributes:
+        text (str): The original condition string.
+        variables (frozenset): Names of all variables the condition references.
+    """
+
+    def __init__(self, text: str, root: Node, variables: FrozenSet[str]) -> None:
+        self.text = text
+        self.root = root
+        self.variables = variables
+
+    def evaluate(self, variables: Mapping[str, Any]) -> bool:
+        """Evaluate the condition against a variables mapping."""
+        return self.root.is_true(variables)
+
+    __call__ = evaluate
+
+    def __repr__(self) -> str:
+        return f"CompiledCondition({self.text!r})"
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def compile_condition(condition: str) -> CompiledCondition:
+    """
+    Parse a condition string into a CompiledCondition.
+
+    Results are cached by condition text, so rules shared between many jobs
+    are only parsed once.
+
+    Parameters:
+        condition (str): The condition text from a rule's 'if' clause.
+
+    Returns:
+        CompiledCondition: The compiled predicate.
+
+    Raises:
+        ConditionSyntaxError: If the condition is not valid GitLab CI syntax.
+    """
+    parser = _Parser(tokenize_condition(condition))
+    root = parser.parse()
+    return CompiledCondition(condition, root, frozenset(parser.variables))
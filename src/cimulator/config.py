@@ -1,5 +1,5 @@
 import yaml
-from cimulator.types import ConfigDict
+from cimulator.types import ConfigDict, VariablesDict
 
 def load_simulation_config(file_path: str) -> ConfigDict:
     """
@@ -16,3 +16,21 @@ def load_simulation_config(file_path: str) -> ConfigDict:
     with open(file_path, 'r') as f:
         config = yaml.safe_load(f) or {}
     return config
+
+def get_profile_variables(sim_config: ConfigDict, profile: str) -> VariablesDict:
+    """
+    Get the variables of a profile from a simulation configuration.
+
+    Parameters:
+        sim_config (dict): The simulation configuration dictionary.
+        profile (str): Name of the profile.
+
+    Returns:
+        dict: The profile's variables.
+
+    Raises:
+        ValueError: If the profile is not defined in the configuration.
+    """
+    if profile not in sim_config:
+        raise ValueError(f"'{profile}' is not a valid key in the simulation configuration file. Expected keys: {list(sim_config.keys())}")
+    return sim_config.get(profile, {})
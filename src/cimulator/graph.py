@@ -0,0 +1,76 @@
+"""
+Graph helpers shared by the dependency-ordered parts of the simulator.
+
+Variable references and job 'extends' both form dependency graphs that must be
+processed dependencies-first while reporting circular references.
+"""
+
+from typing import Dict, List, Mapping, Sequence, Set
+
+def strongly_connected_components(dependencies: Mapping[str, Sequence[str]]) -> List[List[str]]:
+    """
+    Group the nodes of a dependency graph into strongly connected components.
+
+    Uses an iterative version of Tarjan's algorithm, so deep dependency chains
+    do not hit the recursion limit.
+
+    Parameters:
+        dependencies (dict): Maps every node to the nodes it depends on. Every
+                             dependency must itself be a key of the mapping.
+
+    Returns:
+        list: Groups of nodes, each group listed after every group it depends
+              on. Members of a group are in the mapping's key order. A group
+              with more than one node (or a node depending on itself) is a cycle.
+    """
+    position_of = {node: position for position, node in enumerate(dependencies)}
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    groups: List[List[str]] = []
+    counter = 0
+
+    for root in dependencies:
+        if root in index:
+            continue
+        # Each frame is (node, position of the next dependency to visit).
+        work = [(root, 0)]
+        while work:
+            node, position = work.pop()
+            if position == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+
+            deps = dependencies[node]
+            descended = False
+            while position < len(deps):
+                dep = deps[position]
+                position += 1
+                if dep not in index:
+                    work.append((node, position))
+                    work.append((dep, 0))
+                    descended = True
+                    break
+                if dep in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dep])
+            if descended:
+                continue
+
+            if lowlink[node] == index[node]:
+                group = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    group.append(member)
+                    if member == node:
+                        break
+                group.sort(key=position_of.__getitem__)
+                groups.append(group)
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+    return groups
@@ -0,0 +1,247 @@
+"""
+Incremental re-simulation of a pipeline.
+
+Each run stores, in a local cache directory (as JSON, see cimulator.serialization):
+  - a fingerprint of every source file (the CI files and the simulation config),
+    and the included files that did not exist,
+  - for every job, a fingerprint of its expanded definition, the exact set of
+    pipeline-level variables its simulation read (with their values), and its
+    simulation result.
+
+On the next run, if no source file changed the previous summary is reused as
+a whole. Otherwise the configuration is reloaded and expanded, and only jobs
+whose definition or read variables changed are simulated again.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cimulator import serialization
+from cimulator.types import ConfigDict, JobDict, JobSourcesDict, VariablesMapping
+from cimulator.loader import load_and_resolve, extract_jobs
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.config import load_simulation_config, get_profile_variables
+from cimulator.validator import detect_duplicate_jobs
+from cimulator.variable_reads import RecordingMapping, reads_match
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the cached state, or the meaning of the results it holds, changes.
+CACHE_FORMAT_VERSION = 4
+
+DEFAULT_CACHE_DIR = ".cimulator_cache"
+
+def fingerprint_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_data(data: Any) -> str:
+    """Return the SHA-256 hex digest of a (picklable) data structure."""
+    return hashlib.sha256(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+class JobResultCache:
+    """
+    Per-job simulation results keyed by job definition and read variables.
+
+    Attributes:
+        entries (dict): Maps job names to their cached entry.
+        reused (int): Number of jobs whose result was reused in this run.
+        simulated (int): Number of jobs simulated in this run.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.entries = entries if entries is not None else {}
+        self.reused = 0
+        self.simulated = 0
+        self._seen: set = set()
+
+    def simulate(self, job_name: str, job: JobDict, simulation_variables: VariablesMapping,
+                 simulate_job: Callable[[str, JobDict, VariablesMapping], ConfigDict]) -> ConfigDict:
+        """
+        Return the cached result of a job, or simulate it and cache the result.
+
+        Parameters:
+            job_name (str): Name of the job.
+            job (dict): The expanded job definition.
+            simulation_variables (mapping): Global variables merged with the workflow variables.
+            simulate_job (callable): Function simulating a single job
+                                     (see simulation_engine.simulate_job).
+
+        Returns:
+            dict: The job's simulation result.
+        """
+        self._seen.add(job_name)
+        definition = fingerprint_data(job)
+        entry = self.entries.get(job_name)
+        if (entry is not None and entry["definition"] == definition and entry["reads"] is not None
+                and reads_match(entry["reads"], simulation_variables)):
+            self.reused += 1
+            return entry["result"]
+
+        recorder = RecordingMapping(simulation_variables)
+        result = simulate_job(job_name, job, recorder)
+        self.entries[job_name] = {
+            "definition": definition,
+            "reads": None if recorder.read_all else recorder.reads,
+            "result": result,
+        }
+        self.simulated += 1
+        return result
+
+    def prune(self) -> None:
+        """Drop entries of jobs that were not part of the current run."""
+        self.entries = {name: entry for name, entry in self.entries.items() if name in self._seen}
+
+class IncrementalState:
+    """
+    State of the previous run of a given CI file, simulation config and profile.
+
+    Attributes:
+        files (dict): Maps source file paths to their content fingerprint, or
+                      to None for included files that did not exist.
+        summary (dict): The simulation summary of the previous run.
+        duplicate_warnings (list): Duplicate job warnings of the previous run.
+        job_sources (dict): Source file of each job in the previous run.
+        job_cache (JobResultCache): Per-job results of the previous run.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.files: Dict[str, Optional[str]] = {}
+        self.summary: Optional[ConfigDict] = None
+        self.duplicate_warnings: List[str] = []
+        self.job_sources: JobSourcesDict = {}
+        self.job_cache = JobResultCache()
+
+    @classmethod
+    def load(cls, path: str) -> "IncrementalState":
+        """Load the state stored at path, or return an empty state."""
+        state = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = serialization.loads(f.read())
+        except FileNotFoundError:
+            return state
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable incremental cache {path}: {e}")
+            return state
+        if not isinstance(data, dict) or data.get("version") != CACHE_FORMAT_VERSION:
+            logger.debug(f"Ignoring incremental cache {path} with a different format version")
+            return state
+        try:
+            state.files = data["files"]
+            state.summary = data["summary"]
+            state.duplicate_warnings = data["duplicate_warnings"]
+            state.job_sources = data["job_sources"]
+            state.job_cache = JobResultCache(data["jobs"])
+        except KeyError as e:
+            logger.warning(f"Ignoring incomplete incremental cache {path}: missing {e}")
+            return cls(path)
+        return state
+
+    def save(self) -> None:
+        """Write the state to its cache file atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "version": CACHE_FORMAT_VERSION,
+            "files": self.files,
+            "summary": self.summary,
+            "duplicate_warnings": self.duplicate_warnings,
+            "job_sources": self.job_sources,
+            "jobs": self.job_cache.entries,
+        }
+        try:
+            text = serialization.dumps(data)
+        except TypeError as e:
+            logger.warning(f"Not saving the incremental cache {self.path}: {e}")
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, self.path)
+
+    def files_unchanged(self) -> bool:
+        """Check whether every source file of the previous run is unchanged and no missing include appeared."""
+        if not self.files:
+            return False
+        for path, fingerprint in self.files.items():
+            if fingerprint is None:
+                if os.path.exists(path):
+                    return False
+                continue
+            try:
+                if fingerprint_file(path) != fingerprint:
+                    return False
+            except OSError:
+                return False
+        return True
+
+def simulate_incremental(ci_file: str, simulation_config_file: str, profile: str,
+                         cache_dir: str = DEFAULT_CACHE_DIR,
+                         include_workers: int = 1,
+                         job_results: Optional[Dict[str, ConfigDict]] = None,
+                         job_sources: Optional[JobSourcesDict] = None) -> Tuple[ConfigDict, List[str]]:
+    """
+    Simulate a pipeline, reusing the results of the previous run where possible.
+
+    Parameters:
+        ci_file (str): Path to the root .gitlab-ci.yml file.
+        simulation_config_file (str): Path to the simulation configuration file.
+        profile (str): Name of the profile in the simulation configuration.
+        cache_dir (str): Directory where the state of previous runs is stored.
+        include_workers (int): Number of threads loading the include tree.
+        job_results (dict): Optional dictionary filled in place with the
+                            simulate_job() result of every job.
+        job_sources (dict): Optional dictionary filled in place with the
+                            source file of every job.
+
+    Returns:
+        tuple: (simulation_summary, duplicate_warnings)
+    """
+    ci_file = os.path.abspath(ci_file)
+    simulation_config_file = os.path.abspath(simulation_config_file)
+    key = fingerprint_data((ci_file, simulation_config_file, profile))[:16]
+    state = IncrementalState.load(os.path.join(cache_dir, f"simulate-{key}.json"))
+
+    if state.summary is not None and state.files_unchanged():
+        logger.info("No source file changed since the last run; reusing the previous simulation.")
+        if job_results is not None:
+            job_results.update((name, entry["result"]) for name, entry in state.job_cache.entries.items())
+        if job_sources is not None:
+            job_sources.update(state.job_sources)
+        return state.summary, state.duplicate_warnings
+
+    loaded_files: List[str] = []
+    missing_files: List[str] = []
+    ci_config, sources = load_and_resolve(ci_file, loaded_files, workers=include_workers,
+                                          missing_files=missing_files)
+    jobs = extract_jobs(ci_config)
+    duplicate_warnings = detect_duplicate_jobs(jobs, sources)
+    if job_sources is not None:
+        job_sources.update(sources)
+
+    sim_config = load_simulation_config(simulation_config_file)
+    profile_vars = get_profile_variables(sim_config, profile)
+    global_vars = {**ci_config.get("variables", {}), **profile_vars}
+
+    summary = simulate_pipeline(jobs, ci_config.get("workflow", {}), global_vars, job_cache=state.job_cache,
+                                job_results=job_results)
+    logger.info(f"Incremental simulation: reused {state.job_cache.reused} of "
+                f"{state.job_cache.reused + state.job_cache.simulated} jobs")
+
+    state.job_cache.prune()
+    state.files = {path: fingerprint_file(path) for path in loaded_files + [simulation_config_file]}
+    # An include that appears later changes the configuration as much as an edited file.
+    state.files.update((path, None) for path in missing_files if path not in state.files)
+    state.summary = summary
+    state.duplicate_warnings = duplicate_warnings
+    state.job_sources = sources
+    state.save()
+    return summary, duplicate_warnings
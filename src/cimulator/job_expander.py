@@ -1,10 +1,17 @@
 # src/cimulator/job_expander.py
 
-from typing import Set, Optional
+import copy
+import logging
+from typing import Dict, List, Set, Optional
 from cimulator.types import JobDict
-from cimulator.loader import merge_dicts
+from cimulator.loader import merge_dicts, merge_dicts_shared
+from cimulator.graph import strongly_connected_components
 
-def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None, visited: Optional[Set[str]] = None) -> JobDict:
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None, visited: Optional[Set[str]] = None,
+               shared: bool = False) -> JobDict:
     """
     Recursively expand a job definition using the "extends" mechanism.
 
@@ -13,6 +20,11 @@ def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None
         all_jobs (dict): A dictionary of all job definitions.
         cache (dict): A cache to store already expanded jobs.
         visited (set): A set to detect circular dependencies.
+        shared (bool): If True, nothing is deep-copied: expanded ancestors are
+                       materialized once in the cache and reused as-is, and each
+                       job only adds new dictionaries where it overrides them
+                       (see merge_dicts_shared). The result shares structure with
+                       all_jobs and other expanded jobs and must not be modified.
 
     Returns:
         dict: The expanded job definition.
@@ -26,8 +38,9 @@ def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None
         visited = set()
 
     if job_name in cache:
+        if shared:
+            return cache[job_name]
         # Return a deep copy to avoid sharing references between jobs
-        import copy
         return copy.deepcopy(cache[job_name])
 
     if job_name in visited:
@@ -35,21 +48,25 @@ def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None
 
     visited.add(job_name)
 
-    # Make a deep copy to avoid modifying the original job.
-    import copy
     job_def = all_jobs[job_name]
     if not isinstance(job_def, dict):
         raise Exception(f"Job definition for '{job_name}' is not a dictionary: {type(job_def).__name__}")
-    job = copy.deepcopy(job_def)
+    if shared:
+        # Only the top level is copied so that 'extends' can be dropped.
+        job = {key: value for key, value in job_def.items() if key != 'extends'}
+        extends_field = job_def.get('extends')
+    else:
+        # Make a deep copy to avoid modifying the original job.
+        job = copy.deepcopy(job_def)
+        extends_field = job.pop('extends', None)
 
     # If there is no "extends", the job is already fully defined.
-    if 'extends' not in job:
+    if 'extends' not in job_def:
         cache[job_name] = job
         visited.remove(job_name)
         return job
 
     # Process the extends field (which can be a string or a list)
-    extends_field = job.pop('extends')
     if not isinstance(extends_field, list):
         extends_field = [extends_field]
 
@@ -59,27 +76,163 @@ def expand_job(job_name: str, all_jobs: JobDict, cache: Optional[JobDict] = None
         if parent_name not in all_jobs:
             raise Exception(f"Parent job '{parent_name}' not found for job '{job_name}'")
         # Recursively expand parent job
-        parent_expanded = expand_job(parent_name, all_jobs, cache, visited)
+        parent_expanded = expand_job(parent_name, all_jobs, cache, visited, shared)
         # Merge parent's values into the accumulating parent configuration.
-        merged_parent = merge_dicts(merged_parent, copy.deepcopy(parent_expanded))
+        if shared:
+            merged_parent = merge_dicts_shared(merged_parent, parent_expanded)
+        else:
+            merged_parent = merge_dicts(merged_parent, copy.deepcopy(parent_expanded))
 
     # Merge the current job over the merged parent's values.
-    merged = merge_dicts(merged_parent, job)
+    if shared:
+        merged = merge_dicts_shared(merged_parent, job)
+    else:
+        merged = merge_dicts(merged_parent, job)
     cache[job_name] = merged
     visited.remove(job_name)
     return merged
 
-def expand_all_jobs(all_jobs: JobDict) -> JobDict:
+def _normalize_extends(job_def: JobDict) -> List[str]:
+    """Return the 'extends' field of a job definition as a list."""
+    extends_field = job_def.get('extends')
+    if extends_field is None:
+        return []
+    if not isinstance(extends_field, list):
+        return [extends_field]
+    return extends_field
+
+def build_extends_graph(all_jobs: JobDict) -> Dict[str, List[str]]:
+    """
+    Build the 'extends' graph of all job definitions.
+
+    Parameters:
+        all_jobs (dict): A dictionary mapping job names to job definitions.
+
+    Returns:
+        dict: Maps each job name to the list of parents it extends, in order.
+
+    Raises:
+        Exception: If a job definition is not a dictionary or a parent job is missing.
+    """
+    graph = {}
+    for job_name, job_def in all_jobs.items():
+        if not isinstance(job_def, dict):
+            raise Exception(f"Job definition for '{job_name}' is not a dictionary: {type(job_def).__name__}")
+        parents = _normalize_extends(job_def)
+        for parent_name in parents:
+            if parent_name not in all_jobs:
+                raise Exception(f"Parent job '{parent_name}' not found for job '{job_name}'")
+        graph[job_name] = parents
+    return graph
+
+def find_extends_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Find every circular 'extends' dependency in an extends graph.
+
+    Parameters:
+        graph (dict): Extends graph as returned by build_extends_graph().
+
+    Returns:
+        list: One list of job names per cycle; empty if there are no cycles.
+    """
+    return _cycle_groups(strongly_connected_components(graph), graph)
+
+def _cycle_groups(groups: List[List[str]], graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Select the strongly connected components of an extends graph that are cycles."""
+    return [group for group in groups if len(group) > 1 or group[0] in graph[group[0]]]
+
+def log_expansion_stats(stats: Dict[str, Dict[str, int]], top: int = 5) -> None:
+    """
+    Log a summary of the statistics filled in by expand_all_jobs() at debug level.
+
+    Parameters:
+        stats (dict): The per-job expansion statistics.
+        top (int): Number of the deepest jobs listed.
+    """
+    deepest = sorted(stats.items(), key=lambda item: (-item[1]["depth"], item[0]))[:top]
+    logger.debug(f"Expanded {len(stats)} jobs: max extends depth {deepest[0][1]['depth']}, "
+                 f"{sum(job_stats['ancestors'] for job_stats in stats.values())} ancestors merged in total")
+    for job_name, job_stats in deepest:
+        logger.debug(f"  depth {job_stats['depth']}, {job_stats['parents']} parents, "
+                     f"{job_stats['ancestors']} ancestors: {job_name}")
+
+def expand_all_jobs(all_jobs: JobDict, shared: bool = False, stats: Optional[Dict[str, Dict[str, int]]] = None,
+                    previous: Optional[JobDict] = None) -> JobDict:
     """
     Expand all job definitions contained in all_jobs.
 
+    The 'extends' graph is built once and jobs are expanded in topological
+    order (parents before children), so every job is expanded exactly once
+    and each child merges its already expanded parents.
+
     Parameters:
         all_jobs (dict): A dictionary mapping job names to job definitions.
+        shared (bool): If True, expand with structural sharing (see expand_job);
+                       the returned jobs must not be modified. Otherwise every
+                       expanded job is an independent deep copy.
+        stats (dict): Optional dictionary filled in place with expansion
+                      statistics for each job: 'depth' (length of the longest
+                      extends chain above the job), 'parents' (number of jobs
+                      it extends directly) and 'ancestors' (number of distinct
+                      jobs merged into it). With debug logging on, the
+                      statistics are computed in any case and summarized in
+                      the log.
+        previous (dict): Optional jobs expanded (in shared mode) by an earlier
+                         call whose definitions and ancestors did not change
+                         since; they are reused as-is instead of being merged
+                         again. A job extending a job left out of it must be
+                         left out too.
 
     Returns:
-        dict: A dictionary of expanded job definitions.
+        dict: A dictionary of expanded job definitions, in the order of all_jobs.
+
+    Raises:
+        Exception: If a parent job is missing, or listing every job involved in
+                   a circular dependency when there are any.
     """
-    expanded = {}
-    for job_name in all_jobs:
-        expanded[job_name] = expand_job(job_name, all_jobs)
-    return expanded
+    graph = build_extends_graph(all_jobs)
+    groups = strongly_connected_components(graph)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if stats is None and debug:
+        stats = {}
+
+    cycles = _cycle_groups(groups, graph)
+    if cycles:
+        description = "; ".join(" -> ".join(cycle + [cycle[0]]) for cycle in cycles)
+        raise Exception(f"Circular dependency detected for jobs: {description}")
+
+    expanded_shared: JobDict = {}
+    depths: Dict[str, int] = {}
+    ancestors: Dict[str, Set[str]] = {}
+    for (job_name,) in groups:
+        parents = graph[job_name]
+        if previous is not None and job_name in previous:
+            expanded_shared[job_name] = previous[job_name]
+        else:
+            job = {key: value for key, value in all_jobs[job_name].items() if key != 'extends'}
+            merged_parent: JobDict = {}
+            for parent_name in parents:
+                merged_parent = merge_dicts_shared(merged_parent, expanded_shared[parent_name])
+            expanded_shared[job_name] = merge_dicts_shared(merged_parent, job) if parents else job
+
+        if stats is not None:
+            depths[job_name] = 1 + max(depths[parent] for parent in parents) if parents else 0
+            job_ancestors: Set[str] = set()
+            for parent_name in parents:
+                job_ancestors.add(parent_name)
+                job_ancestors |= ancestors[parent_name]
+            ancestors[job_name] = job_ancestors
+
+    if stats is not None:
+        for job_name in all_jobs:
+            stats[job_name] = {
+                "depth": depths[job_name],
+                "parents": len(graph[job_name]),
+                "ancestors": len(ancestors[job_name]),
+            }
+        if debug and stats:
+            log_expansion_stats(stats)
+
+    if shared:
+        return {job_name: expanded_shared[job_name] for job_name in all_jobs}
+    return {job_name: copy.deepcopy(expanded_shared[job_name]) for job_name in all_jobs}
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
 import os
+import time
 import yaml
 import logging
-from typing import List, Union, Optional, Tuple, Set, Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Union, Optional, Tuple, Set, Any
 from cimulator.types import ConfigDict, JobDict, JobSourcesDict, JobOccurrencesDict
+from cimulator.parse_cache import yaml_parse_cache
+from cimulator.profiling import phase, profiling_enabled, record_item
 
 # Get a logger for this module
 logger = logging.getLogger(__name__)
@@ -67,16 +71,166 @@ def reference_constructor(loader: yaml.SafeLoader, node: yaml.Node) -> Any:
             # Handle other node types safely
             return str(node)
 
+# Use the libyaml-based loader when PyYAML was built with it; it parses the
+# same documents several times faster than the pure-Python SafeLoader.
+try:
+    from yaml import CSafeLoader as _BaseLoader
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as _BaseLoader  # type: ignore[assignment]
+    YAML_BACKEND = "python"
+
 # Create a custom YAML loader that includes our constructor
-class GitLabCILoader(yaml.SafeLoader):
+class GitLabCILoader(_BaseLoader):  # type: ignore[misc, valid-type]
     pass
 
 # Register the constructor with our custom loader
 GitLabCILoader.add_constructor('!reference', reference_constructor)
 
+def _describe_reference(path_components: Tuple[Any, ...]) -> str:
+    return ".".join(str(component) for component in path_components)
+
+class ReferenceResolver:
+    """
+    Resolves every !reference tag of a document in a single pass.
+
+    Each distinct reference path is resolved once and memoized. A referenced
+    value is fully resolved before it is used, so references to values that
+    themselves contain (or are) references work to any depth, and circular
+    references are reported instead of producing partially resolved values.
+    Lists containing references are rebuilt once, so flattening referenced
+    lists into them takes linear time.
+
+    Resolved values are shared with the referenced location, not copied.
+
+    Attributes:
+        references (dict): Maps each top-level key whose value contains
+                           references to the top-level keys they point to.
+    """
+
+    def __init__(self, document: ConfigDict) -> None:
+        self.document = document
+        self.references: Dict[str, Set[str]] = {}
+        # Top-level keys whose values are being resolved, innermost last.
+        self._owners: List[Any] = []
+        # Resolved values, keyed by reference path.
+        self._resolved: Dict[Tuple[Any, ...], Any] = {}
+        # Reference paths being resolved, innermost last, to detect cycles.
+        self._resolving: List[Tuple[Any, ...]] = []
+        # Ids of containers whose references are resolved or being resolved.
+        self._done: Set[int] = set()
+        self._in_progress: Set[int] = set()
+
+    def resolve(self, obj: Any) -> Any:
+        """Resolve all references in obj (in place) and return it."""
+        if isinstance(obj, ReferenceTag):
+            return self.resolve_tag(obj)
+        self._resolve_container(obj)
+        return obj
+
+    def resolve_tag(self, tag: ReferenceTag) -> Any:
+        """
+        Return the fully resolved value referenced by a tag.
+
+        Raises:
+            ValueError: If the reference path is invalid or circular.
+        """
+        key = tuple(tag.path_components)
+        if self._owners and key:
+            self.references.setdefault(self._owners[-1], set()).add(key[0])
+        if key in self._resolved:
+            return self._resolved[key]
+        if key in self._resolving:
+            cycle = self._resolving[self._resolving.index(key):] + [key]
+            raise ValueError(f"Circular !reference: {' -> '.join(_describe_reference(path) for path in cycle)}")
+
+        self._resolving.append(key)
+        # The referenced value lies within the top-level key the path starts with.
+        self._owners.append(key[0] if key else None)
+        try:
+            value = self._navigate(tag.path_components)
+            self._resolve_container(value)
+        finally:
+            self._owners.pop()
+            self._resolving.pop()
+        self._resolved[key] = value
+        return value
+
+    def _navigate(self, path_components: List[Union[str, int]]) -> Any:
+        """Find the value at a reference path, resolving references met on the way."""
+        current: Any = self.document
+        anchor_name = path_components[0]
+
+        # First, find the node with the given name
+        if isinstance(anchor_name, str):
+            if anchor_name not in self.document:
+                logger.warning(f"Unknown reference target: {anchor_name}")
+                return None
+            current = self.document[anchor_name]
+
+        # Navigate through the remaining path components
+        for component in path_components[1:]:
+            if isinstance(current, ReferenceTag):
+                current = self.resolve_tag(current)
+            if isinstance(current, dict) and isinstance(component, str) and component in current:
+                current = current[component]
+            elif isinstance(current, list) and isinstance(component, int) and 0 <= component < len(current):
+                current = current[component]
+            else:
+                raise ValueError(f"Invalid reference path: {path_components}")
+
+        if isinstance(current, ReferenceTag):
+            current = self.resolve_tag(current)
+        return current
+
+    def _resolve_container(self, obj: Any) -> None:
+        """Replace the references inside a dict or list, recursively and in place."""
+        if not isinstance(obj, (dict, list)):
+            return
+        obj_id = id(obj)
+        if obj_id in self._done:
+            return
+        if obj_id in self._in_progress:
+            raise ValueError(f"Circular !reference: {_describe_reference(self._resolving[-1])} contains itself"
+                             if self._resolving else "Circular !reference")
+        self._in_progress.add(obj_id)
+
+        if isinstance(obj, dict):
+            top_level = obj is self.document
+            for key, value in obj.items():
+                if top_level:
+                    self._owners.append(key)
+                if isinstance(value, ReferenceTag):
+                    obj[key] = self.resolve_tag(value)
+                else:
+                    self._resolve_container(value)
+                if top_level:
+                    self._owners.pop()
+        else:
+            if any(isinstance(item, ReferenceTag) for item in obj):
+                items: List[Any] = []
+                for item in obj:
+                    if isinstance(item, ReferenceTag):
+                        resolved_item = self.resolve_tag(item)
+                        # A referenced list is flattened into the parent list.
+                        if isinstance(resolved_item, list):
+                            items.extend(resolved_item)
+                        else:
+                            items.append(resolved_item)
+                    else:
+                        self._resolve_container(item)
+                        items.append(item)
+                obj[:] = items
+            else:
+                for item in obj:
+                    self._resolve_container(item)
+
+        self._in_progress.discard(obj_id)
+        self._done.add(obj_id)
+
 def resolve_references(obj: Any, document: ConfigDict) -> Any:
     """
-    Recursively resolve all ReferenceTag objects in the given object.
+    Resolve all ReferenceTag objects in the given object.
 
     Args:
         obj: The object to process (dict, list, or scalar)
@@ -85,30 +239,7 @@ def resolve_references(obj: Any, document: ConfigDict) -> Any:
     Returns:
         The object with all references resolved
     """
-    if isinstance(obj, dict):
-        for key, value in list(obj.items()):
-            obj[key] = resolve_references(value, document)
-    elif isinstance(obj, list):
-        i = 0
-        while i < len(obj):
-            item = obj[i]
-            resolved_item = resolve_references(item, document)
-            
-            # If the resolved item is a list and the original item was a ReferenceTag,
-            # flatten the resolved list into the parent list
-            if isinstance(item, ReferenceTag) and isinstance(resolved_item, list):
-                # Remove the current item and insert all elements from resolved_item
-                obj.pop(i)
-                for j, subitem in enumerate(resolved_item):
-                    obj.insert(i + j, subitem)
-                # Move index forward by the number of items we inserted
-                i += len(resolved_item)
-            else:
-                obj[i] = resolved_item
-                i += 1
-    elif isinstance(obj, ReferenceTag):
-        return obj.resolve(document)
-    return obj
+    return ReferenceResolver(document).resolve(obj)
 
 def ensure_script_items_are_strings(config: ConfigDict) -> ConfigDict:
     """
@@ -137,7 +268,8 @@ def ensure_script_items_are_strings(config: ConfigDict) -> ConfigDict:
                 # Process each script item
                 for i, item in enumerate(value["script"]):
                     # If the item is not a string, convert it to a string
-                    if not isinstance(item, str):
+                    # (references are flattened into the script later)
+                    if not isinstance(item, (str, ReferenceTag)):
                         if isinstance(item, dict):
                             if len(item) == 1:
                                 # Convert dictionary to "key: value" string format
@@ -155,20 +287,30 @@ def ensure_script_items_are_strings(config: ConfigDict) -> ConfigDict:
 
     return config
 
+def parse_yaml(content: Union[str, bytes]) -> ConfigDict:
+    """
+    Parse the content of a GitLab CI YAML file.
+    If the content is empty, return an empty dictionary.
+    Uses a custom loader that supports GitLab CI-specific YAML tags.
+    """
+    document = yaml.load(content, Loader=GitLabCILoader) or {}
+    # Ensure all script items are strings
+    document = ensure_script_items_are_strings(document)
+    return document
+
 def load_yaml(file_path: str) -> ConfigDict:
     """
     Load a YAML file and return its contents as a dictionary.
     If the file is empty, return an empty dictionary.
     Uses a custom loader that supports GitLab CI-specific YAML tags.
 
+    Parsed documents are cached (see cimulator.parse_cache), so a file included
+    several times is only parsed once. Every call returns a new document.
+
     Note: This function does NOT resolve !reference tags. References will be
     resolved later, after all includes are processed and jobs are expanded.
     """
-    with open(file_path, 'r') as f:
-        document = yaml.load(f, Loader=GitLabCILoader) or {}
-        # Ensure all script items are strings
-        document = ensure_script_items_are_strings(document)
-        return document
+    return yaml_parse_cache.load(file_path, parse_yaml)
 
 def merge_dicts(base: ConfigDict, incoming: ConfigDict) -> ConfigDict:
     """
@@ -184,6 +326,27 @@ def merge_dicts(base: ConfigDict, incoming: ConfigDict) -> ConfigDict:
             base[key] = value
     return base
 
+def merge_dicts_shared(base: ConfigDict, incoming: ConfigDict) -> ConfigDict:
+    """
+    Merge two dictionaries like merge_dicts(), without modifying either of them.
+
+    Only the dictionaries along the merged paths are new; every value the merge
+    does not touch is shared with the inputs instead of being copied. The
+    result must therefore be treated as read-only.
+    """
+    if not incoming:
+        return base
+    if not base:
+        return incoming
+    merged = dict(base)
+    for key, value in incoming.items():
+        current = merged.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = merge_dicts_shared(current, value)
+        else:
+            merged[key] = value
+    return merged
+
 def track_job_sources(config: ConfigDict, current_file: str,
                      job_sources: Optional[JobSourcesDict] = None,
                      all_job_occurrences: Optional[JobOccurrencesDict] = None) -> None:
@@ -218,11 +381,30 @@ def track_job_sources(config: ConfigDict, current_file: str,
                 all_job_occurrences[key] = []
             all_job_occurrences[key].append(current_file)
 
+def get_include_path(include: Any, base_path: str) -> Optional[str]:
+    """
+    Return the path of the file referenced by an 'include' entry.
+
+    Parameters:
+        include: An entry of the 'include' key: a path string, or a dictionary with a 'local' key.
+        base_path (str): The directory relative paths are resolved against.
+
+    Returns:
+        str: The normalized path, or None for unsupported include formats.
+    """
+    if isinstance(include, str):
+        return os.path.normpath(os.path.join(base_path, include))
+    if isinstance(include, dict) and "local" in include:
+        return os.path.normpath(os.path.join(base_path, include["local"]))
+    return None
+
 def resolve_includes(config: ConfigDict, base_path: str,
                     root_path: Optional[str] = None, depth: int = 0,
                     current_file: Optional[str] = None,
                     job_sources: Optional[JobSourcesDict] = None,
-                    all_job_occurrences: Optional[JobOccurrencesDict] = None) -> ConfigDict:
+                    all_job_occurrences: Optional[JobOccurrencesDict] = None,
+                    loaded_files: Optional[List[str]] = None,
+                    missing_files: Optional[List[str]] = None) -> ConfigDict:
     """
     Recursively resolve and merge included YAML files.
     The 'include' key in the YAML file can be a string (for a single include),
@@ -236,6 +418,10 @@ def resolve_includes(config: ConfigDict, base_path: str,
         current_file (str): Path to the current file being processed.
         job_sources (dict): Dictionary to track which file each job comes from.
         all_job_occurrences (dict): Dictionary to track all occurrences of each job.
+        loaded_files (list): Optional list to which the path of every included
+                             file is appended as it is loaded.
+        missing_files (list): Optional list to which the path of every included
+                              file that does not exist is appended.
 
     Returns:
         dict: The configuration with all includes resolved and merged.
@@ -269,16 +455,15 @@ def resolve_includes(config: ConfigDict, base_path: str,
     for inc in includes:
         try:
             # Determine the file path for the include.
-            if isinstance(inc, str):
-                include_path = os.path.normpath(os.path.join(base_path, inc))
-            elif isinstance(inc, dict) and "local" in inc:
-                include_path = os.path.normpath(os.path.join(base_path, inc["local"]))
-            else:
+            include_path = get_include_path(inc, base_path)
+            if include_path is None:
                 # Unsupported include format, you might want to raise an error or skip.
                 continue
 
             # Load the included YAML file.
             included_config = load_yaml(include_path)
+            if loaded_files is not None:
+                loaded_files.append(include_path)
 
             # Recursively resolve includes in the included file.
             # Always use the root path for resolving nested includes
@@ -289,23 +474,117 @@ def resolve_includes(config: ConfigDict, base_path: str,
                 depth + 1,
                 include_path,
                 job_sources,
-                all_job_occurrences
+                all_job_occurrences,
+                loaded_files,
+                missing_files
             )
 
             # Merge the included configuration into the current configuration.
             merge_dicts(config, included_config)
         except Exception as e:
+            if isinstance(e, FileNotFoundError) and missing_files is not None:
+                missing_files.append(include_path)
             logger.warning(f"Error processing include {inc}: {e}")
             # Continue with other includes even if one fails
 
     return config
 
-def load_and_resolve(file_path: str) -> Tuple[ConfigDict, JobSourcesDict]:
+def _load_timed(file_path: str) -> Tuple[ConfigDict, Dict[str, Any]]:
+    """Load a YAML file through the parse cache, measuring the load and parse times."""
+    parse_seconds = 0.0
+
+    def timed_parse(content: bytes) -> ConfigDict:
+        nonlocal parse_seconds
+        start = time.perf_counter()
+        try:
+            return parse_yaml(content)
+        finally:
+            parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    document = yaml_parse_cache.load(file_path, timed_parse)
+    return document, {
+        "path": file_path,
+        "seconds": time.perf_counter() - start,
+        "parse_seconds": parse_seconds,
+    }
+
+def discover_includes(file_path: str, workers: int = 8) -> Dict[str, Dict[str, Any]]:
+    """
+    Load every file of an include tree concurrently.
+
+    The include graph is walked breadth-first: each file is loaded on a thread
+    pool as soon as a loaded file includes it, and each distinct file is loaded
+    once. The documents end up in the YAML parse cache, so that the serial
+    merge done by resolve_includes() afterwards, in GitLab's order, does not
+    parse them again. Files that fail to load are skipped here; the merge
+    reports them.
+
+    Parameters:
+        file_path (str): Path to the root .gitlab-ci.yml file.
+        workers (int): Number of loading threads.
+
+    Returns:
+        dict: Maps the path of each loaded file to its timings:
+              - path: The file path.
+              - seconds: Wall time spent loading the file.
+              - parse_seconds: Time spent parsing it (0 when it came from the parse cache).
+    """
+    root_file = os.path.abspath(file_path)
+    # Nested includes are resolved relative to the root directory, as in resolve_includes().
+    root_path = os.path.dirname(root_file)
+    timings: Dict[str, Dict[str, Any]] = {}
+    seen = {root_file}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(_load_timed, root_file): root_file}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    document, timings[path] = future.result()
+                except Exception as e:
+                    logger.debug(f"Could not preload {path}: {e}")
+                    continue
+
+                includes = document.get("include", []) if isinstance(document, dict) else []
+                if not isinstance(includes, list):
+                    includes = [includes]
+                for inc in includes:
+                    try:
+                        include_path = get_include_path(inc, root_path)
+                    except Exception:
+                        continue
+                    if include_path is not None and include_path not in seen:
+                        seen.add(include_path)
+                        pending[pool.submit(_load_timed, include_path)] = include_path
+
+    return timings
+
+def load_and_resolve(file_path: str, loaded_files: Optional[List[str]] = None,
+                     workers: int = 1,
+                     file_timings: Optional[List[Dict[str, Any]]] = None,
+                     references: Optional[Dict[str, Set[str]]] = None,
+                     missing_files: Optional[List[str]] = None) -> Tuple[ConfigDict, JobSourcesDict]:
     """
     Load the root YAML file and resolve all includes recursively.
 
     Parameters:
         file_path (str): Path to the root .gitlab-ci.yml file.
+        loaded_files (list): Optional list filled in place with the absolute
+                             path of every file loaded, root file first.
+        workers (int): Number of threads loading the include tree. Above 1, all
+                       files are loaded concurrently before being merged in
+                       the same order as with a single worker.
+        file_timings (list): Optional list filled in place with the load and
+                             parse timings of every file (see discover_includes()),
+                             in merge order.
+        references (dict): Optional dictionary filled in place with the
+                           top-level keys each top-level key's !reference
+                           tags point to (see ReferenceResolver.references).
+        missing_files (list): Optional list filled in place with the path of
+                              every included file that does not exist.
 
     Returns:
         tuple: (resolved_config, job_sources)
@@ -315,21 +594,56 @@ def load_and_resolve(file_path: str) -> Tuple[ConfigDict, JobSourcesDict]:
     file_path = os.path.abspath(file_path)
     base_path = os.path.dirname(file_path)
     logger.info(f"Root file: {file_path}")
+    logger.debug(f"YAML backend: {YAML_BACKEND}")
     logger.debug(f"Base path: {base_path}")
-    config = load_yaml(file_path)
-
-    # Initialize job_sources dictionary and all_jobs_occurrences
-    job_sources: JobSourcesDict = {}
-    all_job_occurrences: JobOccurrencesDict = {}
-
-    # Track jobs in the root file
-    track_job_sources(config, file_path, job_sources, all_job_occurrences)
 
-    # Resolve includes and track job sources
-    resolved_config = resolve_includes(config, base_path, base_path, 0, file_path, job_sources, all_job_occurrences)
+    # Per-file timings are collected while profiling, to report the slowest files.
+    profiling = profiling_enabled()
+    if profiling and file_timings is None:
+        file_timings = []
+
+    timings: Dict[str, Dict[str, Any]] = {}
+    if workers > 1 or file_timings is not None:
+        start = time.perf_counter()
+        with phase("discover"):
+            timings = discover_includes(file_path, workers)
+        logger.debug(f"Loaded {len(timings)} files with {workers} workers in {time.perf_counter() - start:.3f}s")
+        for timing in sorted(timings.values(), key=lambda t: t["seconds"], reverse=True)[:10]:
+            logger.debug(f"  {timing['seconds']:.4f}s (parse {timing['parse_seconds']:.4f}s) {timing['path']}")
+    if file_timings is not None and loaded_files is None:
+        loaded_files = []
+
+    with phase("includes"):
+        config = load_yaml(file_path)
+        if loaded_files is not None:
+            loaded_files.append(file_path)
+
+        # Initialize job_sources dictionary and all_jobs_occurrences
+        job_sources: JobSourcesDict = {}
+        all_job_occurrences: JobOccurrencesDict = {}
+
+        # Track jobs in the root file
+        track_job_sources(config, file_path, job_sources, all_job_occurrences)
+
+        # Resolve includes and track job sources
+        resolved_config = resolve_includes(config, base_path, base_path, 0, file_path, job_sources, all_job_occurrences, loaded_files,
+                                           missing_files)
+
+    logger.debug(f"YAML parse cache: {yaml_parse_cache.stats()}")
+
+    if file_timings is not None and loaded_files is not None:
+        merged_files = list(dict.fromkeys(loaded_files))
+        file_timings.extend(timings[path] for path in merged_files if path in timings)
+        if profiling:
+            for timing in file_timings:
+                record_item("file", timing["path"], timing["seconds"])
 
     # Now that all includes are resolved, resolve any reference tags
-    resolved_config = resolve_references(resolved_config, resolved_config)
+    with phase("references"):
+        resolver = ReferenceResolver(resolved_config)
+        resolved_config = resolver.resolve(resolved_config)
+        if references is not None:
+            references.update(resolver.references)
 
     # Update job_sources to include information about all occurrences
     for job_name, occurrences in all_job_occurrences.items():
@@ -341,6 +655,22 @@ def load_and_resolve(file_path: str) -> Tuple[ConfigDict, JobSourcesDict]:
 
     return resolved_config, job_sources
 
+def extract_jobs(config: ConfigDict) -> JobDict:
+    """
+    Extract the job definitions from a resolved configuration.
+
+    All top-level keys that are not reserved keywords are treated as jobs;
+    non-dictionary values are skipped since they can't be valid jobs.
+
+    Parameters:
+        config (dict): The resolved GitLab CI configuration.
+
+    Returns:
+        dict: Mapping of job names to job definitions.
+    """
+    reserved_keys = {"include", "workflow", "variables", "stages"}
+    return {k: v for k, v in config.items() if k not in reserved_keys and isinstance(v, dict)}
+
 # Example usage:
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,176 @@
+"""
+Machine-readable output formats for the validate and simulate commands.
+
+Besides YAML, results can be written as:
+  - json: the same document as the YAML output, as compact JSON.
+  - jsonl: JSON Lines, with a header record (schema version and the
+    pipeline-level sections) followed by one record per job, so large outputs
+    can be streamed and grepped without loading them whole.
+  - msgpack: the same document as the YAML output, as MessagePack
+    (requires the optional msgpack package).
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+import yaml
+from cimulator.types import ConfigDict, JobSourcesDict
+from cimulator.loader import extract_jobs
+from cimulator.yaml_writer import write_summary
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("yaml", "json", "jsonl", "msgpack")
+
+# File extension of the default output file of each format.
+FORMAT_EXTENSIONS = {"yaml": "yml", "json": "json", "jsonl": "jsonl", "msgpack": "msgpack"}
+
+# Bump when the layout of the JSON Lines records changes.
+JSONL_SCHEMA_VERSION = 1
+
+def _json_default(value: Any) -> Any:
+    """Serialize values JSON has no type for (e.g. YAML dates) as strings."""
+    return str(value)
+
+def write_json(data: Any, stream: TextIO) -> None:
+    """Write data as compact JSON, preserving key order."""
+    json.dump(data, stream, separators=(",", ":"), default=_json_default)
+    stream.write("\n")
+
+def write_jsonl(records: Iterable[ConfigDict], stream: TextIO) -> None:
+    """Write records as JSON Lines, one compact JSON object per line."""
+    for record in records:
+        stream.write(json.dumps(record, separators=(",", ":"), default=_json_default))
+        stream.write("\n")
+
+def write_msgpack(data: Any, output_path: str) -> None:
+    """
+    Write data as MessagePack.
+
+    Raises:
+        RuntimeError: If the msgpack package is not installed.
+    """
+    try:
+        import msgpack  # type: ignore[import-not-found]
+    except ImportError:
+        raise RuntimeError("The msgpack output format requires the msgpack package (pip install msgpack)")
+    with open(output_path, 'wb') as f:
+        msgpack.pack(data, f, default=_json_default, use_bin_type=True)
+
+def iter_simulation_records(summary: ConfigDict, job_sources: Optional[JobSourcesDict] = None,
+                            job_results: Optional[Dict[str, ConfigDict]] = None) -> Iterator[ConfigDict]:
+    """
+    Yield the JSON Lines records of a simulation summary.
+
+    The header record holds the schema version and every pipeline-level
+    section of the summary. It is followed by one record per job (templates
+    excluded), in name order, with the keys:
+      - name, source_file: The job and the file it is defined in.
+      - runs: Whether the job runs in this pipeline.
+      - triggered_rule, triggered_condition: The rule that decided it, if known.
+      - job: The fully expanded job if it runs, otherwise the job expanded
+        with its own variables only (as in 'all_expanded_jobs'); None if
+        that section is not part of the summary.
+
+    Parameters:
+        summary (dict): The summary returned by simulate_pipeline().
+        job_sources (dict): Optional mapping of job names to their source files.
+        job_results (dict): Optional per-job results (see simulate_pipeline()).
+    """
+    job_sources = job_sources or {}
+    job_results = job_results or {}
+    jobs = summary.get("jobs", {})
+    all_expanded_jobs = summary.get("all_expanded_jobs", {})
+
+    header: ConfigDict = {"record": "header", "kind": "simulation", "schema_version": JSONL_SCHEMA_VERSION}
+    header.update((key, value) for key, value in summary.items() if key not in ("jobs", "all_expanded_jobs"))
+    yield header
+
+    for job_name in sorted(set(all_expanded_jobs) | set(jobs) | set(job_results)):
+        if job_name.startswith('.'):
+            continue
+        result = job_results.get(job_name, {})
+        runs = result["should_run"] if result else job_name in jobs
+        yield {
+            "record": "job",
+            "name": job_name,
+            "source_file": job_sources.get(job_name),
+            "runs": runs,
+            "triggered_rule": result.get("triggered_rule"),
+            "triggered_condition": result.get("triggered_condition"),
+            "job": jobs.get(job_name) if runs else all_expanded_jobs.get(job_name),
+        }
+
+def iter_validation_records(config: ConfigDict,
+                            job_sources: Optional[JobSourcesDict] = None) -> Iterator[ConfigDict]:
+    """
+    Yield the JSON Lines records of a validated configuration.
+
+    The header record holds the schema version and every top-level key that is
+    not a job; it is followed by one record per job with its name, source file
+    and merged definition.
+
+    Parameters:
+        config (dict): The resolved configuration.
+        job_sources (dict): Optional mapping of job names to their source files.
+    """
+    job_sources = job_sources or {}
+    jobs = extract_jobs(config)
+
+    header: ConfigDict = {"record": "header", "kind": "validation", "schema_version": JSONL_SCHEMA_VERSION}
+    header.update((key, value) for key, value in config.items() if key not in jobs)
+    yield header
+
+    for job_name, job in jobs.items():
+        yield {"record": "job", "name": job_name, "source_file": job_sources.get(job_name), "job": job}
+
+def write_simulation(summary: ConfigDict, output_path: str, output_format: str = "yaml",
+                     job_sources: Optional[JobSourcesDict] = None,
+                     job_results: Optional[Dict[str, ConfigDict]] = None) -> None:
+    """
+    Save a simulation summary in the given format.
+
+    Parameters:
+        summary (dict): The summary returned by simulate_pipeline().
+        output_path (str): Path to the output file.
+        output_format (str): One of OUTPUT_FORMATS.
+        job_sources (dict): Optional mapping of job names to their source files (jsonl only).
+        job_results (dict): Optional per-job results (jsonl only).
+    """
+    if output_format == "msgpack":
+        write_msgpack(summary, output_path)
+        return
+    with open(output_path, 'w') as f:
+        if output_format == "json":
+            write_json(summary, f)
+        elif output_format == "jsonl":
+            write_jsonl(iter_simulation_records(summary, job_sources, job_results), f)
+        elif output_format == "yaml":
+            write_summary(summary, f)
+        else:
+            raise ValueError(f"Unknown output format: {output_format}")
+
+def write_validation(config: ConfigDict, output_path: str, output_format: str = "yaml",
+                     job_sources: Optional[JobSourcesDict] = None) -> None:
+    """
+    Save a validated configuration in the given format.
+
+    Parameters:
+        config (dict): The resolved configuration.
+        output_path (str): Path to the output file.
+        output_format (str): One of OUTPUT_FORMATS.
+        job_sources (dict): Optional mapping of job names to their source files (jsonl only).
+    """
+    if output_format == "msgpack":
+        write_msgpack(config, output_path)
+        return
+    with open(output_path, 'w') as f:
+        if output_format == "json":
+            write_json(config, f)
+        elif output_format == "jsonl":
+            write_jsonl(iter_validation_records(config, job_sources), f)
+        elif output_format == "yaml":
+            f.write(yaml.dump(config, default_flow_style=False))
+        else:
+            raise ValueError(f"Unknown output format: {output_format}")
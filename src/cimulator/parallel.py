@@ -0,0 +1,83 @@
+"""
+Process pool helpers for fanning simulation work out to several cores.
+
+The data every task needs (e.g. the expanded job set) is handed to the pool
+once as shared state: worker processes inherit it when the platform can fork,
+and otherwise receive it once per worker at start-up rather than once per
+task. Results are always returned in task order, so callers produce the same
+output as the serial path.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Sequence, TypeVar
+from cimulator.profiling import disable_profiling
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# State shared by every task of the pool, set in each worker process.
+_shared_state: Any = None
+
+def _init_worker(state: Any) -> None:
+    """Store the pool's shared state in the worker process."""
+    global _shared_state
+    _shared_state = state
+    # Forked workers inherit the parent's phase hooks, whose results would be lost.
+    disable_profiling()
+
+def _call_with_state(function: Callable[[Any, T], R], task: T) -> R:
+    """Run a task against the worker's shared state."""
+    return function(_shared_state, task)
+
+def _pool_context() -> Any:
+    """Return the multiprocessing context, preferring fork so the shared state is inherited."""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+def split_into_chunks(items: Sequence[T], processes: int, chunks_per_process: int = 4) -> List[List[T]]:
+    """
+    Split items into contiguous chunks for distribution over a pool.
+
+    Parameters:
+        items (sequence): The items to split, in order.
+        processes (int): Number of worker processes.
+        chunks_per_process (int): Target number of chunks per worker, so that
+                                  uneven tasks are balanced between workers.
+
+    Returns:
+        list: The chunks, in order. Concatenating them gives back the items.
+    """
+    if not items:
+        return []
+    chunk_count = max(1, min(len(items), processes * chunks_per_process))
+    chunk_size = -(-len(items) // chunk_count)
+    return [list(items[start:start + chunk_size]) for start in range(0, len(items), chunk_size)]
+
+def map_in_processes(function: Callable[[Any, T], R], shared_state: Any, tasks: Sequence[T],
+                     processes: int) -> List[R]:
+    """
+    Apply a function to every task on a process pool.
+
+    Parameters:
+        function (callable): A module-level function called as function(shared_state, task).
+        shared_state: Data needed by every task, sent to each worker once.
+        tasks (sequence): The tasks; each one is pickled to a worker.
+        processes (int): Maximum number of worker processes.
+
+    Returns:
+        list: The results, in the order of tasks.
+    """
+    if not tasks:
+        return []
+    workers = min(processes, len(tasks))
+    logger.debug(f"Running {len(tasks)} tasks on {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                             initializer=_init_worker, initargs=(shared_state,)) as pool:
+        return list(pool.map(partial(_call_with_state, function), tasks))
@@ -0,0 +1,201 @@
+"""
+Cache of parsed YAML documents.
+
+Parsing is the most expensive part of loading a CI configuration, and shared
+template files are often included from several places of the same tree and
+reloaded by every run. This module keeps parsed documents:
+  - in memory, as compact pickled blobs, so a file included N times is parsed
+    once per process,
+  - optionally on disk, as JSON (see cimulator.serialization), so unchanged
+    files are not parsed again by later runs. Reading an entry written by
+    someone else can give a wrong document, but never runs code.
+
+Entries are keyed by absolute path and validated with the file's size and
+modification time; when those differ (or are too recent to be trusted) the
+content hash decides whether the entry can still be used. Each lookup returns
+a fresh copy of the document, since callers modify loaded documents in place.
+"""
+
+import os
+import time
+import pickle
+import tempfile
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from cimulator import serialization
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the cached entries changes.
+PARSE_CACHE_FORMAT_VERSION = 3
+
+# A file modified less than this long before its entry was recorded may have
+# changed again within the same timestamp, so its stat data is not trusted.
+RACY_WINDOW_NS = 2_000_000_000
+
+class ParseCache:
+    """
+    Memory and optional disk cache of parsed YAML documents.
+
+    Attributes:
+        directory (str): Directory of the on-disk cache, or None to only cache in memory.
+        memory_hits (int): Lookups served from memory.
+        disk_hits (int): Lookups served from the on-disk cache.
+        parses (int): Lookups that had to parse the file.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.parses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _disk_path(self, path: str) -> str:
+        assert self.directory is not None
+        name = hashlib.sha256(path.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _read_disk_entry(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._disk_path(path), 'r', encoding='utf-8') as f:
+                entry = serialization.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable parse cache entry for {path}: {e}")
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != PARSE_CACHE_FORMAT_VERSION \
+                or entry.get("path") != path \
+                or not {"size", "mtime_ns", "recorded_ns", "digest", "document"} <= entry.keys():
+            return None
+        # Entries hold the document pickled in memory, to hand out fresh copies.
+        entry["document"] = pickle.dumps(entry["document"], protocol=pickle.HIGHEST_PROTOCOL)
+        return entry
+
+    def _write_disk_entry(self, path: str, entry: Dict[str, Any], document: Any) -> None:
+        disk_path = self._disk_path(path)
+        try:
+            text = serialization.dumps({**entry, "document": document})
+        except TypeError as e:
+            logger.debug(f"Not caching {path} on disk: {e}")
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)  # type: ignore[arg-type]
+            # Several threads or processes may write the same entry: each one uses its own temporary file.
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(temp_path, disk_path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.debug(f"Could not write parse cache entry for {path}: {e}")
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _stat_matches(entry: Dict[str, Any], stat: os.stat_result) -> bool:
+        """Check whether the file's stat data proves the entry is still valid."""
+        return (entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                and stat.st_mtime_ns < entry["recorded_ns"] - RACY_WINDOW_NS)
+
+    def load(self, file_path: str, parse: Callable[[bytes], Any]) -> Any:
+        """
+        Return the parsed document of a file, parsing it only if needed.
+
+        Parameters:
+            file_path (str): Path to the file.
+            parse (callable): Function parsing the file's content into a
+                              picklable document. Documents are only cached on
+                              disk when cimulator.serialization can encode them.
+
+        Returns:
+            The parsed document. The caller owns it and may modify it.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+
+        with self._lock:
+            memory_entry = self._entries.get(path)
+        if memory_entry is not None and self._stat_matches(memory_entry, stat):
+            self._count("memory_hits")
+            return pickle.loads(memory_entry["document"])
+
+        disk_entry = None
+        if memory_entry is None and self.directory:
+            disk_entry = self._read_disk_entry(path)
+            if disk_entry is not None and self._stat_matches(disk_entry, stat):
+                self._count("disk_hits")
+                with self._lock:
+                    self._entries[path] = disk_entry
+                return pickle.loads(disk_entry["document"])
+
+        # The stat data is not conclusive: compare the content hash.
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if memory_entry is not None and memory_entry["digest"] == digest:
+            self._count("memory_hits")
+            blob = memory_entry["document"]
+            document = pickle.loads(blob)
+        elif disk_entry is not None and disk_entry["digest"] == digest:
+            self._count("disk_hits")
+            blob = disk_entry["document"]
+            document = pickle.loads(blob)
+        else:
+            self._count("parses")
+            document = parse(content)
+            # Serialize before handing the document out, as callers modify it.
+            blob = pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL)
+
+        entry = {
+            "version": PARSE_CACHE_FORMAT_VERSION,
+            "path": path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "recorded_ns": time.time_ns(),
+            "digest": digest,
+            "document": blob,
+        }
+        with self._lock:
+            self._entries[path] = entry
+        if self.directory and (memory_entry is None or memory_entry["digest"] != digest):
+            self._write_disk_entry(path, entry, document)
+        return document
+
+    def stats(self) -> Dict[str, int]:
+        """Return the lookup counters and the number of documents held in memory."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "parses": self.parses,
+                "size": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and reset the counters (the disk cache is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.parses = 0
+
+# Shared cache used by loader.load_yaml().
+yaml_parse_cache = ParseCache()
@@ -0,0 +1,157 @@
+"""
+Reusable compiled pipeline for the Python API.
+
+A Pipeline is built once from a CI configuration: the include tree is loaded
+and merged, the extends graph is built, the fields deciding whether each job
+runs (rules, variables, needs) are expanded through it, every rule condition
+is compiled and the variables of every job are put in resolution order.
+Evaluating the pipeline for a set of variables then only resolves variables
+and evaluates rules, with the conditions and orders computed here rather than
+the process-wide caches, so a service answering "which jobs run?" many times
+does not load, expand or compile the configuration again.
+
+A Pipeline is not modified once built, apart from its caches (the full job
+expansion, computed on first use under a lock, and the rule decisions, which
+are only added to), so it can be evaluated from several threads at once.
+"""
+
+import logging
+import threading
+from typing import Collection, Dict, List, Optional
+from cimulator.types import ConfigDict, JobDict, JobSourcesDict, VariablesDict
+from cimulator.loader import load_and_resolve, extract_jobs
+from cimulator.job_expander import build_extends_graph, expand_all_jobs
+from cimulator.condition_parser import CompiledCondition, ConditionSyntaxError, compile_condition
+from cimulator.plan import PipelinePlan, plan_pipeline, project_jobs
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.variable_resolver import order_variables
+from cimulator.workflow import RuleDecisionCache
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+def compile_rule_conditions(rule_lists: List[List[ConfigDict]]) -> Dict[str, CompiledCondition]:
+    """
+    Compile the 'if' conditions of lists of rules.
+
+    Parameters:
+        rule_lists (list): Lists of rules, e.g. the workflow rules and each job's rules.
+
+    Returns:
+        dict: Maps each valid condition text to its compiled predicate.
+              Invalid conditions are logged and left out; they never match
+              when evaluated.
+    """
+    conditions: Dict[str, CompiledCondition] = {}
+    for rules in rule_lists:
+        if not isinstance(rules, list):
+            continue
+        for rule in rules:
+            condition = rule.get("if") if isinstance(rule, dict) else None
+            if not isinstance(condition, str) or condition in conditions:
+                continue
+            try:
+                conditions[condition] = compile_condition(condition)
+            except ConditionSyntaxError as e:
+                logger.warning(f"Invalid rule condition '{condition}': {e}")
+    return conditions
+
+class Pipeline:
+    """
+    A CI configuration compiled once and evaluated against any number of variable sets.
+
+    Attributes:
+        config (dict): The resolved configuration.
+        job_sources (dict): Mapping of job names to their source files.
+        jobs (dict): The job definitions.
+        workflow_config (dict): The 'workflow' section.
+        variables (dict): The global variables of the CI file.
+        extends_graph (dict): The parents each job extends, in order.
+        rule_jobs (dict): The rules, variables and needs of each job, expanded
+                          through extends (shared with each other; not to be modified).
+        conditions (dict): The compiled 'if' condition of every workflow and job rule.
+        variable_orders (dict): The resolution order of each job's variables
+                                (see variable_resolver.order_variables).
+        rule_cache (RuleDecisionCache): Job rule decisions of earlier evaluations.
+    """
+
+    def __init__(self, config: ConfigDict, job_sources: Optional[JobSourcesDict] = None) -> None:
+        self.config = config
+        self.job_sources = job_sources if job_sources is not None else {}
+        self.jobs = extract_jobs(config)
+        self.workflow_config = config.get("workflow", {})
+        self.variables = config.get("variables", {})
+        self.extends_graph = build_extends_graph(self.jobs)
+        self.rule_jobs = expand_all_jobs(project_jobs(self.jobs), shared=True)
+        workflow_rules = self.workflow_config.get("rules", []) if isinstance(self.workflow_config, dict) else []
+        self.conditions = compile_rule_conditions(
+            [workflow_rules] + [job.get("rules", []) for job in self.rule_jobs.values()]
+        )
+        self.variable_orders = {
+            job_name: order_variables(job["variables"])
+            for job_name, job in self.rule_jobs.items() if isinstance(job.get("variables"), dict)
+        }
+        # Job rule decisions, reused between evaluations where the variables the rules read are unchanged.
+        self.rule_cache = RuleDecisionCache()
+        self._expanded_jobs: Optional[JobDict] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, ci_file: str, include_workers: int = 1) -> "Pipeline":
+        """
+        Load a CI file with its includes and compile it.
+
+        Parameters:
+            ci_file (str): Path to the root .gitlab-ci.yml file.
+            include_workers (int): Number of threads loading the include tree.
+
+        Returns:
+            Pipeline: The compiled pipeline.
+        """
+        config, job_sources = load_and_resolve(ci_file, workers=include_workers)
+        return cls(config, job_sources)
+
+    def _global_variables(self, variables: Optional[VariablesDict]) -> VariablesDict:
+        # As with a simulation profile, the given variables override the CI file's.
+        global_variables = dict(self.variables) if isinstance(self.variables, dict) else {}
+        global_variables.update(variables or {})
+        return global_variables
+
+    def evaluate(self, variables: Optional[VariablesDict] = None) -> PipelinePlan:
+        """
+        Decide which jobs run for a set of variables.
+
+        Parameters:
+            variables (dict): Variables of the pipeline run (e.g. a simulation
+                              profile); they override the CI file's variables.
+
+        Returns:
+            PipelinePlan: The run set (jobs_list), the per-job decisions and the
+                          dependency errors, as computed by plan_pipeline().
+        """
+        return plan_pipeline(self.jobs, self.workflow_config, self._global_variables(variables),
+                             rule_jobs=self.rule_jobs, rule_cache=self.rule_cache,
+                             conditions=self.conditions, variable_orders=self.variable_orders)
+
+    def expanded_jobs(self) -> JobDict:
+        """Return the jobs fully expanded through extends (shared mode), expanding them on first use."""
+        with self._lock:
+            if self._expanded_jobs is None:
+                self._expanded_jobs = expand_all_jobs(self.jobs, shared=True)
+            return self._expanded_jobs
+
+    def simulate(self, variables: Optional[VariablesDict] = None,
+                 sections: Optional[Collection[str]] = None) -> ConfigDict:
+        """
+        Simulate the pipeline for a set of variables, as simulate_pipeline() does.
+
+        Parameters:
+            variables (dict): Variables of the pipeline run; they override the CI file's variables.
+            sections (collection): Summary sections to compute (default: DEFAULT_SECTIONS).
+
+        Returns:
+            dict: The simulation summary.
+        """
+        return simulate_pipeline(self.jobs, self.workflow_config, self._global_variables(variables),
+                                 expanded_jobs=self.expanded_jobs(), sections=sections,
+                                 conditions=self.conditions)
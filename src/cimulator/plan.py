@@ -0,0 +1,163 @@
+"""
+Plan mode: decide which jobs run without expanding their bodies.
+
+Whether a job runs only depends on its rules, its variables and the global
+and workflow variables. A plan therefore expands the extends hierarchy of
+those fields only, evaluates every job's rules, and expands nothing else but
+the 'needs' used to check dependencies. Full job bodies are only expanded for
+the jobs a caller asks for, with the same result as simulate_pipeline().
+"""
+
+import logging
+from collections import ChainMap
+from typing import Any, Dict, Hashable, List, Mapping, Optional
+from cimulator.types import ConfigDict, JobDict, VariablesDict
+from cimulator.job_expander import expand_all_jobs, expand_job
+from cimulator.simulation_engine import evaluate_pipeline_variables, expand_job_body, simulate_job
+from cimulator.validator import validate_job_needs_dependencies
+from cimulator.workflow import RuleDecisionCache
+from cimulator.condition_parser import CompiledCondition
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Job keys a plan reads: what decides whether a job runs, and its dependencies.
+PLAN_FIELDS = ("extends", "rules", "variables", "needs")
+
+def project_jobs(all_jobs: JobDict, fields: tuple = PLAN_FIELDS) -> JobDict:
+    """Return the job definitions restricted to the given top-level keys."""
+    return {
+        job_name: {key: value for key, value in job.items() if key in fields} if isinstance(job, dict) else job
+        for job_name, job in all_jobs.items()
+    }
+
+class PipelinePlan:
+    """
+    The run decisions of a pipeline.
+
+    Attributes:
+        workflow_run (bool): Whether the workflow permits a run.
+        workflow_triggered_rule (dict): The workflow rule that decided it.
+        workflow_applied_variables (dict): Variables applied by that rule.
+        simulation_variables (dict): Global variables merged with the workflow variables.
+        jobs_list (list): Names of the jobs that run, templates excluded.
+        decisions (dict): For every job (templates included): whether it runs,
+                          the rule and condition that decided it, and the
+                          variables that rule applies.
+        dependency_errors (list): Needs of running jobs on jobs that do not run.
+    """
+
+    def __init__(self, all_jobs: JobDict, workflow_run: bool, workflow_triggered_rule: Optional[ConfigDict],
+                 workflow_applied_variables: VariablesDict, simulation_variables: VariablesDict,
+                 job_results: Dict[str, ConfigDict]) -> None:
+        self.workflow_run = workflow_run
+        self.workflow_triggered_rule = workflow_triggered_rule
+        self.workflow_applied_variables = workflow_applied_variables
+        self.simulation_variables = simulation_variables
+        self.decisions = {
+            job_name: {
+                "should_run": result["should_run"],
+                "triggered_rule": result["triggered_rule"],
+                "triggered_condition": result["triggered_condition"],
+                "applied_variables": result["applied_variables"],
+            }
+            for job_name, result in job_results.items()
+        }
+        running_jobs = {job_name: result["expanded_job"] for job_name, result in job_results.items()
+                        if result["should_run"]}
+        self.jobs_list = [job_name for job_name in running_jobs if not job_name.startswith('.')]
+        self.dependency_errors = validate_job_needs_dependencies(running_jobs, set(self.jobs_list))
+
+        self._all_jobs = all_jobs
+        self._job_variables = {job_name: result["job_variables"] for job_name, result in job_results.items()}
+        self._extends_cache: JobDict = {}
+        self._interned: Dict[Hashable, Any] = {}
+
+    def expand_job(self, job_name: str) -> Optional[JobDict]:
+        """
+        Fully expand a job, as listed in the 'jobs' section of simulate_pipeline().
+
+        Parameters:
+            job_name (str): Name of the job.
+
+        Returns:
+            dict: The expanded job, or None if the job does not run.
+        """
+        decision = self.decisions[job_name]
+        if not decision["should_run"]:
+            return None
+        job = expand_job(job_name, self._all_jobs, self._extends_cache, shared=True)
+        job_variables = self._job_variables[job_name]
+        job_body = job.copy()
+        job_body["variables"] = job_variables
+        scope = ChainMap(decision["applied_variables"], job_variables, self.simulation_variables)
+        return expand_job_body(job_body, scope, self._interned)
+
+    def to_summary(self, expand: Optional[List[str]] = None) -> ConfigDict:
+        """
+        Return the plan as a dictionary.
+
+        Parameters:
+            expand (list): Names of jobs whose expanded definition is included
+                           under 'jobs' (jobs that do not run are left out).
+
+        Returns:
+            dict: The plan, with the same keys as a simulation summary where
+                  they apply, and the per-job 'decisions'.
+        """
+        summary = {
+            "workflow_run": self.workflow_run,
+            "workflow_triggered_rule": self.workflow_triggered_rule,
+            "workflow_applied_variables": self.workflow_applied_variables,
+            "global_variables": self.simulation_variables,
+            "jobs_list": self.jobs_list,
+            "dependency_errors": self.dependency_errors,
+            "decisions": self.decisions,
+        }
+        if expand:
+            expanded_jobs = {job_name: self.expand_job(job_name) for job_name in expand}
+            summary["jobs"] = {job_name: job for job_name, job in expanded_jobs.items() if job is not None}
+        return summary
+
+def plan_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_variables: VariablesDict,
+                  rule_jobs: Optional[JobDict] = None,
+                  rule_cache: Optional[RuleDecisionCache] = None,
+                  conditions: Optional[Mapping[str, CompiledCondition]] = None,
+                  variable_orders: Optional[Dict[str, List[List[str]]]] = None) -> PipelinePlan:
+    """
+    Decide which jobs of a pipeline run, reading only rule-relevant fields.
+
+    Parameters:
+        all_jobs (dict): Dictionary of job definitions.
+        workflow_config (dict): Workflow configuration dictionary.
+        global_variables (dict): Global variables for the simulation.
+        rule_jobs (dict): Optional result of expand_all_jobs(project_jobs(all_jobs), shared=True),
+                          so that several plans of the same jobs only expand
+                          their rule-relevant fields once.
+        rule_cache (RuleDecisionCache): Optional cache of job rule decisions
+                                        shared by several plans of the same rule_jobs.
+        conditions (mapping): Optional compiled workflow and job rule conditions
+                              by text (see pipeline.compile_rule_conditions).
+        variable_orders (dict): Optional result of order_variables() for the
+                                variables of each job of rule_jobs.
+
+    Returns:
+        PipelinePlan: The run decisions; its jobs_list and dependency_errors are
+                      the same as those of simulate_pipeline().
+    """
+    logger.debug("Starting pipeline plan.")
+    wf_run, wf_rule, wf_vars, simulation_variables = evaluate_pipeline_variables(workflow_config, global_variables,
+                                                                                 conditions)
+
+    # Only the fields that decide whether a job runs go through extends expansion.
+    if rule_jobs is None:
+        rule_jobs = expand_all_jobs(project_jobs(all_jobs), shared=True)
+
+    job_results = {
+        job_name: simulate_job(job_name, rule_jobs[job_name], simulation_variables,
+                               expand_fields=("needs",), debug_view=False, rule_cache=rule_cache,
+                               conditions=conditions,
+                               variable_order=variable_orders.get(job_name) if variable_orders else None)
+        for job_name in sorted(rule_jobs)
+    }
+    return PipelinePlan(all_jobs, wf_run, wf_rule, wf_vars, simulation_variables, job_results)
@@ -0,0 +1,246 @@
+"""
+Per-phase instrumentation of validate and simulate runs.
+
+Code marks its phases with `with phase("name"):` and reports per-item costs
+(e.g. per file or per job) with record_item(). Both are no-ops unless a hook
+is registered with add_phase_hook(), so instrumented code costs next to
+nothing in normal runs. Phases nest: a phase entered inside another is named
+"outer/inner".
+
+PhaseProfiler is the hook used by --profile-phases: it aggregates, for every
+phase, the wall time, CPU time, memory allocated (traced with tracemalloc
+when allocation tracing is on) and the peak RSS of the process, and keeps the
+most expensive items of each category.
+"""
+
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# A hook receives either ("phase", name, measurements) when a phase ends, or
+# ("item", category, {"name": ..., "seconds": ...}) for record_item().
+PhaseHook = Callable[[str, str, Dict[str, Any]], None]
+
+_hooks: List[PhaseHook] = []
+_local = threading.local()
+_NO_PHASE = nullcontext()
+
+def add_phase_hook(hook: PhaseHook) -> None:
+    """Register a hook called at the end of every phase and for every recorded item."""
+    _hooks.append(hook)
+
+def remove_phase_hook(hook: PhaseHook) -> None:
+    """Unregister a hook added with add_phase_hook()."""
+    _hooks.remove(hook)
+
+def profiling_enabled() -> bool:
+    """Return True if at least one hook is registered."""
+    return bool(_hooks)
+
+def disable_profiling() -> None:
+    """Unregister every hook and stop tracing allocations (e.g. in a worker process)."""
+    _hooks.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def _emit(kind: str, name: str, data: Dict[str, Any]) -> None:
+    for hook in list(_hooks):
+        hook(kind, name, data)
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of the process in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+class _Phase:
+    """Context manager measuring one run of a phase."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Phase":
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.path = "/".join([frame.name for frame in stack] + [self.name])
+        self.parent = stack[-1] if stack else None
+        self.child_peak = 0
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                # The parent's peak so far would be lost by the reset below.
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            self.start_traced = current
+        stack.append(self)
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        _local.stack.pop()
+        measurements: Dict[str, Any] = {"wall_seconds": wall, "cpu_seconds": cpu, "peak_rss_mb": peak_rss_mb()}
+        if self.tracing and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.child_peak)
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+            measurements["allocated_mb"] = (current - self.start_traced) / 1024 / 1024
+            measurements["peak_allocated_mb"] = (peak - self.start_traced) / 1024 / 1024
+        _emit("phase", self.path, measurements)
+
+def phase(name: str) -> ContextManager[Any]:
+    """
+    Mark a phase of the run.
+
+    Parameters:
+        name (str): Name of the phase, relative to the enclosing phase.
+
+    Returns:
+        A context manager measuring the phase, or a no-op one when no hook is registered.
+    """
+    if not _hooks:
+        return _NO_PHASE
+    return _Phase(name)
+
+def record_item(category: str, name: str, seconds: float) -> None:
+    """
+    Report the cost of one item of a phase, e.g. a file or a job.
+
+    Parameters:
+        category (str): Kind of item, e.g. "file" or "job".
+        name (str): Name of the item.
+        seconds (float): Time spent on the item.
+    """
+    if _hooks:
+        _emit("item", category, {"name": name, "seconds": seconds})
+
+class PhaseProfiler:
+    """
+    Hook aggregating phase measurements and per-item costs.
+
+    Use it as a context manager: it registers itself on entry (starting
+    tracemalloc if trace_allocations is set) and unregisters on exit.
+
+    Attributes:
+        phases (dict): For each phase path, in the order phases first ended:
+                       calls, wall and CPU seconds, allocated and peak
+                       allocated MB (with allocation tracing) and the highest
+                       peak RSS seen at its end.
+        items (dict): For each category, the total seconds of each item.
+    """
+
+    def __init__(self, trace_allocations: bool = True) -> None:
+        self.trace_allocations = trace_allocations
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.items: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def __call__(self, kind: str, name: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if kind == "item":
+                category = self.items.setdefault(name, {})
+                category[data["name"]] = category.get(data["name"], 0.0) + data["seconds"]
+                return
+            entry = self.phases.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            entry["calls"] += 1
+            entry["wall_seconds"] += data["wall_seconds"]
+            entry["cpu_seconds"] += data["cpu_seconds"]
+            if "allocated_mb" in data:
+                entry["allocated_mb"] = entry.get("allocated_mb", 0.0) + data["allocated_mb"]
+                entry["peak_allocated_mb"] = max(entry.get("peak_allocated_mb", 0.0), data["peak_allocated_mb"])
+            if data["peak_rss_mb"] is not None:
+                entry["peak_rss_mb"] = max(entry.get("peak_rss_mb", 0.0), data["peak_rss_mb"])
+
+    def __enter__(self) -> "PhaseProfiler":
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_phase_hook(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        remove_phase_hook(self)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def top_items(self, category: str, count: int = 10) -> List[Dict[str, Any]]:
+        """Return the `count` most expensive items of a category, most expensive first."""
+        items = sorted(self.items.get(category, {}).items(), key=lambda item: item[1], reverse=True)
+        return [{"name": name, "seconds": seconds} for name, seconds in items[:count]]
+
+    def to_dict(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Return the measurements as a JSON-serializable dictionary.
+
+        Parameters:
+            top (int): Number of items kept per category.
+
+        Returns:
+            dict: {"phases": {...}, "top_items": {category: [...]}}.
+        """
+        return {
+            "phases": self.phases,
+            "top_items": {category: self.top_items(category, top) for category in self.items},
+        }
+
+    def format_table(self, top: int = 10) -> str:
+        """
+        Return the measurements as a text table.
+
+        Parameters:
+            top (int): Number of items listed per category.
+
+        Returns:
+            str: One line per phase, indented by nesting depth, followed by
+                 the most expensive items of each category.
+        """
+        lines = [f"{'phase':<36}{'calls':>7}{'wall (s)':>10}{'cpu (s)':>10}"
+                 f"{'alloc (MB)':>12}{'peak (MB)':>11}{'rss (MB)':>10}"]
+        # List nested phases under their parents; parents end after their children.
+        for path in sorted(self.phases, key=self._sort_key):
+            entry = self.phases[path]
+            depth = path.count("/")
+            label = "  " * depth + path.rsplit("/", 1)[-1]
+
+            def column(key: str, width: int) -> str:
+                return f"{entry[key]:>{width}.1f}" if key in entry else f"{'-':>{width}}"
+
+            lines.append(f"{label:<36}{entry['calls']:>7}{entry['wall_seconds']:>10.3f}{entry['cpu_seconds']:>10.3f}"
+                         f"{column('allocated_mb', 12)}{column('peak_allocated_mb', 11)}{column('peak_rss_mb', 10)}")
+        for category in self.items:
+            lines.append("")
+            lines.append(f"Slowest {category}s:")
+            for item in self.top_items(category, top):
+                lines.append(f"  {item['seconds']:>9.4f}s  {item['name']}")
+        return "\n".join(lines)
+
+    def _sort_key(self, path: str) -> List[int]:
+        """Order of a phase path: each component by the position its prefix first ended."""
+        order = list(self.phases)
+        parts = path.split("/")
+        key = []
+        for depth in range(1, len(parts) + 1):
+            prefix = "/".join(parts[:depth])
+            key.append(order.index(prefix) if prefix in self.phases else -1)
+        return key
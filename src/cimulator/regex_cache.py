@@ -0,0 +1,131 @@
+"""
+Bounded cache of compiled regular expressions used by rule conditions.
+
+GitLab CI writes rule regexes as '/pattern/flags' literals. This module
+translates such literals into Python regex objects. Literals written in a
+condition are compiled once with the condition; patterns read from variables
+are only known while evaluating, so they are kept in an LRU-bounded cache,
+with hit/miss counters the simulation summary can report.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Maximum number of distinct (pattern, flags) pairs kept in the rule regex cache.
+REGEX_CACHE_SIZE = 2048
+
+# GitLab regex flags and their Python equivalents.
+_FLAG_MAP = {
+    "i": re.IGNORECASE,
+    "m": re.MULTILINE,
+    "s": re.DOTALL,
+    "x": re.VERBOSE,
+}
+
+def split_regex_literal(literal: str) -> Tuple[str, str]:
+    """
+    Split a GitLab '/pattern/flags' literal into its pattern and flags.
+
+    Strings that are not in slash form are returned unchanged as the pattern.
+    """
+    if len(literal) >= 2 and literal.startswith("/"):
+        end = literal.rfind("/")
+        if end > 0:
+            return literal[1:end], literal[end + 1:]
+    return literal, ""
+
+def compile_regex(pattern: str, flags: str = "") -> Optional["re.Pattern[str]"]:
+    """
+    Compile a pattern with a GitLab flags string.
+
+    Returns None if the pattern is not a valid regular expression.
+    """
+    re_flags = 0
+    for flag in flags:
+        re_flags |= _FLAG_MAP.get(flag, 0)
+    try:
+        return re.compile(pattern, re_flags)
+    except re.error:
+        return None
+
+def compile_regex_literal(literal: str) -> Optional["re.Pattern[str]"]:
+    """Compile a GitLab '/pattern/flags' literal, or return None if it is invalid."""
+    return compile_regex(*split_regex_literal(literal))
+
+class PatternCache:
+    """
+    LRU-bounded cache mapping (pattern, flags) pairs to compiled regexes.
+
+    Invalid patterns are cached as None so they are not recompiled on every
+    evaluation. The cache is safe to use from multiple threads. Besides the
+    process-wide counters, hits and misses are counted per thread (see
+    thread_stats()), so that a run can report its own lookups while other
+    threads use the cache.
+    """
+
+    def __init__(self, maxsize: int = REGEX_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._patterns: "OrderedDict[Tuple[str, str], Optional[re.Pattern[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _count_locally(self, counter: str) -> None:
+        setattr(self._local, counter, getattr(self._local, counter, 0) + 1)
+
+    def get(self, pattern: str, flags: str = "") -> Optional["re.Pattern[str]"]:
+        """
+        Return the compiled regex for a pattern and GitLab flags string.
+
+        Returns None if the pattern is not a valid regular expression.
+        """
+        key = (pattern, flags)
+        with self._lock:
+            if key in self._patterns:
+                self.hits += 1
+                self._patterns.move_to_end(key)
+                compiled = self._patterns[key]
+                self._count_locally("hits")
+                return compiled
+            self.misses += 1
+        self._count_locally("misses")
+
+        compiled = compile_regex(pattern, flags)
+
+        with self._lock:
+            self._patterns[key] = compiled
+            if len(self._patterns) > self.maxsize:
+                self._patterns.popitem(last=False)
+        return compiled
+
+    def get_literal(self, literal: str) -> Optional["re.Pattern[str]"]:
+        """Return the compiled regex for a GitLab '/pattern/flags' literal."""
+        pattern, flags = split_regex_literal(literal)
+        return self.get(pattern, flags)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters and current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._patterns),
+                "maxsize": self.maxsize,
+            }
+
+    def thread_stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters of the calling thread."""
+        return {"hits": getattr(self._local, "hits", 0), "misses": getattr(self._local, "misses", 0)}
+
+    def clear(self) -> None:
+        """Remove all cached patterns and reset the counters."""
+        with self._lock:
+            self._patterns.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Shared cache of the patterns rule conditions read from variables.
+rule_regex_cache = PatternCache()
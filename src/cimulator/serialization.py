@@ -0,0 +1,100 @@
+"""
+JSON encoding of cached data.
+
+The caches written by cimulator (incremental state, parsed YAML documents)
+hold the values YAML documents are made of, some of which JSON cannot
+represent: tuples, mappings with non-string keys, sets, dates, binary
+strings and unresolved !reference tags. This module encodes those as JSON
+objects tagged with a "__type__" key, so that the data reads back identical
+to what was written. Unlike pickle, reading a cache file never runs code,
+whoever wrote it.
+"""
+
+import json
+import base64
+import datetime
+from typing import Any
+
+# Key marking a JSON object as an encoded value rather than a mapping.
+TYPE_KEY = "__type__"
+
+def _encode(value: Any) -> Any:
+    """Convert a value into plain JSON data, tagging the types JSON lacks."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        if TYPE_KEY not in value and all(isinstance(key, str) for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {TYPE_KEY: "dict", "items": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {TYPE_KEY: "tuple", "items": [_encode(item) for item in value]}
+    if isinstance(value, set):
+        return {TYPE_KEY: "set", "items": [_encode(item) for item in value]}
+    if isinstance(value, datetime.datetime):
+        return {TYPE_KEY: "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {TYPE_KEY: "date", "value": value.isoformat()}
+    if isinstance(value, bytes):
+        return {TYPE_KEY: "bytes", "value": base64.b64encode(value).decode("ascii")}
+    # Imported here, as the loader depends on the parse cache, which uses this module.
+    from cimulator.loader import ReferenceTag
+    if isinstance(value, ReferenceTag):
+        return {TYPE_KEY: "reference", "path": _encode(value.path_components)}
+    raise TypeError(f"Cannot encode a value of type {type(value).__name__}")
+
+def _decode_object(data: dict) -> Any:
+    """Rebuild the value of a tagged JSON object (json.loads object hook)."""
+    kind = data.get(TYPE_KEY)
+    if kind is None:
+        return data
+    if kind == "dict":
+        return {key: item for key, item in data["items"]}
+    if kind == "tuple":
+        return tuple(data["items"])
+    if kind == "set":
+        return set(data["items"])
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(data["value"])
+    if kind == "date":
+        return datetime.date.fromisoformat(data["value"])
+    if kind == "bytes":
+        return base64.b64decode(data["value"])
+    if kind == "reference":
+        from cimulator.loader import ReferenceTag
+        return ReferenceTag(data["path"])
+    raise ValueError(f"Unknown encoded type: {kind}")
+
+def dumps(data: Any) -> str:
+    """
+    Encode data as a JSON string.
+
+    Parameters:
+        data: The data to encode.
+
+    Returns:
+        str: The JSON text.
+
+    Raises:
+        TypeError: If the data holds a value of an unsupported type.
+    """
+    return json.dumps(_encode(data), separators=(",", ":"))
+
+def loads(text: str) -> Any:
+    """
+    Decode a JSON string written by dumps().
+
+    Parameters:
+        text (str): The JSON text.
+
+    Returns:
+        The decoded data.
+
+    Raises:
+        ValueError: If the text is not valid encoded data.
+    """
+    try:
+        return json.loads(text, object_hook=_decode_object)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed encoded data: {e}") from e
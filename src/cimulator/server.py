@@ -0,0 +1,201 @@
+"""
+Long-running cimulator server answering commands over a Unix socket.
+
+`cimulator serve` keeps CI configurations loaded, merged and expanded in a
+Workspace, along with the parse cache and the compiled rule conditions, and
+runs the command lines sent by cimulator.client against them. A background
+thread polls the files of every loaded configuration and reloads the ones
+that changed, so that the next request finds them ready.
+
+Each request is one line of JSON, answered by one line of JSON:
+  - {"argv": [...], "cwd": "..."} runs a cimulator command line in that
+    directory and returns {"exit_code": ..., "stdout": ..., "stderr": ...}.
+  - {"command": "ping"}, {"command": "stats"} and {"command": "shutdown"}.
+Requests are handled one at a time, since commands use the process's working
+directory and standard streams.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import logging
+import threading
+import socketserver
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+from cimulator.client import default_socket_path
+from cimulator.parse_cache import yaml_parse_cache
+from cimulator.workspace import Workspace
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+def run_command_line(run: Callable[[List[str]], None], argv: List[str], cwd: str) -> Dict[str, Any]:
+    """
+    Run a command line with its output captured.
+
+    Parameters:
+        run (callable): The command-line entry point (e.g. cli.main).
+        argv (list): Its arguments.
+        cwd (str): Working directory to run it in.
+
+    Returns:
+        dict: The exit code and the captured stdout and stderr.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    exit_code = 0
+    previous_directory = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                run(argv)
+            except SystemExit as e:
+                if isinstance(e.code, int) or e.code is None:
+                    exit_code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                exit_code = 1
+    except OSError as e:
+        stderr.write(f"Error: cannot run in {cwd}: {e}\n")
+        exit_code = 1
+    finally:
+        os.chdir(previous_directory)
+    return {"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            response = self.server.process(request)  # type: ignore[attr-defined]
+        except ValueError as e:
+            response = {"exit_code": 2, "stdout": "", "stderr": f"Invalid request: {e}\n"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+class CimulatorServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server running cimulator commands against a shared Workspace.
+
+    Attributes:
+        workspace (Workspace): The loaded configurations.
+        requests (int): Number of command lines run.
+    """
+
+    def __init__(self, socket_path: str, workspace: Workspace, run: Callable[[List[str]], None],
+                 after_request: Optional[Callable[[], None]] = None) -> None:
+        self.workspace = workspace
+        self.requests = 0
+        self._run = run
+        self._after_request = after_request
+        _remove_stale_socket(socket_path)
+        # Only the current user may connect.
+        previous_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def process(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request."""
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True}
+        if command == "stats":
+            return {"ok": True, "requests": self.requests, "workspace": self.workspace.stats(),
+                    "parse_cache": yaml_parse_cache.stats()}
+        if command == "shutdown":
+            # shutdown() waits for serve_forever() to return, so it must run on another thread.
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        if command is not None:
+            return {"exit_code": 2, "stdout": "", "stderr": f"Unknown server command: {command}\n"}
+
+        argv = request.get("argv")
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            raise ValueError("'argv' must be a list of strings")
+        self.requests += 1
+        try:
+            return run_command_line(self._run, argv, str(request.get("cwd") or os.getcwd()))
+        finally:
+            if self._after_request is not None:
+                self._after_request()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)  # type: ignore[arg-type]
+        except OSError:
+            pass
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """
+    Remove a socket file left by a server that is gone.
+
+    Raises:
+        RuntimeError: If a server is still listening on it.
+    """
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"A server is already listening on {socket_path}")
+
+def _watch(workspace: Workspace, interval: float, stop: threading.Event) -> None:
+    """Reload the configurations whose files changed, every `interval` seconds until stopped."""
+    while not stop.wait(interval):
+        for ci_file in workspace.refresh():
+            logger.info(f"Reloaded {ci_file}")
+
+def serve(socket_path: Optional[str] = None, watch_interval: float = 1.0, log_level: int = logging.INFO) -> None:
+    """
+    Run the server until it is asked to shut down or interrupted.
+
+    Parameters:
+        socket_path (str): Path of the Unix socket (default: default_socket_path()).
+        watch_interval (float): Seconds between checks for changed files; 0 disables
+                                the background reloads (changes are still picked
+                                up when a request comes in).
+        log_level (int): Logging level of the server's own messages.
+
+    Raises:
+        RuntimeError: If Unix sockets are not supported or a server is already running.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("cimulator serve requires Unix domain sockets, which this platform does not support")
+    # Imported here: the command line module imports this one for the 'serve' command.
+    from cimulator import cli
+
+    socket_path = socket_path or default_socket_path()
+    workspace = Workspace()
+    cli.workspace = workspace
+
+    def restore_logging() -> None:
+        # Commands point the log handler at their captured stderr.
+        cli.setup_logging(log_level)
+
+    restore_logging()
+    stop = threading.Event()
+    server = CimulatorServer(socket_path, workspace, cli.main, after_request=restore_logging)
+    if watch_interval > 0:
+        threading.Thread(target=_watch, args=(workspace, watch_interval, stop), daemon=True).start()
+    logger.info(f"Serving on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        cli.workspace = None
+        logger.info("Server stopped")
@@ -1,25 +1,268 @@
+import time
 import logging
-from typing import List, Set, Tuple, Optional, Union
-from cimulator.types import JobDict, ConfigDict, VariablesDict
+from collections import ChainMap
+from functools import partial
+from typing import Any, Collection, Dict, Hashable, List, Mapping, Set, Tuple, Optional, Union, TYPE_CHECKING
+from cimulator.types import JobDict, ConfigDict, VariablesDict, VariablesMapping
 from cimulator.job_expander import expand_all_jobs
-from cimulator.workflow import evaluate_workflow, evaluate_rules
+from cimulator.workflow import RuleDecisionCache, evaluate_workflow, evaluate_rules
+from cimulator.condition_parser import CompiledCondition
 from cimulator.variable_expander import expand_variables
+from cimulator.variable_resolver import resolve_variables
 from cimulator.validator import validate_job_needs_dependencies
+from cimulator.regex_cache import rule_regex_cache
+from cimulator.parallel import map_in_processes, split_into_chunks
+from cimulator.profiling import phase, profiling_enabled, record_item
+
+if TYPE_CHECKING:
+    from cimulator.incremental import JobResultCache
 
 # Get the logger for this module
 logger = logging.getLogger(__name__)
 
-def simulate_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_variables: VariablesDict) -> ConfigDict:
+# Sections of a simulation summary, in order.
+SUMMARY_SECTIONS = (
+    "workflow_run",
+    "workflow_triggered_rule",
+    "workflow_applied_variables",
+    "global_variables",
+    "jobs_list",
+    "jobs",
+    "dependency_errors",
+    "all_expanded_jobs",
+    "regex_cache",
+)
+
+# Sections computed when none are requested. The regex cache counters describe
+# the run rather than the pipeline, so they are only reported on request.
+DEFAULT_SECTIONS = tuple(section for section in SUMMARY_SECTIONS if section != "regex_cache")
+
+def expand_job_body(job: JobDict, variables: VariablesMapping,
+                    interned: Optional[Dict[Hashable, Any]] = None) -> JobDict:
+    """
+    Expand the variables in a job whose 'variables' are already resolved.
+
+    The resolved 'variables' are kept as they are: expanding them a second
+    time would turn an escaped '$$VAR' (already resolved to '$VAR') into the
+    value of VAR.
+
+    Parameters:
+        job (dict): The job definition, with resolved 'variables' if any.
+        variables (mapping): The variables in scope.
+        interned (dict): Optional intern table (see expand_variables()).
+
+    Returns:
+        dict: The expanded job.
+    """
+    if "variables" not in job:
+        return expand_variables(job, variables, interned)
+    expanded_job = {}
+    for key, value in job.items():
+        if key == "variables":
+            expanded_job[key] = value
+        else:
+            new_key = expand_variables(key, variables, interned) if isinstance(key, str) else key
+            expanded_job[new_key] = expand_variables(value, variables, interned)
+    return expanded_job
+
+def simulate_job(job_name: str, job: JobDict, simulation_variables: VariablesMapping,
+                 expand_fields: Optional[Collection[str]] = None, debug_view: bool = True,
+                 interned: Optional[Dict[Hashable, Any]] = None,
+                 rule_cache: Optional[RuleDecisionCache] = None,
+                 conditions: Optional[Mapping[str, CompiledCondition]] = None,
+                 variable_order: Optional[List[List[str]]] = None) -> ConfigDict:
+    """
+    Simulate a single expanded job against the pipeline-level variables.
+
+    The job's variables are resolved once on top of the global and workflow
+    variables, its rules are evaluated in that scope, and its definition is
+    expanded. The result only depends on the job definition and on the
+    values it reads from simulation_variables.
+
+    Parameters:
+        job_name (str): Name of the job, used for logging.
+        job (dict): The expanded job definition (it is not modified).
+        simulation_variables (mapping): Global variables merged with the workflow variables.
+        expand_fields (collection): If given, only these top-level keys of a
+                                    running job are expanded into expanded_job,
+                                    instead of the whole job.
+        debug_view (bool): Whether to compute all_expanded_job.
+        interned (dict): Optional intern table shared with the other jobs of the
+                         pipeline, so equal expanded structures are stored once.
+        rule_cache (RuleDecisionCache): Optional cache of rule decisions, reused
+                                        when the variables the rules read are unchanged.
+        conditions (mapping): Optional compiled rule conditions by text
+                              (see pipeline.compile_rule_conditions).
+        variable_order (list): Optional result of order_variables() for the
+                               job's variables.
+
+    Returns:
+        dict: The job's simulation result with the keys:
+              - should_run: Whether the job runs in this pipeline.
+              - triggered_rule / triggered_condition: The rule that decided it (None without rules).
+              - applied_variables: Variables applied by the triggered rule.
+              - job_variables: The job's resolved variables.
+              - expanded_job: The fully expanded job, or None if it does not run.
+              - all_expanded_job: The job expanded with its own variables only,
+                as listed in 'all_expanded_jobs' for debugging (None if not
+                requested).
+    """
+    # Job definitions are large: only format them when debug logging is on.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(f"Processing job '{job_name}': {job}")
+
+    # Resolve the job's variables on top of the global and workflow variables.
+    # Nested references between job variables are resolved in dependency order.
+    with phase("variables"):
+        job_variables = resolve_variables(job.get("variables", {}), simulation_variables, variable_order)
+
+    # The job's scope layers its own variables over the shared global ones
+    # without copying them.
+    job_simulation_variables = ChainMap(job_variables, simulation_variables)
+
+    should_run = True
+    triggered_rule = None
+    applied_variables: VariablesDict = {}
+    triggered_condition = None
+
+    # Evaluate job-level rules if they exist.
+    job_rules = job.get("rules")
+    if job_rules:
+        with phase("rules"):
+            if rule_cache is not None:
+                should_run, triggered_rule, applied_variables, triggered_condition = rule_cache.evaluate(job_rules, job_simulation_variables, conditions)
+            else:
+                should_run, triggered_rule, applied_variables, triggered_condition = evaluate_rules(job_rules, job_simulation_variables, conditions)
+        if debug:
+            logger.debug(f"Job '{job_name}' rules evaluation: should_run={should_run}, triggered_condition={triggered_condition}, variables={applied_variables}")
+
+    # Create a copy of the job with the fully expanded variables
+    job_with_expanded_variables = job.copy()
+    job_with_expanded_variables["variables"] = job_variables
+
+    expanded_job = None
+    if should_run:
+        # Expand all variables in the job definition, including the ones applied by its rule.
+        job_body = job_with_expanded_variables
+        if expand_fields is not None:
+            job_body = {key: job_body[key] for key in expand_fields if key in job_body}
+        with phase("expand"):
+            expanded_job = expand_job_body(job_body, job_simulation_variables.new_child(applied_variables), interned)
+        if debug:
+            logger.debug(f"Final expanded job '{job_name}': {expanded_job}")
+    else:
+        logger.debug(f"Job '{job_name}' will be skipped based on its rules.")
+
+    all_expanded_job = None
+    if debug_view:
+        # The debugging view of the job only uses the job's own variables.
+        debug_job = job_with_expanded_variables if "variables" in job else job
+        with phase("debug view"):
+            all_expanded_job = expand_job_body(debug_job, job_simulation_variables, interned)
+
+    return {
+        "should_run": should_run,
+        "triggered_rule": triggered_rule,
+        "triggered_condition": triggered_condition,
+        "applied_variables": applied_variables,
+        "job_variables": job_variables,
+        "expanded_job": expanded_job,
+        "all_expanded_job": all_expanded_job,
+    }
+
+def evaluate_pipeline_variables(workflow_config: ConfigDict, global_variables: VariablesDict,
+                                conditions: Optional[Mapping[str, CompiledCondition]] = None
+                                ) -> Tuple[bool, Optional[ConfigDict], VariablesDict, VariablesDict]:
+    """
+    Resolve the global variables and evaluate the workflow with them.
+
+    Parameters:
+        workflow_config (dict): Workflow configuration dictionary.
+        global_variables (dict): Global variables for the simulation.
+        conditions (mapping): Optional compiled rule conditions by text.
+
+    Returns:
+        tuple: (workflow_run, workflow_triggered_rule, workflow_applied_variables,
+                simulation_variables), where simulation_variables are the resolved
+                global variables merged with the workflow variables.
+    """
+    # Resolve references between global variables once; every later layer
+    # (workflow, job, rule) is resolved on top of this shared layer.
+    if not isinstance(global_variables, dict):
+        logger.warning(f"Global variables is not a dictionary: {global_variables}")
+        global_variables = {}
+    resolved_global_variables = resolve_variables(global_variables, {})
+
+    # Evaluate the workflow.
+    wf_run, wf_rule, wf_vars, wf_triggered_condition = evaluate_workflow(workflow_config, resolved_global_variables, conditions)
+    logger.debug(f"Workflow evaluation: should_run={wf_run}, triggered_condition={wf_triggered_condition}, variables={wf_vars}")
+
+    # Merge workflow variables with the global variables.
+    # This layer is shared by every job, so the per-job work only resolves
+    # each job's own variables.
+    simulation_variables = resolved_global_variables.copy()
+    simulation_variables.update(wf_vars)
+    logger.debug(f"Global variables after merging workflow variables: {simulation_variables}")
+    return wf_run, wf_rule, wf_vars, simulation_variables
+
+# State shared by the workers simulating chunks of jobs: (expanded_jobs,
+# simulation_variables, expand_fields, debug_view, rule_cache, conditions, timed).
+JobChunkState = Tuple[JobDict, VariablesDict, Optional[Collection[str]], bool,
+                      Optional[RuleDecisionCache], Optional[Mapping[str, CompiledCondition]], bool]
+
+def _simulate_job_chunk(state: JobChunkState, job_names: List[str]
+                        ) -> Tuple[List[Tuple[str, ConfigDict]], Dict[str, int], List[Tuple[str, float]]]:
+    """
+    Simulate a chunk of jobs in a worker process.
+
+    Parameters:
+        state (tuple): The JobChunkState shared by the pool. Each worker has
+                       its own copy of the rule cache, shared by its chunks.
+        job_names (list): Names of the jobs to simulate.
+
+    Returns:
+        tuple: The (job_name, result) pairs in order, the worker's rule regex
+               cache hit/miss counts for the chunk, and the (job_name, seconds)
+               each job took if timed is set (empty otherwise).
+    """
+    expanded_jobs, simulation_variables, expand_fields, debug_view, rule_cache, conditions, timed = state
+    stats_before = rule_regex_cache.thread_stats()
+    interned: Dict[Hashable, Any] = {}
+    results = []
+    timings = []
+    for job_name in job_names:
+        job_start = time.perf_counter() if timed else 0.0
+        results.append((job_name, simulate_job(job_name, expanded_jobs[job_name], simulation_variables,
+                                               expand_fields, debug_view, interned, rule_cache, conditions)))
+        if timed:
+            timings.append((job_name, time.perf_counter() - job_start))
+    stats_after = rule_regex_cache.thread_stats()
+    return results, {
+        "hits": stats_after["hits"] - stats_before["hits"],
+        "misses": stats_after["misses"] - stats_before["misses"],
+    }, timings
+
+def simulate_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_variables: VariablesDict,
+                      job_cache: Optional["JobResultCache"] = None,
+                      expanded_jobs: Optional[JobDict] = None,
+                      processes: int = 1,
+                      job_results: Optional[Dict[str, ConfigDict]] = None,
+                      sections: Optional[Collection[str]] = None,
+                      rule_cache: Optional[RuleDecisionCache] = None,
+                      conditions: Optional[Mapping[str, CompiledCondition]] = None) -> ConfigDict:
     """
     Simulate a pipeline by processing jobs, evaluating workflow rules, and expanding variables.
 
     Steps:
-      1. Evaluate the workflow configuration using the global variables.
-         This returns whether the pipeline should run and any workflow-level variables.
+      1. Resolve references between the global variables, then evaluate the workflow
+         configuration with them. This returns whether the pipeline should run and
+         any workflow-level variables.
       2. Merge the workflow-applied variables with the global variables.
       3. Expand all job definitions.
-      4. For each job, if a job-level "rules" section exists, evaluate its rules
-         (using the same generic rules evaluation function) and merge job-specific variables.
+      4. For each job, resolve its variables once on top of the global layer. If a
+         job-level "rules" section exists, evaluate its rules (using the same generic
+         rules evaluation function) and merge job-specific variables.
       5. Expand variables within the job definition.
       6. Log each step for debugging purposes.
 
@@ -27,92 +270,113 @@ def simulate_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_var
         all_jobs (dict): Dictionary of job definitions.
         workflow_config (dict): Workflow configuration dictionary.
         global_variables (dict): Global variables for the simulation.
+        job_cache (JobResultCache): Optional cache of per-job results from a
+                                    previous run (see cimulator.incremental).
+                                    Jobs whose definition and read variables
+                                    are unchanged reuse their previous result.
+        expanded_jobs (dict): Optional result of expand_all_jobs(all_jobs, shared=True),
+                              so that several simulations of the same jobs
+                              only expand them once.
+        processes (int): Number of worker processes used to simulate the jobs.
+                         Values above 1 simulate chunks of jobs on a process
+                         pool; the summary is identical to the serial one.
+                         Ignored when job_cache is given.
+        job_results (dict): Optional dictionary filled in place with the
+                            simulate_job() result of every job, e.g. to report
+                            the rule that decided each job.
+        sections (collection): Names of the summary sections to compute (see
+                               SUMMARY_SECTIONS); DEFAULT_SECTIONS by default.
+                               Without 'jobs', only the 'needs' of running
+                               jobs are expanded, and without
+                               'all_expanded_jobs' the debugging view of the
+                               jobs is not computed at all.
+        rule_cache (RuleDecisionCache): Optional cache of job rule decisions
+                                        shared by several simulations of the
+                                        same expanded jobs. With several
+                                        processes, each worker uses a copy:
+                                        the decisions made in the workers are
+                                        not added to it.
+        conditions (mapping): Optional compiled workflow and job rule conditions
+                              by text (see pipeline.compile_rule_conditions).
 
     Returns:
         dict: A simulation summary that includes:
               - Whether the workflow permits a run.
               - The triggered workflow rule and its applied variables.
               - The final expanded jobs.
+              - On request, the rule regex cache hits and misses of this run
+                (summed over the workers), for patterns read from variables.
+                They are counted in the threads running the simulation, so
+                concurrent runs in other threads do not add to them.
+              Expanded jobs share equal structures with each other and with
+              all_jobs, so the summary must not be modified in place.
     """
     logger.debug("Starting pipeline simulation.")
+    regex_stats_before = rule_regex_cache.thread_stats()
 
-    # Evaluate the workflow.
-    wf_run, wf_rule, wf_vars, wf_triggered_condition = evaluate_workflow(workflow_config, global_variables)
-    logger.debug(f"Workflow evaluation: should_run={wf_run}, triggered_condition={wf_triggered_condition}, variables={wf_vars}")
+    requested_sections = set(DEFAULT_SECTIONS if sections is None else sections)
+    unknown_sections = requested_sections.difference(SUMMARY_SECTIONS)
+    if unknown_sections:
+        raise ValueError(f"Unknown summary sections: {', '.join(sorted(unknown_sections))}")
+    # Dependency errors only need the expanded 'needs' of running jobs.
+    expand_fields = None if "jobs" in requested_sections else ("needs",)
+    debug_view = "all_expanded_jobs" in requested_sections
 
-    # Merge workflow variables with the global variables.
-    if not isinstance(global_variables, dict):
-        logger.warning(f"Global variables is not a dictionary: {global_variables}")
-        simulation_variables = {}
-    else:
-        simulation_variables = global_variables.copy()
-    simulation_variables.update(wf_vars)
-    logger.debug(f"Global variables after merging workflow variables: {simulation_variables}")
+    with phase("workflow"):
+        wf_run, wf_rule, wf_vars, simulation_variables = evaluate_pipeline_variables(workflow_config, global_variables,
+                                                                                     conditions)
 
-    # Expand all job definitions.
-    expanded_jobs = expand_all_jobs(all_jobs)
-    simulation_jobs = {}
+    # Expand all job definitions, unless the caller already did.
+    # Jobs are only read below, so they can share structure with their templates.
+    if expanded_jobs is None:
+        with phase("extends"):
+            expanded_jobs = expand_all_jobs(all_jobs, shared=True)
 
     # Process jobs in a deterministic order to ensure dependencies are handled correctly
     # Sort job names to ensure consistent processing order
     sorted_job_names = sorted(expanded_jobs.keys())
 
-    for job_name in sorted_job_names:
-        job = expanded_jobs[job_name]
-        logger.debug(f"Processing job '{job_name}': {job}")
+    results: Dict[str, ConfigDict] = {}
+    worker_regex_stats = {"hits": 0, "misses": 0}
+    profiling = profiling_enabled()
+    with phase("jobs"):
+        if processes > 1 and job_cache is None and len(sorted_job_names) > 1:
+            # Jobs are independent, so chunks of them are simulated on a process pool.
+            # The expanded jobs are shared with the workers once, and chunks come back
+            # in order, so results has the same order as in the serial path.
+            chunks = split_into_chunks(sorted_job_names, processes)
+            # Workers do not report phases, so they time their jobs for the profiler here.
+            for chunk_results, chunk_regex_stats, chunk_timings in map_in_processes(
+                    _simulate_job_chunk, (expanded_jobs, simulation_variables, expand_fields, debug_view,
+                                          rule_cache, conditions, profiling),
+                    chunks, processes):
+                results.update(chunk_results)
+                worker_regex_stats["hits"] += chunk_regex_stats["hits"]
+                worker_regex_stats["misses"] += chunk_regex_stats["misses"]
+                for job_name, seconds in chunk_timings:
+                    record_item("job", job_name, seconds)
+        else:
+            # Equal expanded strings, lists and dicts are stored once for all jobs.
+            interned: Dict[Hashable, Any] = {}
+            for job_name in sorted_job_names:
+                job_start = time.perf_counter() if profiling else 0.0
+                if job_cache is not None:
+                    # Cached results are complete, whatever the requested sections.
+                    results[job_name] = job_cache.simulate(job_name, expanded_jobs[job_name], simulation_variables,
+                                                           partial(simulate_job, interned=interned,
+                                                                   rule_cache=rule_cache, conditions=conditions))
+                else:
+                    results[job_name] = simulate_job(job_name, expanded_jobs[job_name], simulation_variables,
+                                                     expand_fields, debug_view, interned, rule_cache, conditions)
+                if profiling:
+                    record_item("job", job_name, time.perf_counter() - job_start)
+                # We don't update the global simulation variables with job-specific variables
+                # to maintain proper variable scoping between jobs
 
-        # Get the job's variables section
-        job_variables = job.get("variables", {})
-
-        # Create a copy of the simulation variables for this job
-        job_simulation_variables = simulation_variables.copy()
-
-        # Expand variables in multiple passes to handle nested references
-        # First pass: expand using global variables
-        expanded_job_variables = expand_variables(job_variables, job_simulation_variables)
-        # Create a temporary variables dictionary that includes both global and job variables
-        temp_variables = job_simulation_variables.copy()
-        temp_variables.update(expanded_job_variables)
-        # Second pass: expand again using the combined variables
-        expanded_job_variables = expand_variables(job_variables, temp_variables)
-        # Update the temporary variables with the new expanded values
-        temp_variables = job_simulation_variables.copy()
-        temp_variables.update(expanded_job_variables)
-        # Third pass: expand once more to handle deeper nesting (e.g., $VAR2 in $VAR3)
-        expanded_job_variables = expand_variables(job_variables, temp_variables)
-
-        # Create a copy of the job with the fully expanded variables
-        job_with_expanded_variables = job.copy()
-        job_with_expanded_variables["variables"] = expanded_job_variables
-
-        # Update the job's simulation variables with the fully expanded job variables
-        job_simulation_variables = simulation_variables.copy()
-        job_simulation_variables.update(expanded_job_variables)
-
-        # Evaluate job-level rules if they exist.
-        job_rules = job.get("rules")
-        if job_rules:
-            # Use the job's expanded variables when evaluating the job's rules
-            # First, ensure job variables are properly expanded for rule evaluation
-            job_simulation_variables_for_rules = job_simulation_variables.copy()
-            job_simulation_variables_for_rules.update(expanded_job_variables)
-
-            should_run, triggered_rule, job_vars, triggered_condition = evaluate_rules(job_rules, job_simulation_variables_for_rules)
-
-            logger.debug(f"Job '{job_name}' rules evaluation: should_run={should_run}, triggered_condition={triggered_condition}, variables={job_vars}")
-            if not should_run:
-                logger.debug(f"Job '{job_name}' will be skipped based on its rules.")
-                continue
-            # Merge job-specific variables into the simulation variables.
-            job_simulation_variables.update(job_vars)
-
-        # Expand all variables in the job definition.
-        expanded_job = expand_variables(job_with_expanded_variables, job_simulation_variables)
-        simulation_jobs[job_name] = expanded_job
-        logger.debug(f"Final expanded job '{job_name}': {expanded_job}")
-
-        # We don't update the global simulation variables with job-specific variables
-        # to maintain proper variable scoping between jobs
+    simulation_jobs = {
+        job_name: result["expanded_job"]
+        for job_name, result in results.items() if result["should_run"]
+    }
 
     # Create a list of job names that will run (excluding template jobs that start with a dot)
     jobs_list = [job_name for job_name in simulation_jobs.keys() if not job_name.startswith('.')]
@@ -122,38 +386,22 @@ def simulate_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_var
 
     # Check for needs dependencies on jobs that won't run
     running_jobs = set(jobs_list)
-    dependency_errors = validate_job_needs_dependencies(simulation_jobs, running_jobs)
+    with phase("dependencies"):
+        dependency_errors = validate_job_needs_dependencies(simulation_jobs, running_jobs)
 
     # Include all expanded jobs (including template jobs) for debugging
-    # TODO rewrite this AI garbage
-    all_expanded_jobs = {}
-    # Process each job by properly expanding variables using both global and job-specific variables
-    for job_name, job in expanded_jobs.items():
-        # Get the job's variables section
-        job_variables = job.get("variables", {})
-
-        # Create a copy of the simulation variables for this job
-        job_simulation_variables = simulation_variables.copy()
-
-        # Expand variables in multiple passes to handle nested references
-        # First pass: expand using global variables
-        expanded_job_variables = expand_variables(job_variables, job_simulation_variables)
-        # Create a temporary variables dictionary that includes both global and job variables
-        temp_variables = job_simulation_variables.copy()
-        temp_variables.update(expanded_job_variables)
-        # Second pass: expand again using the combined variables
-        expanded_job_variables = expand_variables(job_variables, temp_variables)
-        # Update the temporary variables with the new expanded values
-        temp_variables = job_simulation_variables.copy()
-        temp_variables.update(expanded_job_variables)
-        # Third pass: expand once more to handle deeper nesting
-        expanded_job_variables = expand_variables(job_variables, temp_variables)
-
-        # Merge the expanded job variables into the simulation variables for this job
-        job_simulation_variables.update(expanded_job_variables)
-
-        # Apply the full variable expansion to the job
-        all_expanded_jobs[job_name] = expand_variables(job.copy(), job_simulation_variables)
+    all_expanded_jobs = None
+    if debug_view:
+        all_expanded_jobs = {job_name: results[job_name]["all_expanded_job"] for job_name in expanded_jobs}
+
+    if job_results is not None:
+        job_results.update(results)
+
+    regex_stats_after = rule_regex_cache.thread_stats()
+    regex_cache_stats = {
+        "hits": regex_stats_after["hits"] - regex_stats_before["hits"] + worker_regex_stats["hits"],
+        "misses": regex_stats_after["misses"] - regex_stats_before["misses"] + worker_regex_stats["misses"],
+    }
 
     simulation_summary = {
         "workflow_run": wf_run,
@@ -163,8 +411,105 @@ def simulate_pipeline(all_jobs: JobDict, workflow_config: ConfigDict, global_var
         "jobs_list": jobs_list,
         "jobs": real_jobs,
         "dependency_errors": dependency_errors,
-        "all_expanded_jobs": all_expanded_jobs  # Include all expanded jobs with variables substituted
+        "all_expanded_jobs": all_expanded_jobs,  # Include all expanded jobs with variables substituted
+        "regex_cache": regex_cache_stats
     }
 
     logger.debug("Pipeline simulation complete.")
-    return simulation_summary
+    return select_sections(simulation_summary, sections)
+
+def select_sections(simulation_summary: ConfigDict, sections: Optional[Collection[str]]) -> ConfigDict:
+    """
+    Keep only the given sections of a simulation summary.
+
+    Parameters:
+        simulation_summary (dict): The summary returned by simulate_pipeline().
+        sections (collection): Names of the sections to keep, or None to keep DEFAULT_SECTIONS.
+
+    Returns:
+        dict: The summary restricted to the requested sections.
+    """
+    if sections is None:
+        sections = DEFAULT_SECTIONS
+    return {key: value for key, value in simulation_summary.items() if key in sections}
+
+def _simulate_profile(state: Tuple[JobDict, ConfigDict, JobDict, RuleDecisionCache],
+                      global_variables: VariablesDict) -> ConfigDict:
+    """
+    Simulate one profile in a worker process, from the
+    (all_jobs, workflow_config, expanded_jobs, rule_cache) state.
+    Each worker has its own copy of the rule cache, shared by the profiles it simulates.
+    """
+    all_jobs, workflow_config, expanded_jobs, rule_cache = state
+    return simulate_pipeline(all_jobs, workflow_config, global_variables, expanded_jobs=expanded_jobs,
+                             rule_cache=rule_cache)
+
+def simulate_profiles(all_jobs: JobDict, workflow_config: ConfigDict, gitlab_variables: VariablesDict,
+                      profiles: ConfigDict, processes: int = 1) -> Dict[str, ConfigDict]:
+    """
+    Simulate the same pipeline for several simulation profiles.
+
+    The jobs are expanded once and shared by every profile's simulation.
+    Job rule decisions are cached across profiles by the values of the
+    variables each rule list reads, so a job whose rules only read variables
+    equal to an earlier profile's reuses that decision.
+    With several processes, profiles are simulated in parallel on a process
+    pool (a single profile has its jobs simulated in parallel instead).
+
+    Parameters:
+        all_jobs (dict): Dictionary of job definitions.
+        workflow_config (dict): Workflow configuration dictionary.
+        gitlab_variables (dict): Global variables defined in the GitLab CI file.
+        profiles (dict): Maps profile names to their variables. Profile variables
+                         take precedence over the GitLab CI variables.
+        processes (int): Number of worker processes.
+
+    Returns:
+        dict: Maps each profile name to its simulation summary, in the order of profiles.
+    """
+    expanded_jobs = expand_all_jobs(all_jobs, shared=True)
+    rule_cache = RuleDecisionCache()
+    profile_globals = {
+        profile: {**gitlab_variables, **(profile_variables or {})}
+        for profile, profile_variables in profiles.items()
+    }
+
+    if processes > 1 and len(profile_globals) > 1:
+        logger.debug(f"Simulating {len(profile_globals)} profiles on {processes} processes")
+        results = map_in_processes(_simulate_profile, (all_jobs, workflow_config, expanded_jobs, rule_cache),
+                                   list(profile_globals.values()), processes)
+        return dict(zip(profile_globals, results))
+
+    summaries = {}
+    for profile, global_variables in profile_globals.items():
+        logger.debug(f"Simulating profile '{profile}'")
+        summaries[profile] = simulate_pipeline(all_jobs, workflow_config, global_variables,
+                                               expanded_jobs=expanded_jobs, processes=processes,
+                                               rule_cache=rule_cache)
+    logger.debug(f"Rule decisions: {rule_cache.hits} reused, {rule_cache.misses} evaluated")
+    return summaries
+
+def build_profile_matrix(all_jobs: JobDict, summaries: Dict[str, ConfigDict]) -> ConfigDict:
+    """
+    Build a cross-profile matrix of which jobs run in which profile.
+
+    Parameters:
+        all_jobs (dict): Dictionary of job definitions.
+        summaries (dict): Maps profile names to their simulation summaries.
+
+    Returns:
+        dict: A matrix with the keys:
+              - profiles: For each profile, whether the workflow runs and how many jobs run.
+              - jobs: For each job (templates excluded), whether it runs in each profile.
+    """
+    running_jobs = {profile: set(summary["jobs_list"]) for profile, summary in summaries.items()}
+    return {
+        "profiles": {
+            profile: {"workflow_run": summary["workflow_run"], "jobs_count": len(summary["jobs_list"])}
+            for profile, summary in summaries.items()
+        },
+        "jobs": {
+            job_name: {profile: job_name in running_jobs[profile] for profile in summaries}
+            for job_name in all_jobs if not job_name.startswith('.')
+        },
+    }
@@ -1,34 +1,184 @@
+"""
+Expansion of $VAR and ${VAR} references in strings and nested job definitions.
+
+Strings are compiled once into templates of literal text and variable names,
+and templates are cached by string, so the same script line shared by many
+jobs is only tokenized once. Strings without a '$' are returned as they are,
+and so are lists and dicts in which nothing changed, so expanding large
+variable-free blocks neither tokenizes nor copies anything.
+
+Given an intern table, the strings, lists and dicts created by an expansion
+are also interned: an expanded value equal to one already in the table is
+replaced by that object, so jobs built from the same template share their
+expanded script, cache and artifacts structures instead of each holding a copy.
+
+As in GitLab CI, '$$' is an escaped '$': '$$VAR' expands to the literal '$VAR'.
+"""
+
 import re
-from typing import Any, List, Union, Optional
-from cimulator.types import VariablesDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+from cimulator.types import VariablesMapping
+
+# A variable reference ($VAR or ${VAR}) or an escaped dollar sign ($$).
+_TOKEN_RE = re.compile(r'\$\$|\$(\w+)|\$\{(\w+)\}')
+
+# Maximum number of compiled templates kept; the cache is emptied when it is full.
+TEMPLATE_CACHE_SIZE = 65536
+
+# A compiled string: either the literal result (no variable references), or a
+# tuple alternating literal text and variable names, starting and ending with
+# literal text.
+Template = Union[str, Tuple[str, ...]]
+
+_templates: Dict[str, Template] = {}
+
+def compile_template(text: str) -> Template:
+    """
+    Split a string into literal text and variable references.
+
+    Parameters:
+        text (str): The string to compile.
+
+    Returns:
+        The string itself if it contains nothing to expand, the unescaped
+        string if it only contains '$$' escapes, or a tuple
+        (literal, name, literal, ..., name, literal) otherwise.
+    """
+    template = _templates.get(text)
+    if template is not None:
+        return template
+
+    parts = []
+    literal = []
+    position = 0
+    for match in _TOKEN_RE.finditer(text):
+        literal.append(text[position:match.start()])
+        name = match.group(1) or match.group(2)
+        if name is None:
+            literal.append("$")
+        else:
+            parts.append("".join(literal))
+            parts.append(name)
+            literal = []
+        position = match.end()
+    literal.append(text[position:])
+
+    if parts:
+        parts.append("".join(literal))
+        template = tuple(parts)
+    elif position:
+        template = "".join(literal)
+    else:
+        template = text
+
+    if len(_templates) >= TEMPLATE_CACHE_SIZE:
+        _templates.clear()
+    _templates[text] = template
+    return template
 
-def expand_variables_in_string(text: str, variables: VariablesDict) -> str:
+def expand_variables_in_string(text: str, variables: VariablesMapping) -> str:
     """
     Replace placeholders in a string with corresponding variable values.
-    Supports placeholders in the form $VAR or ${VAR}.
+    Supports placeholders in the form $VAR or ${VAR}; '$$' is a literal '$'.
+    Undefined variables expand to an empty string.
+    """
+    if "$" not in text:
+        return text
+    template = _templates.get(text)
+    if template is None:
+        template = compile_template(text)
+    if type(template) is str:
+        return template
+    if len(template) == 3:
+        # The common case of a single reference.
+        return template[0] + str(variables.get(template[1], "")) + template[2]
+    parts = list(template)
+    for index in range(1, len(parts), 2):
+        parts[index] = str(variables.get(parts[index], ""))
+    return "".join(parts)
+
+def _intern_key(item: Any) -> Hashable:
+    """Key identifying an item of an interned container."""
+    if type(item) is str:
+        return item
+    if isinstance(item, (dict, list)):
+        # Containers are identified by object (their id): the items of an
+        # interned container are themselves interned or shared, and are kept
+        # alive by it.
+        return id(item)
+    # Other values are wrapped with their type, so that they cannot be
+    # confused with strings or ids, and 1, 1.0 and True stay distinct.
+    return (type(item), item)
+
+def intern_container(obj: Union[Dict[Any, Any], List[Any]], interned: Dict[Hashable, Any]) -> Any:
     """
-    pattern = re.compile(r'\$(\w+)|\$\{(\w+)\}')
+    Return the object of the intern table equal to a new dict or list.
 
-    def replace(match):
-        var_name = match.group(1) or match.group(2)
-        return str(variables.get(var_name, ""))
+    Parameters:
+        obj: A dict or list whose items are interned or shared objects.
+        interned (dict): The intern table; obj is added to it if no equal
+                         object is there yet.
 
-    return pattern.sub(replace, text)
+    Returns:
+        The interned object, or obj itself if one of its items is unhashable.
+    """
+    try:
+        if isinstance(obj, dict):
+            key: Hashable = (dict, tuple((_intern_key(name), _intern_key(value)) for name, value in obj.items()))
+        else:
+            key = (list, tuple([item if type(item) is str else _intern_key(item) for item in obj]))
+        return interned.setdefault(key, obj)
+    except TypeError:
+        return obj
 
-def expand_variables(obj: Any, variables: VariablesDict) -> Any:
+def expand_variables(obj: Any, variables: VariablesMapping, interned: Optional[Dict[Hashable, Any]] = None) -> Any:
     """
     Recursively expand variables in the given object.
     The object can be a dict, list, or string.
+
+    Dicts and lists whose items are all unchanged by the expansion are
+    returned as they are instead of being copied, so the result may share
+    structure with obj and must not be modified in place.
+
+    Parameters:
+        obj: The object to expand.
+        variables (mapping): The variables in scope.
+        interned (dict): Optional intern table shared by several expansions
+                         (e.g. all jobs of a pipeline). Strings, lists and
+                         dicts created by the expansion are replaced by equal
+                         objects already in the table, so equal results share
+                         structure.
     """
-    if isinstance(obj, dict):
-        new_obj = {}
-        for key, value in obj.items():
-            new_key = expand_variables_in_string(key, variables) if isinstance(key, str) else key
-            new_obj[new_key] = expand_variables(value, variables)
-        return new_obj
+    if isinstance(obj, str):
+        new_text = expand_variables_in_string(obj, variables)
+        if interned is not None and new_text is not obj:
+            return interned.setdefault(new_text, new_text)
+        return new_text
+    elif isinstance(obj, dict):
+        new_obj = None
+        for index, (key, value) in enumerate(obj.items()):
+            new_key = expand_variables(key, variables, interned) if isinstance(key, str) else key
+            new_value = expand_variables(value, variables, interned)
+            if new_obj is None:
+                if new_key is key and new_value is value:
+                    continue
+                # First change: copy the unchanged items seen so far.
+                new_obj = dict(item for _, item in zip(range(index), obj.items()))
+            new_obj[new_key] = new_value
+        if new_obj is None:
+            return obj
+        return new_obj if interned is None else intern_container(new_obj, interned)
     elif isinstance(obj, list):
-        return [expand_variables(item, variables) for item in obj]
-    elif isinstance(obj, str):
-        return expand_variables_in_string(obj, variables)
+        new_list = None
+        for index, item in enumerate(obj):
+            new_item = expand_variables(item, variables, interned)
+            if new_list is None:
+                if new_item is item:
+                    continue
+                new_list = obj[:index]
+            new_list.append(new_item)
+        if new_list is None:
+            return obj
+        return new_list if interned is None else intern_container(new_list, interned)
     else:
         return obj
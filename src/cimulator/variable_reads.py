@@ -0,0 +1,78 @@
+"""
+Tracking of the variables a computation reads.
+
+A computation run against a RecordingMapping leaves the exact set of
+variables it looked up, with the values it saw. Its result can then be
+reused for any other variables mapping in which those variables have the
+same values (see reads_match()).
+"""
+
+from collections import ChainMap
+from typing import Any, Dict, Iterator, Mapping, Tuple
+from cimulator.types import VariablesMapping
+
+def lookup_variable(variables: VariablesMapping, name: str) -> Tuple[bool, Any]:
+    """Return the (defined, value) pair of a variable; value is None if it is not defined."""
+    # The layers of a ChainMap scope are looked up directly, which is much
+    # faster than going through the ChainMap methods.
+    for layer in (variables.maps if type(variables) is ChainMap else (variables,)):
+        if name in layer:
+            return True, layer[name]
+    return False, None
+
+class RecordingMapping(Mapping[str, Any]):
+    """
+    Read-only view of a variables mapping that records every variable read.
+
+    Attributes:
+        reads (dict): Maps each variable name looked up to a (defined, value)
+                      pair, as seen at the time of the first lookup.
+        read_all (bool): True if the mapping was iterated, meaning the caller
+                         may depend on every variable.
+    """
+
+    def __init__(self, variables: VariablesMapping) -> None:
+        self._variables = variables
+        self.reads: Dict[str, Tuple[bool, Any]] = {}
+        self.read_all = False
+
+    def _record(self, key: str) -> Tuple[bool, Any]:
+        read = self.reads.get(key)
+        if read is None:
+            read = self.reads[key] = lookup_variable(self._variables, key)
+        return read
+
+    def __getitem__(self, key: str) -> Any:
+        defined, value = self._record(key)
+        if not defined:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        if isinstance(key, str):
+            return self._record(key)[0]
+        return key in self._variables
+
+    def get(self, key: str, default: Any = None) -> Any:
+        defined, value = self._record(key)
+        return value if defined else default
+
+    def __iter__(self) -> Iterator[str]:
+        self.read_all = True
+        return iter(self._variables)
+
+    def __len__(self) -> int:
+        return len(self._variables)
+
+def reads_match(reads: Dict[str, Tuple[bool, Any]], variables: VariablesMapping) -> bool:
+    """Check whether every recorded read still has the same value in variables."""
+    for name, (defined, value) in reads.items():
+        if (name in variables) != defined:
+            return False
+        if defined and variables[name] != value:
+            return False
+    return True
+
+def read_values(names: Tuple[str, ...], variables: VariablesMapping) -> Tuple[Tuple[bool, Any], ...]:
+    """Return the (defined, value) pair of each named variable, as a RecordingMapping records them."""
+    return tuple([lookup_variable(variables, name) for name in names])
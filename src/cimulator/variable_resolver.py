@@ -0,0 +1,126 @@
+"""
+Dependency-ordered resolution of GitLab CI variable definitions.
+
+Variables are defined in layers (global -> workflow -> job -> rule), and a
+definition may reference other variables of the same layer or of any layer
+below it. Instead of expanding a layer repeatedly until nested references
+settle, this module builds the reference graph of a layer, resolves it once
+in dependency order to arbitrary depth, and reports circular references.
+"""
+
+import logging
+from collections import ChainMap
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+from cimulator.types import VariablesDict, VariablesMapping
+from cimulator.variable_expander import compile_template, expand_variables
+from cimulator.graph import strongly_connected_components
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Maximum number of layers whose resolution order is kept; the cache is emptied when it is full.
+ORDER_CACHE_SIZE = 16384
+
+_orders: Dict[Tuple[Tuple[str, Any], ...], List[List[str]]] = {}
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    """Yield every string contained in a (possibly nested) variable value."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
+
+def find_variable_references(value: Any) -> Set[str]:
+    """
+    Return the names of all variables referenced by a variable value.
+
+    Parameters:
+        value: A variable value (string, or a nested dict/list of strings).
+
+    Returns:
+        set: The referenced variable names.
+    """
+    references = set()
+    for text in _iter_strings(value):
+        if "$" not in text:
+            continue
+        template = compile_template(text)
+        if not isinstance(template, str):
+            references.update(template[1::2])
+    return references
+
+def order_variables(layer: Mapping[str, Any]) -> List[List[str]]:
+    """
+    Group the variables of a layer into resolution order.
+
+    Computes the strongly connected components of the graph of references
+    between variables of the same layer. A variable referencing itself refers
+    to the definition in a lower layer, so self references are not edges.
+
+    Parameters:
+        layer (dict): Variable definitions of a single layer.
+
+    Returns:
+        list: Groups of variable names, each group listed after every group
+              it depends on. A group with more than one name is a cycle.
+              Orders are cached by layer content (when its values are
+              hashable), so the result must not be modified.
+    """
+    key = tuple(layer.items())
+    try:
+        order = _orders.get(key)
+    except TypeError:
+        # Unhashable values (e.g. {value:, description:} definitions) are not cached.
+        key = None
+        order = None
+    if order is not None:
+        return order
+
+    dependencies = {
+        name: [ref for ref in sorted(find_variable_references(value)) if ref in layer and ref != name]
+        for name, value in layer.items()
+    }
+    order = strongly_connected_components(dependencies)
+
+    if key is not None:
+        if len(_orders) >= ORDER_CACHE_SIZE:
+            _orders.clear()
+        _orders[key] = order
+    return order
+
+def resolve_variables(layer: Mapping[str, Any], base: VariablesMapping,
+                      order: Optional[List[List[str]]] = None) -> VariablesDict:
+    """
+    Resolve a layer of variable definitions on top of already resolved variables.
+
+    Each variable is expanded exactly once, after every variable of the same
+    layer it references, so references are resolved to arbitrary depth.
+    Variables that are part of a circular reference are expanded against the
+    values available at that point (the lower layers), and a warning is logged.
+
+    Parameters:
+        layer (dict): Variable definitions to resolve (e.g. a job's 'variables').
+        base (mapping): Fully resolved variables of the lower layers.
+        order (list): Optional result of order_variables(layer), for callers
+                      that resolve the same layer many times.
+
+    Returns:
+        dict: The resolved values of the layer's variables only, in the
+              layer's definition order.
+    """
+    if not isinstance(layer, dict) or not layer:
+        return {}
+
+    resolved: VariablesDict = {}
+    scope = ChainMap(resolved, base)
+    for group in order_variables(layer) if order is None else order:
+        if len(group) > 1:
+            logger.warning(f"Circular variable reference between: {', '.join(group)}")
+        for name in group:
+            resolved[name] = expand_variables(layer[name], scope)
+
+    return {name: resolved[name] for name in layer}
@@ -0,0 +1,633 @@
+"""
+Enumeration of the distinct variants of a pipeline (cimulator variants).
+
+The variables read by the workflow rules and the job rules, and not defined
+by the CI file or fixed by the caller, are symbolic inputs. Rules can only
+tell a few values of each apart: not set, empty, each string it is compared
+with, a string matching each regex it is matched against, and any other
+value. The variants are the paths of a decision diagram over these values.
+Rules are evaluated with a partial assignment, and a path only branches on
+a variable when an undecided rule reads it; decided jobs leave the path.
+Jobs with the same rules and variables are decided once, and the sub-diagram
+of the still undecided jobs is shared between paths that agree on the
+variables those jobs read. The work therefore grows with the number of
+distinct outcomes, not with the number of value combinations.
+
+Values built from symbolic variables (e.g. 'TARGET: "$A-$B"' compared with
+a string) are only tried with the values above, so each representative
+assignment is checked by evaluating the pipeline with it.
+"""
+
+import re
+import string
+import logging
+import itertools
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+from cimulator.types import ConfigDict, VariablesDict
+from cimulator.condition_parser import And, Comparison, Literal, Node, Or, RegexLiteral, Variable
+from cimulator.pipeline import Pipeline
+from cimulator.regex_cache import rule_regex_cache
+from cimulator.variable_expander import compile_template, expand_variables
+from cimulator.variable_resolver import find_variable_references
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Values tried, in order, for "any other value" of a symbolic variable.
+_OTHER_VALUES = ("other", "x", "0", "-")
+
+# A symbolic variable value; None means the variable is not set.
+Value = Optional[str]
+
+# Characters tried, in order, for a regex atom matching a single character.
+_CHARACTER_CANDIDATES = "a0-_ ~" + string.ascii_letters + string.digits + string.punctuation + "\t\n"
+
+# Escapes matching the empty string.
+_ZERO_WIDTH_ESCAPES = "bBAZ"
+
+_QUANTIFIER_RE = re.compile(r"\{(\d*)(,\d*)?\}")
+
+class _UnsupportedRegex(Exception):
+    """Raised for regex constructs the sampler does not cover."""
+
+class _RegexSampler:
+    """
+    Builds a string matching a regex from its source text.
+
+    Covers literals, escapes, character classes, groups, alternations,
+    quantifiers, anchors and lookarounds (which contribute nothing). Each
+    single-character atom is compiled on its own with the public re API and
+    given the first candidate character it matches (common characters first,
+    then the Basic Multilingual Plane). Back references,
+    conditional groups and verbose patterns are not covered.
+    """
+
+    def __init__(self, pattern: str, flags: int) -> None:
+        self.pattern = pattern
+        self.flags = flags
+        self.position = 0
+
+    def sample(self) -> str:
+        example = self._alternation()
+        if self.position != len(self.pattern):
+            raise _UnsupportedRegex(f"unexpected '{self.pattern[self.position]}'")
+        return example
+
+    def _peek(self) -> str:
+        return self.pattern[self.position] if self.position < len(self.pattern) else ""
+
+    def _alternation(self) -> str:
+        # The first alternative is the example; the others are only parsed.
+        example = self._sequence()
+        while self._peek() == "|":
+            self.position += 1
+            self._sequence()
+        return example
+
+    def _sequence(self) -> str:
+        parts = []
+        while self._peek() not in ("", "|", ")"):
+            atom = self._atom()
+            parts.append(atom * self._quantifier_minimum())
+        return "".join(parts)
+
+    def _quantifier_minimum(self) -> int:
+        char = self._peek()
+        if char in ("*", "?"):
+            minimum = 0
+            self.position += 1
+        elif char == "+":
+            minimum = 1
+            self.position += 1
+        elif char == "{" and (match := _QUANTIFIER_RE.match(self.pattern, self.position)) \
+                and (match.group(1) or match.group(2)):
+            minimum = int(match.group(1) or 0)
+            self.position = match.end()
+        else:
+            return 1
+        # Lazy and possessive forms match the same strings.
+        if self._peek() in ("?", "+"):
+            self.position += 1
+        return minimum
+
+    def _atom(self) -> str:
+        char = self._peek()
+        if char == "(":
+            return self._group()
+        if char in ("^", "$"):
+            self.position += 1
+            return ""
+        if char == "[":
+            return self._single(self._class_end())
+        if char == "\\":
+            return self._escape()
+        if char == ".":
+            return self._single(self.position + 1)
+        self.position += 1
+        return char
+
+    def _group(self) -> str:
+        self.position += 1
+        keep = True
+        if self._peek() == "?":
+            rest = self.pattern[self.position + 1:]
+            if rest.startswith(":"):
+                self.position += 2
+            elif rest.startswith("P<"):
+                self.position = self.pattern.index(">", self.position) + 1
+            elif rest.startswith(("=", "!")):
+                self.position += 2
+                keep = False
+            elif rest.startswith(("<=", "<!")):
+                self.position += 3
+                keep = False
+            elif rest.startswith("#"):
+                self.position = self.pattern.index(")", self.position) + 1
+                return ""
+            elif (match := re.match(r"[aiLmsux-]+([:)])", rest)) and "x" not in match.group(0):
+                # Inline flags: apply to the whole pattern or to the group.
+                self.position += 1 + match.end()
+                if match.group(1) == ")":
+                    return ""
+            else:
+                raise _UnsupportedRegex(f"group '(?{rest[:2]}'")
+        example = self._alternation()
+        if self._peek() != ")":
+            raise _UnsupportedRegex("unbalanced group")
+        self.position += 1
+        return example if keep else ""
+
+    def _class_end(self) -> int:
+        """Return the position after the character class starting at the current position."""
+        end = self.position + 1
+        if self.pattern.startswith("^", end):
+            end += 1
+        if self.pattern.startswith("]", end):
+            end += 1
+        while end < len(self.pattern) and self.pattern[end] != "]":
+            end += 2 if self.pattern[end] == "\\" else 1
+        if end >= len(self.pattern):
+            raise _UnsupportedRegex("unterminated character class")
+        return end + 1
+
+    def _escape(self) -> str:
+        char = self.pattern[self.position + 1:self.position + 2]
+        if char in _ZERO_WIDTH_ESCAPES:
+            self.position += 2
+            return ""
+        if char.isdigit():
+            raise _UnsupportedRegex("back reference")
+        if char == "N":
+            return self._single(self.pattern.index("}", self.position) + 1)
+        length = {"x": 4, "u": 6, "U": 10}.get(char, 2)
+        return self._single(self.position + length)
+
+    def _single(self, end: int) -> str:
+        """Return a character matched by the single-character atom ending at end."""
+        atom = re.compile(self.pattern[self.position:end], self.flags)
+        self.position = end
+        candidates = itertools.chain(_CHARACTER_CANDIDATES, map(chr, range(0x10000)))
+        match = next((char for char in candidates if atom.fullmatch(char)), None)
+        if match is None:
+            raise _UnsupportedRegex(f"no candidate character for '{atom.pattern}'")
+        return match
+
+def regex_example(literal: str) -> Optional[str]:
+    """
+    Return a string matched by a GitLab '/pattern/flags' rule regex.
+
+    The example is built from the pattern's source (see _RegexSampler) and
+    checked against the compiled regex. Patterns it cannot handle are
+    treated as opaque values: no example is returned, so variables matched
+    against them are only tried with the other values, and variants that
+    need a match may be missing.
+
+    Parameters:
+        literal (str): The regex literal.
+
+    Returns:
+        str: A matching string, or None if the regex is invalid or none was found.
+    """
+    compiled = rule_regex_cache.get_literal(literal)
+    if compiled is None or compiled.flags & re.VERBOSE:
+        return None
+    try:
+        example = _RegexSampler(compiled.pattern, compiled.flags).sample()
+    except (_UnsupportedRegex, re.error, ValueError) as e:
+        logger.debug(f"Treating regex {literal} as opaque: {e}")
+        return None
+    if compiled.search(example) is None:
+        return None
+    return example
+
+def _comparisons(node: Node) -> Iterator[Comparison]:
+    """Yield the comparisons of a compiled condition."""
+    if isinstance(node, Comparison):
+        yield node
+    elif isinstance(node, (And, Or)):
+        for operand in node.operands:
+            yield from _comparisons(operand)
+
+def _alias(value: Any) -> Optional[str]:
+    """Return the variable a definition like 'X: $Y' copies, if it is one."""
+    if not isinstance(value, str) or "$" not in value:
+        return None
+    template = compile_template(value)
+    if isinstance(template, tuple) and len(template) == 3 and not template[0] and not template[2]:
+        return template[1]
+    return None
+
+class _Unassigned(Exception):
+    """Raised when a rule reads a symbolic variable that has no value on the current path."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.name = name
+
+class _AssignmentScope(Mapping):
+    """
+    The symbolic variables assigned on a path; reading any other variable raises _Unassigned.
+
+    If given, reads records the assigned variables read, in order.
+    """
+
+    def __init__(self, assignment: Dict[str, Value], reads: Optional[Dict[str, Value]] = None) -> None:
+        self._assignment = assignment
+        self._reads = reads
+
+    def __getitem__(self, name: str) -> str:
+        if name not in self._assignment:
+            raise _Unassigned(name)
+        value = self._assignment[name]
+        if self._reads is not None and name not in self._reads:
+            self._reads[name] = value
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, value in self._assignment.items() if value is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+class _LazyLayer(Mapping):
+    """
+    A layer of variable definitions over a lower scope, each resolved when first read.
+
+    Resolving on read means that a rule only depends on the symbolic
+    variables it actually reaches, not on every variable of the layer.
+    """
+
+    def __init__(self, definitions: Any, base: Mapping) -> None:
+        self._definitions = definitions if isinstance(definitions, dict) else {}
+        self._base = base
+        self._resolved: VariablesDict = {}
+        self._resolving: Set[str] = set()
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._definitions or name in self._resolving:
+            # Self references are expanded against the lower layers.
+            return self._base[name]
+        if name not in self._resolved:
+            self._resolving.add(name)
+            try:
+                self._resolved[name] = expand_variables(self._definitions[name], self)
+            finally:
+                self._resolving.discard(name)
+        return self._resolved[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(set(self._definitions) | set(self._base))
+
+    def __len__(self) -> int:
+        return len(set(self))
+
+class _Branch:
+    """A node of a job's decision diagram: the decision depends on the value of a variable."""
+
+    __slots__ = ("name", "children")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # Maps each value of the variable to the next node, or to the decision.
+        self.children: Dict[Value, Any] = {}
+
+class _VariantSolver:
+    """Decision diagram over the workflow and job rules of a pipeline."""
+
+    def __init__(self, pipeline: Pipeline, variables: VariablesDict) -> None:
+        self.conditions = pipeline.conditions
+        ci_variables = pipeline.variables if isinstance(pipeline.variables, dict) else {}
+        self.global_definitions = {**ci_variables, **variables}
+        workflow = pipeline.workflow_config if isinstance(pipeline.workflow_config, dict) else {}
+        workflow_rules = workflow.get("rules", [])
+        self.workflow_rules = [rule for rule in workflow_rules if isinstance(rule, dict)] \
+            if isinstance(workflow_rules, list) else []
+
+        layers = [rule.get("variables", {}) for rule in self.workflow_rules]
+        layers = [layer for layer in layers if isinstance(layer, dict)] + [self.global_definitions]
+
+        # Jobs with the same rules, and the same definitions of the variables
+        # their rules can read, make the same decision.
+        self.functions: List[Tuple[List[ConfigDict], Dict[str, Any]]] = []
+        self.function_jobs: List[List[str]] = []
+        self.supports: List[Tuple[str, ...]] = []
+        keys: Dict[str, int] = {}
+        for job_name in sorted(pipeline.rule_jobs):
+            if job_name.startswith('.'):
+                continue
+            job = pipeline.rule_jobs[job_name]
+            rules = job.get("rules") or []
+            job_variables = job.get("variables", {}) if isinstance(job.get("variables"), dict) else {}
+            support = self._support(rules, job_variables, layers)
+            relevant_variables = {name: value for name, value in job_variables.items() if name in support}
+            key = repr((rules, relevant_variables))
+            if key not in keys:
+                keys[key] = len(self.functions)
+                self.functions.append((rules, relevant_variables))
+                self.function_jobs.append([])
+                self.supports.append(tuple(sorted(support)))
+            self.function_jobs[keys[key]].append(job_name)
+
+        self._values = self._value_classes([job_variables for _, job_variables in self.functions] + layers)
+        self._union_supports: Dict[Tuple[int, ...], Tuple[str, ...]] = {}
+        # Decision diagram of each job function, by triggered workflow rule.
+        self._diagrams: Dict[Tuple[int, Optional[int]], Any] = {}
+        self._memo: Dict[Any, List[Tuple[FrozenSet[int], Dict[str, Value]]]] = {}
+        self.branched: Dict[str, List[Value]] = {}
+
+    @property
+    def diagram_size(self) -> int:
+        """Number of nodes of the variants decision diagram solved so far."""
+        return len(self._memo)
+
+    def _support(self, rules: List[ConfigDict], job_variables: Dict[str, Any],
+                 layers: List[Dict[str, Any]]) -> FrozenSet[str]:
+        """Every variable a job decision may read, through any variable definition."""
+        pending = []
+        for rule in rules:
+            compiled = self.conditions.get(rule.get("if")) if isinstance(rule, dict) else None
+            if compiled is not None:
+                pending.extend(compiled.variables)
+        names: Set[str] = set()
+        while pending:
+            name = pending.pop()
+            if name in names:
+                continue
+            names.add(name)
+            for layer in [job_variables] + layers:
+                if name in layer:
+                    pending.extend(find_variable_references(layer[name]))
+        return frozenset(names)
+
+    def _value_classes(self, layers: List[Dict[str, Any]]) -> Dict[str, List[Value]]:
+        """Collect the strings and regexes each variable is compared with, through aliases."""
+        literals: Dict[str, List[str]] = {}
+        regexes: Dict[str, List[str]] = {}
+        links: Dict[str, Set[str]] = {}
+
+        def link(first: str, second: str) -> None:
+            links.setdefault(first, set()).add(second)
+            links.setdefault(second, set()).add(first)
+
+        for compiled in self.conditions.values():
+            for comparison in _comparisons(compiled.root):
+                left, right = comparison.left, comparison.right
+                if comparison.operator in ("=~", "!~"):
+                    if not isinstance(left, Variable):
+                        continue
+                    pattern = None
+                    if isinstance(right, RegexLiteral):
+                        pattern = right.literal
+                    elif isinstance(right, Literal):
+                        pattern = right.value
+                    elif isinstance(right, Variable) and isinstance(self.global_definitions.get(right.name), str):
+                        pattern = self.global_definitions[right.name]
+                    if pattern:
+                        regexes.setdefault(left.name, []).append(pattern)
+                    continue
+                for first, second in ((left, right), (right, left)):
+                    if not isinstance(first, Variable):
+                        continue
+                    if isinstance(second, Literal) and second.value is not None:
+                        literals.setdefault(first.name, []).append(second.value)
+                    elif isinstance(second, Variable):
+                        link(first.name, second.name)
+
+        # 'X: $Y' makes the values X is compared with relevant to Y.
+        for layer in layers:
+            for name, value in layer.items():
+                target = _alias(value)
+                if target is not None:
+                    link(name, target)
+
+        values: Dict[str, List[Value]] = {}
+        for name in set(literals) | set(regexes) | set(links):
+            if name in values:
+                continue
+            component = {name}
+            pending = [name]
+            while pending:
+                for linked in links.get(pending.pop(), ()):
+                    if linked not in component:
+                        component.add(linked)
+                        pending.append(linked)
+            component_literals = [value for member in sorted(component) for value in literals.get(member, [])]
+            component_regexes = [regex for member in sorted(component) for regex in regexes.get(member, [])]
+            classes = self._classes(component_literals, component_regexes)
+            for member in component:
+                values[member] = classes
+        return values
+
+    @staticmethod
+    def _classes(literals: List[str], regexes: List[str]) -> List[Value]:
+        """The values a variable compared with literals and regexes is tried with."""
+        compiled = [pattern for pattern in map(rule_regex_cache.get_literal, regexes) if pattern is not None]
+        other = next((value for value in _OTHER_VALUES
+                      if value not in literals and not any(pattern.search(value) for pattern in compiled)),
+                     next(value for value in _OTHER_VALUES if value not in literals))
+        examples = [example for example in map(regex_example, regexes) if example is not None]
+        classes: List[Value] = []
+        for value in [None, ""] + literals + examples + [other]:
+            if value not in classes:
+                classes.append(value)
+        return classes
+
+    def values(self, name: str) -> List[Value]:
+        """The values tried for a symbolic variable."""
+        classes = self._values.get(name) or self._classes([], [])
+        self.branched.setdefault(name, classes)
+        return classes
+
+    def _decide(self, rules: List[ConfigDict], scope: Mapping) -> Tuple[Optional[int], bool]:
+        """Return the index of the first matching rule and whether it runs, as evaluate_rules() decides."""
+        for index, rule in enumerate(rules):
+            condition = rule.get("if")
+            if condition is None:
+                return index, rule.get("when", "always") != "never"
+            compiled = self.conditions.get(condition)
+            if compiled is not None and compiled.evaluate(scope):
+                return index, rule.get("when", "always") != "never"
+        return None, False
+
+    def workflow_outcomes(self, assignment: Dict[str, Value]) -> List[Tuple[Dict[str, Value], Optional[int], bool]]:
+        """Return (assignment, triggered rule index, workflow_run) for every path through the workflow rules."""
+        try:
+            rule_index, run = self._decide(self.workflow_rules,
+                                           _LazyLayer(self.global_definitions, _AssignmentScope(assignment)))
+        except _Unassigned as e:
+            outcomes = []
+            for value in self.values(e.name):
+                outcomes.extend(self.workflow_outcomes({**assignment, e.name: value}))
+            return outcomes
+        return [(assignment, rule_index, run)]
+
+    def job_decision(self, index: int, workflow_rule: Optional[int], assignment: Dict[str, Value]) -> Any:
+        """
+        Decide a job function under a partial assignment.
+
+        The rules are only evaluated when the job's decision diagram has no
+        path for the assignment yet; the variables read by the evaluation
+        then add that path.
+
+        Returns:
+            Whether the job runs, or the name of the unassigned variable its rules read.
+        """
+        key = (index, workflow_rule)
+        node = self._diagrams.get(key)
+        while isinstance(node, _Branch):
+            if node.name not in assignment:
+                return node.name
+            node = node.children.get(assignment[node.name])
+        if node is not None:
+            return node
+
+        reads: Dict[str, Value] = {}
+        scope = _LazyLayer(self.global_definitions, _AssignmentScope(assignment, reads))
+        if workflow_rule is not None:
+            scope = _LazyLayer(self.workflow_rules[workflow_rule].get("variables", {}), scope)
+        rules, job_variables = self.functions[index]
+        try:
+            decision = not rules or self._decide(rules, _LazyLayer(job_variables, scope))[1]
+        except _Unassigned as e:
+            decision = e.name
+
+        # Rules are deterministic, so the reads follow the existing path of the diagram.
+        leaf = _Branch(decision) if isinstance(decision, str) else decision
+        steps = list(reads.items())
+        if not steps:
+            self._diagrams[key] = leaf
+            return decision
+        if key not in self._diagrams:
+            self._diagrams[key] = _Branch(steps[0][0])
+        node = self._diagrams[key]
+        for position, (name, value) in enumerate(steps):
+            if position + 1 == len(steps):
+                node.children[value] = leaf
+            else:
+                if value not in node.children:
+                    node.children[value] = _Branch(steps[position + 1][0])
+                node = node.children[value]
+        return decision
+
+    def solve(self, assignment: Dict[str, Value], workflow_rule: Optional[int],
+              pending: Tuple[int, ...]) -> List[Tuple[FrozenSet[int], Dict[str, Value]]]:
+        """
+        Decide the pending job functions under a partial assignment.
+
+        Returns:
+            list: (functions that run, assignment of the extra variables read
+                  to reach that outcome) for each distinct outcome.
+        """
+        support = self._union_supports.get(pending)
+        if support is None:
+            support = tuple(sorted(set().union(*(self.supports[index] for index in pending))))
+            self._union_supports[pending] = support
+        key = (workflow_rule, pending, tuple((name, assignment[name]) for name in support if name in assignment))
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        running: Set[int] = set()
+        undecided: List[int] = []
+        needed: Counter = Counter()
+        for index in pending:
+            decision = self.job_decision(index, workflow_rule, assignment)
+            if decision is True:
+                running.add(index)
+            elif decision is not False:
+                undecided.append(index)
+                needed[decision] += 1
+
+        if not undecided:
+            result = [(frozenset(running), {})]
+        else:
+            # Branch on the variable most undecided jobs are waiting for.
+            name = needed.most_common(1)[0][0]
+            outcomes: Dict[FrozenSet[int], Dict[str, Value]] = {}
+            for value in self.values(name):
+                for branch_running, extension in self.solve({**assignment, name: value}, workflow_rule,
+                                                            tuple(undecided)):
+                    outcome = branch_running | running
+                    if outcome not in outcomes:
+                        outcomes[outcome] = {name: value, **extension}
+            result = list(outcomes.items())
+        self._memo[key] = result
+        return result
+
+def enumerate_variants(pipeline: Pipeline, variables: Optional[VariablesDict] = None,
+                       verify: bool = True) -> ConfigDict:
+    """
+    Enumerate the distinct outcomes of a pipeline over its symbolic variables.
+
+    Parameters:
+        pipeline (Pipeline): The compiled pipeline.
+        variables (dict): Variables with a fixed value; they override the CI
+                          file's variables and are not symbolic.
+        verify (bool): Whether to evaluate the pipeline with the representative
+                       assignment of each variant and flag any difference.
+
+    Returns:
+        dict: A dictionary with the keys:
+              - symbolic_variables: The values tried for each symbolic variable
+                the rules read (None means not set).
+              - variants: For each distinct (workflow_run, jobs_list): the run
+                set, a representative assignment of the symbolic variables
+                that produces it (variables it does not list are not read),
+                and, if verify is set, whether evaluating the pipeline with
+                it gives the same outcome.
+    """
+    fixed_variables = dict(variables or {})
+    solver = _VariantSolver(pipeline, fixed_variables)
+    all_functions = tuple(range(len(solver.functions)))
+
+    found: Dict[Tuple[bool, Tuple[str, ...]], Dict[str, Value]] = {}
+    for assignment, workflow_rule, workflow_run in solver.workflow_outcomes({}):
+        for running, extension in solver.solve(assignment, workflow_rule, all_functions):
+            jobs_list = tuple(sorted(job_name for index in running for job_name in solver.function_jobs[index]))
+            found.setdefault((workflow_run, jobs_list), {**assignment, **extension})
+    logger.debug(f"Decision diagram: {solver.diagram_size} nodes, {len(solver.functions)} distinct job decisions")
+
+    variants = []
+    for (workflow_run, jobs_list), assignment in sorted(found.items(),
+                                                        key=lambda item: (not item[0][0], -len(item[0][1]), item[0][1])):
+        variant: ConfigDict = {
+            "workflow_run": workflow_run,
+            "jobs_list": list(jobs_list),
+            "variables": dict(sorted(assignment.items())),
+        }
+        if verify:
+            defined = {name: value for name, value in assignment.items() if value is not None}
+            plan = pipeline.evaluate({**fixed_variables, **defined})
+            variant["verified"] = plan.workflow_run == workflow_run and sorted(plan.jobs_list) == list(jobs_list)
+            if not variant["verified"]:
+                logger.warning(f"Variant {variant['variables']} evaluates to a different run set")
+        variants.append(variant)
+
+    return {
+        "symbolic_variables": dict(sorted(solver.branched.items())),
+        "variants": variants,
+    }
@@ -0,0 +1,239 @@
+"""
+Re-simulation of a pipeline whenever its files change (simulate --watch).
+
+The files of the include tree and the simulation configuration are polled
+for changes in size or modification time. A burst of saves is debounced: the
+pipeline is reloaded once the files stayed unchanged for a short while.
+Reloading goes through the YAML parse cache, so only the modified files are
+parsed again, and only the jobs depending on them are expanded again: jobs
+defined in a modified file, and jobs whose extends ancestors or !reference
+targets (transitively) are.
+"""
+
+import os
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from cimulator.types import ConfigDict, JobDict, JobSourcesDict
+from cimulator.loader import load_and_resolve, extract_jobs
+from cimulator.job_expander import build_extends_graph, expand_all_jobs
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.config import load_simulation_config, get_profile_variables
+from cimulator.output_formats import write_simulation
+from cimulator.workspace import FileSignature, file_signature
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+def find_affected_jobs(jobs: JobDict, changed_files: Set[str],
+                       config: ConfigDict, job_sources: JobSourcesDict, references: Dict[str, Set[str]],
+                       previous_config: ConfigDict, previous_job_sources: JobSourcesDict) -> Set[str]:
+    """
+    Find the jobs whose expanded definition may differ after some files changed.
+
+    A top-level key is changed if it is defined (now or before) in a changed
+    file, or, for keys that are not jobs (e.g. 'variables'), if its value
+    differs. A job is affected if it is changed or if one of its extends
+    parents or !reference targets is affected.
+
+    Parameters:
+        jobs (dict): The job definitions after the change.
+        changed_files (set): Paths of the files that changed, appeared or disappeared.
+        config (dict): The resolved configuration after the change.
+        job_sources (dict): Source file of each job after the change.
+        references (dict): Top-level keys each key's !reference tags point to
+                           (see load_and_resolve()).
+        previous_config (dict): The resolved configuration before the change.
+        previous_job_sources (dict): Source file of each job before the change.
+
+    Returns:
+        set: Names of the affected jobs.
+    """
+    extends_graph = build_extends_graph(jobs)
+
+    def key_changed(key: str) -> bool:
+        if key not in job_sources and key not in previous_job_sources:
+            return config.get(key) != previous_config.get(key)
+        for sources in (job_sources, previous_job_sources):
+            if sources.get(key) in changed_files:
+                return True
+            if any(path in changed_files for path in sources.get(f"{key}__duplicates", [])):
+                return True
+        return key not in previous_job_sources
+
+    affected: Dict[str, bool] = {}
+
+    def is_affected(key: str) -> bool:
+        if key not in affected:
+            # Provisional value, in case of a cycle (reported when expanding).
+            affected[key] = False
+            affected[key] = key_changed(key) or any(
+                is_affected(dependency)
+                for dependency in extends_graph.get(key, []) + sorted(references.get(key, ()))
+            )
+        return affected[key]
+
+    return {job_name for job_name in jobs if is_affected(job_name)}
+
+class WatchedPipeline:
+    """
+    A loaded and expanded pipeline that can be reloaded after its files changed.
+
+    Attributes:
+        ci_file (str): Absolute path of the root CI file.
+        simulation_config_file (str): Absolute path of the simulation configuration.
+        profile (str): Name of the simulated profile.
+        config (dict): The resolved configuration.
+        job_sources (dict): Source file of each job.
+        jobs (dict): The job definitions.
+        expanded_jobs (dict): The jobs expanded in shared mode.
+        global_variables (dict): CI variables merged with the profile variables.
+        files (dict): Signature of every watched file at the last (re)load;
+                      included files that did not exist are watched with a None signature.
+    """
+
+    def __init__(self, ci_file: str, simulation_config_file: str, profile: str, include_workers: int = 1) -> None:
+        self.ci_file = os.path.abspath(ci_file)
+        self.simulation_config_file = os.path.abspath(simulation_config_file)
+        self.profile = profile
+        self.include_workers = include_workers
+        self.files: Dict[str, FileSignature] = {}
+        self.expanded_jobs: JobDict = {}
+        # Files changed since the last successful reload.
+        self._pending: Set[str] = set()
+        self.reload()
+
+    def reload(self, changed_files: Optional[List[str]] = None) -> List[str]:
+        """
+        Load the pipeline again after some of its files changed.
+
+        If loading fails, the previous state is kept and the changed files are
+        taken into account by the next reload.
+
+        Parameters:
+            changed_files (list): Paths of the changed files; None reloads and
+                                  expands everything.
+
+        Returns:
+            list: Names of the jobs expanded again.
+        """
+        # Signatures are taken before loading, so that saves made while loading are seen next time.
+        signatures = {path: file_signature(path) for path in self.files}
+        self._pending.update(changed_files or [])
+        try:
+            loaded_files: List[str] = []
+            missing_files: List[str] = []
+            references: Dict[str, Set[str]] = {}
+            config, job_sources = load_and_resolve(self.ci_file, loaded_files, workers=self.include_workers,
+                                                   references=references, missing_files=missing_files)
+            jobs = extract_jobs(config)
+            profile_variables = get_profile_variables(load_simulation_config(self.simulation_config_file),
+                                                      self.profile)
+
+            if changed_files is None:
+                expanded_jobs = expand_all_jobs(jobs, shared=True)
+                reexpanded = list(jobs)
+            else:
+                # Includes added or removed count as changed files.
+                watched = set(loaded_files) | set(missing_files) | {self.simulation_config_file}
+                changed = self._pending | (watched ^ set(self.files))
+                affected = find_affected_jobs(jobs, changed, config, job_sources, references,
+                                             self.config, self.job_sources)
+                previous = {name: job for name, job in self.expanded_jobs.items() if name not in affected}
+                expanded_jobs = expand_all_jobs(jobs, shared=True, previous=previous)
+                reexpanded = [name for name in jobs if name not in previous]
+        except Exception:
+            self.files.update(signatures)
+            raise
+
+        self.config, self.job_sources, self.jobs = config, job_sources, jobs
+        self.expanded_jobs = expanded_jobs
+        self.global_variables = {**config.get("variables", {}), **profile_variables}
+        self.files = {path: signatures[path] if path in signatures else file_signature(path)
+                      for path in missing_files + loaded_files + [self.simulation_config_file]}
+        self._pending.clear()
+        return reexpanded
+
+    def simulate(self, processes: int = 1, sections: Optional[List[str]] = None,
+                 job_results: Optional[Dict[str, ConfigDict]] = None) -> ConfigDict:
+        """Simulate the pipeline as currently loaded (see simulate_pipeline())."""
+        return simulate_pipeline(self.jobs, self.config.get("workflow", {}), self.global_variables,
+                                 expanded_jobs=self.expanded_jobs, processes=processes,
+                                 job_results=job_results, sections=sections)
+
+    def changed_files(self) -> List[str]:
+        """Return the watched files whose signature differs from the last (re)load."""
+        return [path for path, signature in self.files.items() if file_signature(path) != signature]
+
+def wait_for_changes(pipeline: WatchedPipeline, interval: float = 0.5, debounce: float = 0.2,
+                     stop: Optional[threading.Event] = None) -> List[str]:
+    """
+    Wait until watched files changed and then stayed unchanged for `debounce` seconds.
+
+    Parameters:
+        pipeline (WatchedPipeline): The watched pipeline.
+        interval (float): Seconds between polls of the files.
+        debounce (float): Seconds the files must stay unchanged after a change.
+        stop (threading.Event): Optional event ending the wait early.
+
+    Returns:
+        list: The changed files, or an empty list if stopped.
+    """
+    stop = stop or threading.Event()
+    while not stop.wait(interval):
+        if not pipeline.changed_files():
+            continue
+        current = {path: file_signature(path) for path in pipeline.files}
+        while not stop.wait(debounce):
+            latest = {path: file_signature(path) for path in pipeline.files}
+            if latest == current:
+                break
+            current = latest
+        else:
+            return []
+        changed = [path for path, signature in current.items() if signature != pipeline.files[path]]
+        # Changes that were undone within the debounce delay are ignored.
+        if changed:
+            return changed
+    return []
+
+def watch_pipeline(pipeline: WatchedPipeline, on_change: Callable[[List[str], List[str]], None],
+                   interval: float = 0.5, debounce: float = 0.2, stop: Optional[threading.Event] = None) -> None:
+    """
+    Reload a pipeline every time its files change, until stopped.
+
+    Parameters:
+        pipeline (WatchedPipeline): The watched pipeline.
+        on_change (callable): Called after each successful reload with the
+                              changed files and the names of the jobs expanded again.
+        interval (float): Seconds between polls of the files.
+        debounce (float): Seconds the files must stay unchanged after a change.
+        stop (threading.Event): Optional event ending the watch.
+    """
+    while True:
+        changed = wait_for_changes(pipeline, interval, debounce, stop)
+        if not changed:
+            return
+        logger.info(f"Changed: {', '.join(changed)}")
+        try:
+            reexpanded = pipeline.reload(changed)
+        except Exception as e:
+            logger.error(f"Could not reload the pipeline, waiting for the next change: {e}")
+            continue
+        on_change(changed, reexpanded)
+
+def write_simulation_atomically(summary: ConfigDict, output_path: str, output_format: str = "yaml",
+                                job_sources: Optional[JobSourcesDict] = None,
+                                job_results: Optional[Dict[str, ConfigDict]] = None) -> None:
+    """
+    Save a simulation summary (see write_simulation()) through a temporary file,
+    so that readers of output_path never see a partially written file.
+    """
+    temp_path = f"{output_path}.tmp"
+    try:
+        write_simulation(summary, temp_path, output_format, job_sources, job_results)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
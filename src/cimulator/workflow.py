@@ -1,135 +1,46 @@
-import re
-from typing import List, Tuple, Optional, Union
-from cimulator.types import ConfigDict, VariablesDict
+import logging
+from typing import Any, Dict, List, Mapping, Tuple, Optional, Union
+from cimulator.types import ConfigDict, VariablesDict, VariablesMapping
 from cimulator.variable_expander import expand_variables, expand_variables_in_string
+from cimulator.condition_parser import CompiledCondition, compile_condition, ConditionSyntaxError
+from cimulator.variable_resolver import resolve_variables
+from cimulator.variable_reads import RecordingMapping, read_values
 
-def regex_match(value: str, pattern: str) -> bool:
-    """
-    Check if the value matches the regex pattern.
-    """
-    try:
-        return re.search(pattern, str(value)) is not None
-    except Exception:
-        return False
-
-def regex_not_match(value: str, pattern: str) -> bool:
-    """
-    Check if the value does NOT match the regex pattern.
-    """
-    try:
-        return re.search(pattern, str(value)) is None
-    except Exception:
-        return True
-
-def preprocess_condition(condition: str) -> str:
-    """
-    Transform a condition string into a Python evaluable expression.
+# Get a logger for this module
+logger = logging.getLogger(__name__)
 
-    This performs several transformations:
-      - Replace logical operators '&&' and '||' with 'and' and 'or'.
-      - Convert regex match operators '=~' into function calls to regex_match.
-      - Replace variable references (e.g. $VAR) with plain variable names (VAR).
-
-    Example:
-      Input:  '$CI_PIPELINE_SOURCE == "merge_request_event" && $CI_MERGE_REQUEST_TITLE =~ /^(\\[Draft\\]|\\(Draft\\)|Draft:)/'
-      Output: 'CI_PIPELINE_SOURCE == "merge_request_event" and regex_match(CI_MERGE_REQUEST_TITLE, r"^(\\[Draft\\]|\\(Draft\\)|Draft:)")'
-    """
-    # Replace && and || with Python operators.
-    condition = condition.replace("&&", " and ").replace("||", " or ")
-
-    # Process regex operators: =~ (match) and !~ (not match)
-    def regex_sub(match):
-        left = match.group(1)  # e.g., $CI_MERGE_REQUEST_TITLE
-        operator = match.group(2)  # =~ or !~
-        pattern = match.group(3)  # e.g., /^(...)/ or "/^(...)/"
-
-        # Check if the pattern is quoted
-        if pattern.startswith('"') and pattern.endswith('"'):
-            # Remove the quotes and then the leading/trailing slashes
-            pattern_inner = pattern[1:-1].strip('/')
-        else:
-            # Just remove leading/trailing slashes
-            pattern_inner = pattern.strip('/')
-
-        # Remove the '$' from the variable name
-        left_var = left[1:]
-
-        # Use the appropriate function based on the operator
-        if operator == "=~":
-            return f"regex_match({left_var}, r'{pattern_inner}')"
-        else:  # operator == "!~"
-            return f"regex_not_match({left_var}, r'{pattern_inner}')"
-
-    # First, try to match patterns with quotes: $VAR =~ "/pattern/" or $VAR !~ "/pattern/"
-    condition = re.sub(r'(\$\w+)\s*(=~|!~)\s*"(\/.+?\/)"', regex_sub, condition)
-
-    # Then, try to match patterns without quotes: $VAR =~ /pattern/ or $VAR !~ /pattern/
-    condition = re.sub(r'(\$\w+)\s*(=~|!~)\s*(\/.+?\/)', regex_sub, condition)
-
-    # Replace any remaining variables of the form $VAR with VAR.
-    condition = re.sub(r'\$(\w+)', r'\1', condition)
-    return condition
-
-def evaluate_condition(condition: str, variables: VariablesDict) -> bool:
+def evaluate_condition(condition: str, variables: VariablesMapping,
+                       conditions: Optional[Mapping[str, CompiledCondition]] = None) -> bool:
     """
     Evaluate a condition string against a set of variables.
 
+    The condition is compiled once (see condition_parser.compile_condition)
+    and the cached predicate is evaluated directly against the variables
+    mapping, so no evaluation environment is rebuilt per call. Conditions
+    found in `conditions` (e.g. compiled by pipeline.compile_rule_conditions)
+    are used as they are.
+
     Returns True if the condition is satisfied, False otherwise.
     """
-    # Special case for regex conditions
-    if "=~" in condition or "!~" in condition:
-        # Process the condition directly using the original preprocess_condition function
-        processed = preprocess_condition(condition)
-        # Create an evaluation environment: supply all variable values
-        eval_env = {key: value for key, value in variables.items()}
-        # Add the regex helpers
-        eval_env["regex_match"] = regex_match
-        eval_env["regex_not_match"] = regex_not_match
-        try:
-            return bool(eval(processed, {"__builtins__": {}}, eval_env))
-        except Exception as e:
-            print(f"Error evaluating regex condition '{condition}': {e}")
-            return False
-
-    # For conditions with variable references like "$COVERAGE_TOOL == $TOOL"
-    # Use a regex-based approach to expand variables to avoid issues with variable names
-    # that are prefixes of other variable names
-
-    def replace_var(match):
-        var_name = match.group(1)
-        var_value = variables.get(var_name, "")  # Default to empty string for non-existing variables
-        if isinstance(var_value, str):
-            # For string values, we need to add quotes
-            return f'"{var_value}"'
-        else:
-            # For non-string values, we can just use the value directly
-            return str(var_value)
-
-    # Use regex to find and replace all variable references
-    expanded_condition = re.sub(r'\$(\w+)', replace_var, condition)
-
-    # Now process the expanded condition
-    processed = preprocess_condition(expanded_condition)
-
-    # Create an evaluation environment: supply all variable values
-    eval_env = {key: value for key, value in variables.items()}
-    # Add the regex helpers
-    eval_env["regex_match"] = regex_match
-    eval_env["regex_not_match"] = regex_not_match
-
+    compiled = conditions.get(condition) if conditions is not None else None
+    if compiled is not None:
+        return compiled.evaluate(variables)
     try:
-        return bool(eval(processed, {"__builtins__": {}}, eval_env))
-    except Exception as e:
-        print(f"Error evaluating condition '{condition}' (expanded to '{expanded_condition}'): {e}")
+        compiled = compile_condition(condition)
+    except ConditionSyntaxError as e:
+        logger.warning(f"Error evaluating condition '{condition}': {e}")
         return False
+    return compiled.evaluate(variables)
 
-def evaluate_rules(rules: List[ConfigDict], variables: VariablesDict) -> Tuple[bool, Optional[ConfigDict], VariablesDict, Optional[str]]:
+def evaluate_rules(rules: List[ConfigDict], variables: VariablesMapping,
+                   conditions: Optional[Mapping[str, CompiledCondition]] = None) -> Tuple[bool, Optional[ConfigDict], VariablesDict, Optional[str]]:
     """
     Evaluate a list of rules.
 
     For each rule:
       - If the rule has no 'if' clause, it always matches.
-      - Otherwise, the condition is evaluated with the given variables.
+      - Otherwise, the condition is evaluated with the given variables
+        (using its compiled form from `conditions` if given).
 
     The first rule that matches is used to determine:
       - Whether to run (if its 'when' value is not "never"),
@@ -142,17 +53,76 @@ def evaluate_rules(rules: List[ConfigDict], variables: VariablesDict) -> Tuple[b
     """
     for rule in rules:
         condition = rule.get("if")
-        if condition is None or evaluate_condition(condition, variables):
+        if condition is None or evaluate_condition(condition, variables, conditions):
             # Determine the 'when' behavior.
             when = rule.get("when", "always")
             should_run = (when != "never") # TODO what is this parenthesis syntax?
-            # Get the variables from the rule and expand them
+            # Get the variables from the rule and resolve them on top of the scope
             rule_variables = rule.get("variables", {})
-            applied_variables = expand_variables(rule_variables, variables)
+            applied_variables = resolve_variables(rule_variables, variables)
             return (should_run, rule, applied_variables, condition)
     return (False, None, {}, None)
 
-def evaluate_workflow(workflow_config: ConfigDict, variables: VariablesDict) -> Tuple[bool, Optional[ConfigDict], VariablesDict, Optional[str]]:
+# Result of evaluate_rules(): (should_run, triggered_rule, applied_variables, triggered_condition).
+RulesResult = Tuple[bool, Optional[ConfigDict], VariablesDict, Optional[str]]
+
+class RuleDecisionCache:
+    """
+    Results of evaluate_rules() keyed by the values of the variables the rules read.
+
+    Evaluating a rule list records the exact variables it reads, which depend
+    on the values seen (conditions short-circuit and the first matching rule
+    wins). The result is reused for any later scope in which those variables
+    have the same values, e.g. the same job in another simulation profile, or
+    another job extending the same rules. Rule lists are identified by
+    object, so they must not be modified while cached (jobs expanded in
+    shared mode are not), and results are shared, so they must not be
+    modified either. Lookups and insertions are single dict operations, so a
+    cache can be shared between threads (the counters are then approximate).
+
+    Attributes:
+        hits (int): Number of evaluations answered from the cache.
+        misses (int): Number of rule lists evaluated.
+    """
+
+    def __init__(self) -> None:
+        # Maps id(rules) to the rules and, for each tuple of variables read,
+        # the results by values of those variables.
+        self._entries: Dict[int, Tuple[List[ConfigDict], Dict[Tuple[str, ...], Dict[Any, RulesResult]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, rules: List[ConfigDict], variables: VariablesMapping,
+                 conditions: Optional[Mapping[str, CompiledCondition]] = None) -> RulesResult:
+        """Evaluate a list of rules as evaluate_rules() does, reusing an earlier result when possible."""
+        entry = self._entries.get(id(rules))
+        if entry is None or entry[0] is not rules:
+            entry = (rules, {})
+            self._entries[id(rules)] = entry
+        reads_by_names = entry[1]
+        try:
+            for names, results in list(reads_by_names.items()):
+                result = results.get(read_values(names, variables))
+                if result is not None:
+                    self.hits += 1
+                    return result
+        except TypeError:
+            # Unhashable variable values (e.g. nested definitions) are not cached.
+            self.misses += 1
+            return evaluate_rules(rules, variables, conditions)
+
+        self.misses += 1
+        recorder = RecordingMapping(variables)
+        result = evaluate_rules(rules, recorder, conditions)
+        if not recorder.read_all:
+            try:
+                reads_by_names.setdefault(tuple(recorder.reads), {})[tuple(recorder.reads.values())] = result
+            except TypeError:
+                pass
+        return result
+
+def evaluate_workflow(workflow_config: ConfigDict, variables: VariablesMapping,
+                      conditions: Optional[Mapping[str, CompiledCondition]] = None) -> Tuple[bool, Optional[ConfigDict], VariablesDict, Optional[str]]:
     """
     Evaluate a workflow configuration.
 
@@ -163,4 +133,4 @@ def evaluate_workflow(workflow_config: ConfigDict, variables: VariablesDict) ->
        (should_run, triggered_rule, applied_variables, triggered_condition)
     """
     rules = workflow_config.get("rules", [])
-    return evaluate_rules(rules, variables)
+    return evaluate_rules(rules, variables, conditions)
@@ -0,0 +1,172 @@
+"""
+CI configurations kept loaded in memory between runs.
+
+A long-running process (see cimulator.server) keeps each CI file it was asked
+about loaded, merged and expanded, together with the size and modification
+time of every file of its include tree. A configuration is reloaded only when
+one of those files changed, or when an included file that was missing appears. The reload goes through the YAML parse cache, so
+only the modified files are parsed again.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from cimulator.types import ConfigDict, JobDict, JobSourcesDict
+from cimulator.loader import load_and_resolve, extract_jobs
+from cimulator.job_expander import expand_all_jobs
+from cimulator.parse_cache import RACY_WINDOW_NS
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Size and modification time of a file, or None if it does not exist.
+FileSignature = Optional[Tuple[int, int]]
+
+def file_signature(path: str) -> FileSignature:
+    """Return the size and modification time of a file, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class WorkspaceEntry:
+    """
+    A loaded CI configuration and the signatures of the files it was built from.
+
+    Attributes:
+        ci_file (str): Absolute path of the root CI file.
+        config (dict): The resolved configuration.
+        job_sources (dict): Mapping of job names to their source files.
+        jobs (dict): The job definitions of the configuration.
+        files (dict): Signature of each loaded file when the entry was built,
+                      and None for each included file that did not exist.
+    """
+
+    def __init__(self, ci_file: str, workers: int = 1) -> None:
+        self.ci_file = ci_file
+        self.loaded_ns = time.time_ns()
+        loaded_files: List[str] = []
+        missing_files: List[str] = []
+        self.config, self.job_sources = load_and_resolve(ci_file, loaded_files, workers=workers,
+                                                         missing_files=missing_files)
+        self.jobs = extract_jobs(self.config)
+        self.files: Dict[str, FileSignature] = {path: None for path in missing_files}
+        self.files.update((path, file_signature(path)) for path in loaded_files)
+        self._expanded_jobs: Optional[JobDict] = None
+        self._lock = threading.Lock()
+
+    def expanded_jobs(self) -> JobDict:
+        """Return the jobs expanded with extends (shared mode), expanding them on first use."""
+        with self._lock:
+            if self._expanded_jobs is None:
+                self._expanded_jobs = expand_all_jobs(self.jobs, shared=True)
+            return self._expanded_jobs
+
+    def changed_files(self) -> List[str]:
+        """
+        Return the loaded files whose size or modification time changed since
+        loading, and the missing included files that now exist.
+
+        Files modified shortly before loading may have changed again within
+        the same timestamp, so they count as changed until they are older.
+        """
+        racy_after = self.loaded_ns - RACY_WINDOW_NS
+        changed = []
+        for path, signature in self.files.items():
+            current = file_signature(path)
+            if current != signature or (signature is not None and signature[1] >= racy_after):
+                changed.append(path)
+        return changed
+
+class Workspace:
+    """
+    Loaded CI configurations, reloaded when the files they were built from change.
+
+    Attributes:
+        loads (int): Number of times a configuration was (re)loaded.
+        reuses (int): Number of requests served by an already loaded configuration.
+    """
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self.reuses = 0
+        self._entries: Dict[str, WorkspaceEntry] = {}
+        self._lock = threading.Lock()
+
+    def load(self, ci_file: str, workers: int = 1) -> WorkspaceEntry:
+        """
+        Return the loaded configuration of a CI file, reloading it if any of its files changed.
+
+        Parameters:
+            ci_file (str): Path to the root CI file.
+            workers (int): Number of threads loading the include tree when (re)loading.
+
+        Returns:
+            WorkspaceEntry: The configuration. It is shared with other callers
+                            and must not be modified.
+        """
+        ci_file = os.path.abspath(ci_file)
+        with self._lock:
+            entry = self._entries.get(ci_file)
+            if entry is not None:
+                changed = entry.changed_files()
+                if not changed:
+                    self.reuses += 1
+                    return entry
+                logger.info(f"Reloading {ci_file}: changed {', '.join(changed)}")
+            entry = WorkspaceEntry(ci_file, workers)
+            self._entries[ci_file] = entry
+            self.loads += 1
+            return entry
+
+    def refresh(self) -> List[str]:
+        """
+        Reload every configuration whose files changed, so that the next request finds it ready.
+
+        Configurations that fail to reload are dropped; the next request reports the error.
+
+        Returns:
+            list: The root files of the reloaded configurations.
+        """
+        with self._lock:
+            stale = [ci_file for ci_file, entry in self._entries.items() if entry.changed_files()]
+            for ci_file in stale:
+                del self._entries[ci_file]
+        reloaded = []
+        for ci_file in stale:
+            try:
+                self.load(ci_file).expanded_jobs()
+                reloaded.append(ci_file)
+            except Exception as e:
+                logger.warning(f"Could not reload {ci_file}: {e}")
+        return reloaded
+
+    def stats(self) -> Dict[str, int]:
+        """Return the load/reuse counters and the number of loaded configurations."""
+        with self._lock:
+            return {"loads": self.loads, "reuses": self.reuses, "configurations": len(self._entries)}
+
+def load_configuration(ci_file: str, workers: int = 1, workspace: Optional[Workspace] = None,
+                       expand: bool = False) -> Tuple[ConfigDict, JobSourcesDict, Optional[JobDict]]:
+    """
+    Load a CI configuration, from a workspace if one is given.
+
+    Parameters:
+        ci_file (str): Path to the root CI file.
+        workers (int): Number of threads loading the include tree.
+        workspace (Workspace): Optional workspace keeping configurations loaded.
+        expand (bool): Whether the expanded jobs are needed.
+
+    Returns:
+        tuple: (config, job_sources, expanded_jobs); expanded_jobs is only
+               given when loading from a workspace with expand set, and None
+               otherwise.
+    """
+    if workspace is None:
+        config, job_sources = load_and_resolve(ci_file, workers=workers)
+        return config, job_sources, None
+    entry = workspace.load(ci_file, workers)
+    return entry.config, entry.job_sources, entry.expanded_jobs() if expand else None
@@ -0,0 +1,76 @@
+"""
+Streaming YAML writer for simulation summaries.
+
+A summary is written section by section, and its job sections job by job, so
+that only one job is ever held as YAML text at a time. Each job is emitted
+under its section key, exactly where a dump of the whole summary would place
+it, so the output is identical to yaml.dump(summary, default_flow_style=False)
+apart from the empty lines separating jobs.
+"""
+
+import logging
+from typing import Any, Collection, Optional, TextIO
+import yaml
+from cimulator.types import ConfigDict
+
+# Get a logger for this module
+logger = logging.getLogger(__name__)
+
+# Use the libyaml-based emitter when PyYAML was built with it.
+try:
+    from yaml import CDumper as _BaseDumper
+    YAML_EMITTER = "libyaml"
+except ImportError:
+    from yaml import Dumper as _BaseDumper  # type: ignore[assignment]
+    YAML_EMITTER = "python"
+
+# Summary sections mapping job names to job definitions.
+JOB_SECTIONS = ("jobs", "all_expanded_jobs")
+
+class SummaryDumper(_BaseDumper):  # type: ignore[misc, valid-type]
+    """Dumper that writes shared objects in full instead of as anchors and aliases."""
+
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+def dump_yaml(data: Any, stream: Optional[TextIO] = None) -> Optional[str]:
+    """
+    Dump data as block-style YAML with sorted keys.
+
+    Parameters:
+        data: The data to dump.
+        stream: File to write to. If None, the YAML is returned as a string.
+
+    Returns:
+        str: The YAML text if no stream was given, None otherwise.
+    """
+    return yaml.dump(data, stream, Dumper=SummaryDumper, default_flow_style=False)
+
+def write_summary(summary: ConfigDict, stream: TextIO,
+                  job_sections: Collection[str] = JOB_SECTIONS,
+                  spaced_sections: Collection[str] = ("jobs",)) -> None:
+    """
+    Stream a simulation summary to a file as YAML.
+
+    Parameters:
+        summary (dict): The summary returned by simulate_pipeline().
+        stream: Text file to write to.
+        job_sections (collection): Top-level keys whose values map job names
+                                   to jobs; they are written one job at a time.
+        spaced_sections (collection): Job sections with an empty line between jobs.
+    """
+    for key in sorted(summary):
+        value = summary[key]
+        if key not in job_sections or not isinstance(value, dict) or not value:
+            dump_yaml({key: value}, stream)
+            continue
+
+        stream.write(f"{key}:\n")
+        for index, job_name in enumerate(sorted(value)):
+            if index and key in spaced_sections:
+                stream.write("\n")
+            # Emit the job under its section key so it is indented (and
+            # wrapped) exactly as in a dump of the whole summary.
+            job_yaml = dump_yaml({key: {job_name: value[job_name]}})
+            assert job_yaml is not None
+            stream.write(job_yaml[job_yaml.index("\n") + 1:])
@@ -0,0 +1,30 @@
+import copy
+from benchmarks.synthetic import PHASES, compare_results, generate_pipeline, run_scenario
+from cimulator.loader import load_and_resolve, extract_jobs
+
+def test_generate_pipeline_shape(tmp_path):
+    ci_file, _ = generate_pipeline(str(tmp_path), jobs=12, includes=3, extends_depth=2, rules=2,
+                                   variable_depth=3, reference_density=1.0)
+    config, _ = load_and_resolve(ci_file)
+    jobs = extract_jobs(config)
+    assert len([name for name in jobs if name.startswith("job-")]) == 12
+    assert len(list((tmp_path / "ci").iterdir())) == 3
+    assert jobs["job-5"]["extends"] == ".tpl-1-1"
+    assert len(jobs["job-5"]["rules"]) == 2
+    # Every job uses !reference tags, resolved by the loader.
+    assert jobs["job-5"]["script"][:2] == config[".snippets"]["script"]
+    assert config["variables"]["NEST_2"] == "${NEST_1}/level-2"
+
+def test_run_scenario_and_compare(tmp_path):
+    result = run_scenario({"jobs": 10, "includes": 2, "extends_depth": 2, "rules": 2,
+                           "variable_depth": 2, "reference_density": 0.5}, repeat=1, directory=str(tmp_path))
+    assert set(result["phases"]) == set(PHASES)
+    assert result["size"]["running_jobs"] > 0
+
+    results = {"scenarios": {"tiny": result}}
+    assert not any(comparison["regression"] for comparison in compare_results(results, results))
+
+    slower = copy.deepcopy(results)
+    slower["scenarios"]["tiny"]["phases"]["simulate"]["seconds"] += 1.0
+    regressions = [comparison for comparison in compare_results(slower, results) if comparison["regression"]]
+    assert [(comparison["phase"], comparison["metric"]) for comparison in regressions] == [("simulate", "seconds")]
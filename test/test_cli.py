@@ -1,3 +1,4 @@
+import json
 import tempfile
 import os
 import yaml
@@ -96,3 +97,124 @@ MR-Push-Frozen:
         # Clean up the output file
         if os.path.exists(output_file):
             os.remove(output_file)
+
+def test_simulate_all_cli(monkeypatch, capsys, tmp_path):
+    ci_content = """
+workflow:
+  rules:
+    - when: always
+build:
+  script: "echo build"
+deploy:
+  script: "echo deploy"
+  rules:
+    - if: '$CI_COMMIT_BRANCH == "main"'
+"""
+    sim_content = """
+Main:
+  CI_COMMIT_BRANCH: "main"
+Feature:
+  CI_COMMIT_BRANCH: "feature/x"
+"""
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(ci_content)
+    sim_file = tmp_path / "simulation.yml"
+    sim_file.write_text(sim_content)
+    output_dir = tmp_path / "outputs"
+
+    monkeypatch.setattr("sys.argv", ["cli.py", "simulate-all", str(ci_file), str(sim_file),
+                                     "--output-dir", str(output_dir)])
+    main()
+    captured = capsys.readouterr().out
+    assert "Simulated 2 profiles" in captured
+
+    with open(output_dir / "Main.yml") as f:
+        main_summary = yaml.safe_load(f)
+    with open(output_dir / "Feature.yml") as f:
+        feature_summary = yaml.safe_load(f)
+    assert main_summary["jobs_list"] == ["build", "deploy"]
+    assert feature_summary["jobs_list"] == ["build"]
+
+    with open(output_dir / "matrix.yml") as f:
+        matrix = yaml.safe_load(f)
+    assert matrix["profiles"]["Main"] == {"workflow_run": True, "jobs_count": 2}
+    assert matrix["jobs"]["deploy"] == {"Main": True, "Feature": False}
+
+def test_plan_cli(monkeypatch, capsys, tmp_path):
+    ci_content = """
+build:
+  script: "echo $CI_COMMIT_BRANCH"
+deploy:
+  script: "echo deploy"
+  rules:
+    - if: '$CI_COMMIT_BRANCH == "main"'
+"""
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(ci_content)
+    sim_file = tmp_path / "simulation.yml"
+    sim_file.write_text('Feature:\n  CI_COMMIT_BRANCH: "feature/x"\n')
+    output_file = tmp_path / "plan.yml"
+
+    monkeypatch.setattr("sys.argv", ["cli.py", "plan", str(ci_file), str(sim_file), "Feature",
+                                     "--output", str(output_file), "--expand", "build"])
+    main()
+    assert "Plan computed: 1 jobs run" in capsys.readouterr().out
+
+    with open(output_file) as f:
+        plan = yaml.safe_load(f)
+    assert plan["jobs_list"] == ["build"]
+    assert plan["decisions"]["deploy"]["should_run"] is False
+    assert plan["jobs"] == {"build": {"script": "echo feature/x", "variables": {}}}
+
+def test_variants_cli(monkeypatch, capsys, tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text("""
+build:
+  script: "echo build"
+deploy:
+  script: "echo deploy"
+  rules:
+    - if: '$CI_COMMIT_BRANCH == "main" && $CI_PIPELINE_SOURCE == "push"'
+""")
+    output_file = tmp_path / "variants.json"
+
+    monkeypatch.setattr("sys.argv", ["cli.py", "variants", str(ci_file), "--set", "CI_PIPELINE_SOURCE=push",
+                                     "--output", str(output_file), "--format", "json"])
+    main()
+    assert "Found 2 pipeline variants over 1 input variables" in capsys.readouterr().out
+
+    with open(output_file) as f:
+        variants = json.load(f)
+    assert variants["variants"][0]["jobs_list"] == ["build", "deploy"]
+    assert variants["variants"][0]["variables"] == {"CI_COMMIT_BRANCH": "main"}
+    assert variants["variants"][1]["jobs_list"] == ["build"]
+
+def test_profile_phases_cli(monkeypatch, tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text('include:\n  - local: jobs.yml\nbuild:\n  script: "echo $CI_COMMIT_BRANCH"\n')
+    (tmp_path / "jobs.yml").write_text('test:\n  script: "echo test"\n')
+    sim_file = tmp_path / "simulation.yml"
+    sim_file.write_text('Main:\n  CI_COMMIT_BRANCH: "main"\n')
+    profile_file = tmp_path / "profile.json"
+
+    monkeypatch.setattr("sys.argv", ["cli.py", "--profile-phases", "--profile-format", "json",
+                                     "--profile-output", str(profile_file), "simulate", str(ci_file),
+                                     str(sim_file), "Main", "--output", str(tmp_path / "out.yml")])
+    main()
+
+    with open(profile_file) as f:
+        report = json.load(f)
+    assert {"load", "load/references", "simulate", "simulate/jobs", "write"} <= set(report["phases"])
+    assert len(report["top_items"]["file"]) == 2
+    assert {item["name"] for item in report["top_items"]["job"]} == {"build", "test"}
+
+def test_parse_cache_dir_only_applies_to_one_command(monkeypatch, tmp_path):
+    from cimulator.parse_cache import yaml_parse_cache
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text('build:\n  script: "echo build"\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(yaml_parse_cache, "directory", None)
+
+    main(["--parse-cache-dir", "parsed", "validate", str(ci_file), "--output", str(tmp_path / "out.yml")])
+    assert yaml_parse_cache.directory is None
+    assert len(list((tmp_path / "parsed").iterdir())) == 1
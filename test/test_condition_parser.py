@@ -0,0 +1,63 @@
+import pytest
+from cimulator.condition_parser import (
+    compile_condition, tokenize_condition, ConditionSyntaxError
+)
+from cimulator.workflow import evaluate_condition
+
+def test_tokenize_condition():
+    tokens = tokenize_condition('$A == "x" && ${B} =~ /^re\\/l/i || $C != null')
+    kinds = [kind for kind, _ in tokens]
+    assert kinds == ["VAR", "OP", "STRING", "AND", "VAR", "OP", "REGEX", "OR", "VAR", "OP", "NULL", "EOF"]
+    assert tokens[6] == ("REGEX", "/^re\\/l/i")
+
+def test_compiled_condition_is_cached():
+    condition = '$CI_PIPELINE_SOURCE == "push"'
+    assert compile_condition(condition) is compile_condition(condition)
+
+def test_compiled_condition_reports_variables():
+    compiled = compile_condition('($A == "1" || $B == "1") && $C =~ /x/')
+    assert compiled.variables == frozenset({"A", "B", "C"})
+
+def test_and_binds_tighter_than_or():
+    compiled = compile_condition('$A == "1" || $B == "1" && $C == "1"')
+    assert compiled.evaluate({"A": "1", "B": "0", "C": "0"}) is True
+    assert compiled.evaluate({"A": "0", "B": "1", "C": "0"}) is False
+
+def test_parentheses_override_precedence():
+    compiled = compile_condition('($A == "1" || $B == "1") && $C == "1"')
+    assert compiled.evaluate({"A": "1", "B": "0", "C": "0"}) is False
+    assert compiled.evaluate({"A": "1", "B": "0", "C": "1"}) is True
+
+def test_null_checks():
+    assert evaluate_condition('$UNSET == null', {}) is True
+    assert evaluate_condition('$SET == null', {"SET": ""}) is False
+    assert evaluate_condition('$SET != null', {"SET": "value"}) is True
+
+def test_bare_variable_is_true_when_defined_and_not_empty():
+    assert evaluate_condition('$CI_COMMIT_TAG', {"CI_COMMIT_TAG": "v1.0"}) is True
+    assert evaluate_condition('$CI_COMMIT_TAG', {"CI_COMMIT_TAG": ""}) is False
+    assert evaluate_condition('$CI_COMMIT_TAG', {}) is False
+
+def test_variable_to_variable_comparison():
+    assert evaluate_condition('$TOOL == $OTHER_TOOL', {"TOOL": "a", "OTHER_TOOL": "a"}) is True
+    assert evaluate_condition('$TOOL == $OTHER_TOOL', {"TOOL": "a", "OTHER_TOOL": "b"}) is False
+
+def test_non_string_values_compare_as_strings():
+    assert evaluate_condition('$RUN == "1"', {"RUN": 1}) is True
+
+def test_regex_case_insensitive_flag():
+    assert evaluate_condition('$TITLE =~ /^draft/i', {"TITLE": "Draft: wip"}) is True
+    assert evaluate_condition('$TITLE =~ /^draft/', {"TITLE": "Draft: wip"}) is False
+
+def test_regex_from_variable():
+    variables = {"BRANCH": "release/1.0", "PATTERN": "/^release\\//"}
+    assert evaluate_condition('$BRANCH =~ $PATTERN', variables) is True
+
+def test_invalid_condition_raises_syntax_error():
+    with pytest.raises(ConditionSyntaxError):
+        compile_condition('$A == "unterminated')
+    with pytest.raises(ConditionSyntaxError):
+        compile_condition('($A == "1"')
+
+def test_invalid_condition_evaluates_to_false():
+    assert evaluate_condition('$A === "1"', {"A": "1"}) is False
@@ -0,0 +1,16 @@
+from cimulator.graph import strongly_connected_components
+
+def test_dependencies_come_first():
+    graph = {"a": ["b"], "b": ["c"], "c": []}
+    assert strongly_connected_components(graph) == [["c"], ["b"], ["a"]]
+
+def test_cycles_are_grouped_in_key_order():
+    graph = {"x": ["z"], "y": ["x"], "z": ["y"], "w": ["x"]}
+    assert strongly_connected_components(graph) == [["x", "y", "z"], ["w"]]
+
+def test_deep_chain_does_not_recurse():
+    graph = {f"n{i}": [f"n{i + 1}"] for i in range(5000)}
+    graph["n5000"] = []
+    groups = strongly_connected_components(graph)
+    assert groups[0] == ["n5000"]
+    assert groups[-1] == ["n0"]
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from cimulator.incremental import JobResultCache, RecordingMapping, simulate_incremental
+from cimulator.simulation_engine import simulate_pipeline
+
+def test_recording_mapping_records_reads():
+    recorder = RecordingMapping({"A": "1", "B": "2"})
+    assert recorder.get("A") == "1"
+    assert "MISSING" not in recorder
+    assert recorder.reads == {"A": (True, "1"), "MISSING": (False, None)}
+    assert recorder.read_all is False
+
+def test_job_cache_reuses_jobs_with_unchanged_reads():
+    all_jobs = {
+        "build": {"script": "make $TARGET", "rules": [{"if": '$CI_PIPELINE_SOURCE == "push"'}]},
+        "deploy": {"script": "deploy", "rules": [{"if": '$CI_COMMIT_BRANCH == "main"'}]},
+    }
+    cache = JobResultCache()
+    first = simulate_pipeline(all_jobs, {}, {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "dev", "TARGET": "all"}, job_cache=cache)
+    assert cache.simulated == 2 and cache.reused == 0
+    assert first["jobs_list"] == ["build"]
+
+    # Only 'deploy' reads CI_COMMIT_BRANCH, so 'build' is reused.
+    cache.reused = cache.simulated = 0
+    second = simulate_pipeline(all_jobs, {}, {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main", "TARGET": "all"}, job_cache=cache)
+    assert cache.simulated == 1 and cache.reused == 1
+    assert second["jobs_list"] == ["build", "deploy"]
+
+    # A changed job definition is simulated again.
+    cache.reused = cache.simulated = 0
+    all_jobs["build"]["script"] = "make -j4 $TARGET"
+    third = simulate_pipeline(all_jobs, {}, {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main", "TARGET": "all"}, job_cache=cache)
+    assert cache.simulated == 1 and cache.reused == 1
+    assert third["jobs"]["build"]["script"] == "make -j4 all"
+
+def test_simulate_incremental_detects_changed_files():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ci_file = os.path.join(temp_dir, ".gitlab-ci.yml")
+        included_file = os.path.join(temp_dir, "jobs.yml")
+        sim_file = os.path.join(temp_dir, "sim.yml")
+        cache_dir = os.path.join(temp_dir, "cache")
+        with open(ci_file, "w") as f:
+            f.write("include: jobs.yml\nbuild:\n  script: echo build\n")
+        with open(included_file, "w") as f:
+            f.write("test:\n  script: echo $MESSAGE\n")
+        with open(sim_file, "w") as f:
+            f.write("default:\n  MESSAGE: hello\n")
+
+        summary, _ = simulate_incremental(ci_file, sim_file, "default", cache_dir)
+        assert summary["jobs"]["test"]["script"] == "echo hello"
+        assert len(os.listdir(cache_dir)) == 1
+
+        # Nothing changed: the previous summary is reused.
+        reused, _ = simulate_incremental(ci_file, sim_file, "default", cache_dir)
+        assert reused == summary
+
+        with open(included_file, "w") as f:
+            f.write("test:\n  script: echo changed $MESSAGE\n")
+        changed, _ = simulate_incremental(ci_file, sim_file, "default", cache_dir)
+        assert changed["jobs"]["test"]["script"] == "echo changed hello"
+        assert changed["jobs"]["build"] == summary["jobs"]["build"]
+
+def test_simulate_incremental_detects_appearing_includes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ci_file = os.path.join(temp_dir, ".gitlab-ci.yml")
+        included_file = os.path.join(temp_dir, "jobs.yml")
+        sim_file = os.path.join(temp_dir, "sim.yml")
+        cache_dir = os.path.join(temp_dir, "cache")
+        with open(ci_file, "w") as f:
+            f.write("include: jobs.yml\nbuild:\n  script: echo build\n")
+        with open(sim_file, "w") as f:
+            f.write("default:\n  MESSAGE: hello\n")
+
+        summary, _ = simulate_incremental(ci_file, sim_file, "default", cache_dir)
+        assert summary["jobs_list"] == ["build"]
+        # The state is stored as JSON, which reading never executes.
+        with open(os.path.join(cache_dir, os.listdir(cache_dir)[0])) as f:
+            assert '"version":4' in f.read()
+
+        # The missing include appears: it is loaded instead of reusing the previous summary.
+        with open(included_file, "w") as f:
+            f.write("test:\n  script: echo $MESSAGE\n")
+        changed, _ = simulate_incremental(ci_file, sim_file, "default", cache_dir)
+        assert changed["jobs_list"] == ["build", "test"]
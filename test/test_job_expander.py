@@ -1,5 +1,6 @@
 # tests/test_job_expander.py
 
+import logging
 import pytest
 from cimulator.job_expander import expand_job, expand_all_jobs
 
@@ -75,3 +76,88 @@ def test_circular_dependency_detection():
     with pytest.raises(Exception) as excinfo:
         expand_job('job1', jobs)
     assert "Circular dependency detected" in str(excinfo.value)
+
+def test_expand_job_shared_matches_deepcopy_mode():
+    jobs = {
+        'grandparent': {'variables': {'A': '1'}, 'script': ['echo GP'], 'cache': {'key': 'k', 'paths': ['.c/']}},
+        'parent': {'extends': 'grandparent', 'variables': {'B': '2'}},
+        'child': {'extends': ['parent'], 'script': 'echo Child', 'cache': {'key': 'child'}}
+    }
+    assert expand_all_jobs(jobs, shared=True) == expand_all_jobs(jobs)
+
+def test_expand_job_shared_reuses_ancestors():
+    jobs = {
+        '.base': {'script': ['echo Base'], 'artifacts': {'paths': ['out/']}},
+        'job1': {'extends': '.base', 'variables': {'A': '1'}},
+        'job2': {'extends': '.base', 'variables': {'A': '2'}}
+    }
+    expanded = expand_all_jobs(jobs, shared=True)
+    # Subtrees that the jobs don't override are shared, not copied.
+    assert expanded['job1']['script'] is jobs['.base']['script']
+    assert expanded['job1']['artifacts'] is expanded['job2']['artifacts']
+    # The input definitions are left untouched.
+    assert jobs['job1'] == {'extends': '.base', 'variables': {'A': '1'}}
+
+def test_expand_job_shared_circular_dependency_detection():
+    jobs = {
+        'job1': {'extends': 'job2'},
+        'job2': {'extends': 'job1'}
+    }
+    with pytest.raises(Exception) as excinfo:
+        expand_job('job1', jobs, shared=True)
+    assert "Circular dependency detected" in str(excinfo.value)
+
+def test_expand_all_jobs_reports_all_cycles():
+    jobs = {
+        'a': {'extends': 'b'},
+        'b': {'extends': 'a'},
+        'c': {'extends': 'c'},
+        'd': {'extends': 'a'},
+        'ok': {'script': 'echo ok'}
+    }
+    with pytest.raises(Exception) as excinfo:
+        expand_all_jobs(jobs)
+    message = str(excinfo.value)
+    assert "Circular dependency detected" in message
+    assert "a -> b -> a" in message
+    assert "c -> c" in message
+    assert "ok" not in message
+
+def test_expand_all_jobs_missing_parent():
+    jobs = {'child': {'extends': 'missing'}}
+    with pytest.raises(Exception) as excinfo:
+        expand_all_jobs(jobs)
+    assert "Parent job 'missing' not found for job 'child'" in str(excinfo.value)
+
+def test_expand_all_jobs_stats():
+    jobs = {
+        'child': {'extends': ['parent', 'mixin'], 'script': 'echo Child'},
+        'parent': {'extends': 'grandparent'},
+        'grandparent': {'variables': {'A': '1'}},
+        'mixin': {'extends': 'grandparent', 'tags': ['docker']}
+    }
+    stats = {}
+    expanded = expand_all_jobs(jobs, stats=stats)
+    assert list(expanded) == ['child', 'parent', 'grandparent', 'mixin']
+    assert stats['grandparent'] == {'depth': 0, 'parents': 0, 'ancestors': 0}
+    assert stats['parent'] == {'depth': 1, 'parents': 1, 'ancestors': 1}
+    assert stats['child'] == {'depth': 2, 'parents': 2, 'ancestors': 3}
+    assert expanded['child'] == {'variables': {'A': '1'}, 'tags': ['docker'], 'script': 'echo Child'}
+
+def test_expand_all_jobs_logs_stats_at_debug_level(caplog):
+    jobs = {'parent': {'script': 'echo'}, 'child': {'extends': 'parent'}}
+    with caplog.at_level(logging.DEBUG, logger="cimulator.job_expander"):
+        expand_all_jobs(jobs)
+    assert "Expanded 2 jobs: max extends depth 1" in caplog.text
+    assert "depth 1, 1 parents, 1 ancestors: child" in caplog.text
+
+def test_expand_all_jobs_returns_independent_copies():
+    jobs = {
+        'parent': {'script': ['echo Parent']},
+        'child1': {'extends': 'parent'},
+        'child2': {'extends': 'parent'}
+    }
+    expanded = expand_all_jobs(jobs)
+    expanded['child1']['script'].append('echo modified')
+    assert expanded['child2']['script'] == ['echo Parent']
+    assert jobs['parent']['script'] == ['echo Parent']
@@ -4,7 +4,7 @@ import yaml
 
 # Import the functions from your loader module.
 # Adjust the import based on your actual module structure.
-from cimulator.loader import load_yaml, merge_dicts, load_and_resolve
+from cimulator.loader import load_yaml, merge_dicts, merge_dicts_shared, load_and_resolve
 
 
 def test_merge_dicts_simple():
@@ -102,3 +102,53 @@ def test_include_as_dict():
         result, _ = load_and_resolve(main_file)
         expected = {"main_key": "main_value", "child_key": "child_value"}
         assert result == expected
+
+
+def test_merge_dicts_shared_does_not_modify_inputs():
+    base = {"a": 1, "b": {"x": 10}, "c": {"y": [1, 2]}}
+    incoming = {"b": {"z": 30}, "d": 4}
+    result = merge_dicts_shared(base, incoming)
+    assert result == {"a": 1, "b": {"x": 10, "z": 30}, "c": {"y": [1, 2]}, "d": 4}
+    assert base == {"a": 1, "b": {"x": 10}, "c": {"y": [1, 2]}}
+    # Untouched subtrees are shared with the base.
+    assert result["c"] is base["c"]
+
+def test_gitlab_ci_loader_uses_libyaml_when_available():
+    from cimulator.loader import GitLabCILoader, YAML_BACKEND
+    if getattr(yaml, "__with_libyaml__", False):
+        assert YAML_BACKEND == "libyaml"
+        assert issubclass(GitLabCILoader, yaml.CSafeLoader)
+    else:
+        assert YAML_BACKEND == "python"
+        assert issubclass(GitLabCILoader, yaml.SafeLoader)
+
+def test_parse_yaml_keeps_reference_tags():
+    from cimulator.loader import parse_yaml, ReferenceTag
+    document = parse_yaml("job:\n  before_script: !reference [.setup, script]\n  script:\n    - run: it\n")
+    reference = document["job"]["before_script"]
+    assert isinstance(reference, ReferenceTag)
+    assert reference.path_components == [".setup", "script"]
+    assert document["job"]["script"] == ["run: it"]
+
+def test_concurrent_include_loading_matches_serial(tmp_path):
+    (tmp_path / "common.yml").write_text(".template:\n  script: echo common\nshared:\n  script: echo from common\n")
+    (tmp_path / "a.yml").write_text("include: common.yml\njob_a:\n  extends: .template\n")
+    (tmp_path / "b.yml").write_text("include:\n  - local: common.yml\n  - missing.yml\nshared:\n  script: echo from b\n")
+    root = tmp_path / ".gitlab-ci.yml"
+    root.write_text("include:\n  - a.yml\n  - local: b.yml\nvariables:\n  GLOBAL: value\n")
+
+    serial_files = []
+    serial_config, serial_sources = load_and_resolve(str(root), serial_files)
+    parallel_files = []
+    file_timings = []
+    parallel_config, parallel_sources = load_and_resolve(str(root), parallel_files, workers=4,
+                                                         file_timings=file_timings)
+
+    assert yaml.dump(parallel_config) == yaml.dump(serial_config)
+    assert list(parallel_config) == list(serial_config)
+    assert parallel_sources == serial_sources
+    assert parallel_files == serial_files
+    assert [timing["path"] for timing in file_timings] == [
+        str(root), str(tmp_path / "a.yml"), str(tmp_path / "common.yml"), str(tmp_path / "b.yml")
+    ]
+    assert all(timing["seconds"] >= timing["parse_seconds"] >= 0 for timing in file_timings)
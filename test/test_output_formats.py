@@ -0,0 +1,77 @@
+import json
+import pytest
+import yaml
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.output_formats import (
+    iter_simulation_records, iter_validation_records, write_simulation, write_validation,
+    JSONL_SCHEMA_VERSION
+)
+
+ALL_JOBS = {
+    ".template": {"script": "echo $TARGET"},
+    "build": {"extends": ".template"},
+    "deploy": {"script": "deploy", "rules": [{"if": '$TARGET == "prod"'}]},
+}
+
+def _simulate():
+    job_results = {}
+    summary = simulate_pipeline(ALL_JOBS, {"rules": [{"when": "always"}]}, {"TARGET": "dev"},
+                                job_results=job_results)
+    return summary, job_results
+
+def test_simulation_records():
+    summary, job_results = _simulate()
+    records = list(iter_simulation_records(summary, {"build": "build.yml"}, job_results))
+
+    header = records[0]
+    assert header["record"] == "header"
+    assert header["schema_version"] == JSONL_SCHEMA_VERSION
+    assert header["jobs_list"] == ["build"]
+    assert "jobs" not in header and "all_expanded_jobs" not in header
+
+    assert [record["name"] for record in records[1:]] == ["build", "deploy"]
+    build, deploy = records[1:]
+    assert build["runs"] is True and build["source_file"] == "build.yml"
+    assert build["job"]["script"] == "echo dev"
+    assert deploy["runs"] is False
+    assert deploy["triggered_rule"] is None
+    assert deploy["job"]["script"] == "deploy"
+
+def test_write_simulation_json_and_jsonl(tmp_path):
+    summary, job_results = _simulate()
+
+    write_simulation(summary, str(tmp_path / "out.json"), "json")
+    with open(tmp_path / "out.json") as f:
+        assert json.load(f) == summary
+
+    write_simulation(summary, str(tmp_path / "out.jsonl"), "jsonl", job_results=job_results)
+    with open(tmp_path / "out.jsonl") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["record"] for line in lines] == ["header", "job", "job"]
+
+    write_simulation(summary, str(tmp_path / "out.yml"), "yaml")
+    with open(tmp_path / "out.yml") as f:
+        assert yaml.safe_load(f) == summary
+
+def test_write_validation_jsonl(tmp_path):
+    config = {"stages": ["build"], "variables": {"A": "1"}, "build": {"script": "make"}}
+    records = list(iter_validation_records(config, {"build": "ci.yml"}))
+    assert records[0] == {"record": "header", "kind": "validation", "schema_version": JSONL_SCHEMA_VERSION,
+                          "stages": ["build"], "variables": {"A": "1"}}
+    assert records[1] == {"record": "job", "name": "build", "source_file": "ci.yml", "job": {"script": "make"}}
+
+    write_validation(config, str(tmp_path / "out.json"), "json")
+    with open(tmp_path / "out.json") as f:
+        assert json.load(f) == config
+
+def test_write_msgpack(tmp_path):
+    summary, _ = _simulate()
+    try:
+        import msgpack
+    except ImportError:
+        with pytest.raises(RuntimeError, match="msgpack"):
+            write_simulation(summary, str(tmp_path / "out.msgpack"), "msgpack")
+        return
+    write_simulation(summary, str(tmp_path / "out.msgpack"), "msgpack")
+    with open(tmp_path / "out.msgpack", "rb") as f:
+        assert msgpack.unpack(f) == summary
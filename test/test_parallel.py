@@ -0,0 +1,53 @@
+from cimulator.parallel import split_into_chunks, map_in_processes
+from cimulator.simulation_engine import simulate_pipeline, simulate_profiles
+
+def _add_offset(offset, value):
+    return value + offset
+
+def _make_jobs(count):
+    jobs = {".base": {"script": ["echo $TARGET $JOB_ID"]}}
+    for index in range(count):
+        jobs[f"job_{index:02d}"] = {
+            "extends": ".base",
+            "variables": {"JOB_ID": str(index)},
+            "rules": [{"if": f'$TARGET =~ /^{"prod" if index % 2 else "dev"}/', "when": "always"}],
+        }
+    jobs["deploy"] = {"script": "deploy", "needs": ["job_01"], "rules": [{"if": '$TARGET == "prod"'}]}
+    return jobs
+
+def test_split_into_chunks_preserves_order():
+    items = list(range(10))
+    chunks = split_into_chunks(items, 2, chunks_per_process=2)
+    assert len(chunks) == 4
+    assert [item for chunk in chunks for item in chunk] == items
+    assert split_into_chunks([], 4) == []
+
+def test_map_in_processes_returns_results_in_task_order():
+    assert map_in_processes(_add_offset, 100, [3, 1, 2], 2) == [103, 101, 102]
+
+def test_parallel_simulation_matches_serial():
+    jobs = _make_jobs(20)
+    variables = {"TARGET": "production"}
+    serial = simulate_pipeline(jobs, {}, variables)
+    parallel = simulate_pipeline(jobs, {}, variables, processes=3)
+
+    assert parallel == serial
+    assert list(parallel["jobs"]) == list(serial["jobs"])
+    assert list(parallel["all_expanded_jobs"]) == list(serial["all_expanded_jobs"])
+
+def test_parallel_profiles_match_serial():
+    jobs = _make_jobs(6)
+    profiles = {"Prod": {"TARGET": "prod"}, "Dev": {"TARGET": "dev"}, "None": None}
+    serial = simulate_profiles(jobs, {}, {}, profiles)
+    parallel = simulate_profiles(jobs, {}, {}, profiles, processes=2)
+
+    assert list(parallel) == ["Prod", "Dev", "None"]
+    for profile in profiles:
+        assert parallel[profile] == serial[profile]
+
+def test_parallel_simulation_reports_job_timings():
+    from cimulator.profiling import PhaseProfiler
+    jobs = _make_jobs(6)
+    with PhaseProfiler(trace_allocations=False) as profiler:
+        simulate_pipeline(jobs, {}, {"TARGET": "prod"}, processes=2)
+    assert set(profiler.items["job"]) == set(jobs)
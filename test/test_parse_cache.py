@@ -0,0 +1,111 @@
+import os
+import json
+import pickle
+from cimulator.loader import parse_yaml, load_and_resolve, ReferenceTag
+from cimulator.parse_cache import ParseCache, yaml_parse_cache
+
+def _counting_parser(calls):
+    def parse(content):
+        calls.append(content)
+        return parse_yaml(content)
+    return parse
+
+def _make_old(path):
+    # Move the modification time out of the window where stat data is not trusted.
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+def test_file_is_parsed_once_and_copies_are_independent(tmp_path):
+    path = tmp_path / "template.yml"
+    path.write_text("job:\n  script:\n    - echo hello\n")
+    calls = []
+    cache = ParseCache()
+
+    first = cache.load(str(path), _counting_parser(calls))
+    first["job"]["script"].append("modified")
+    second = cache.load(str(path), _counting_parser(calls))
+
+    assert len(calls) == 1
+    assert second == {"job": {"script": ["echo hello"]}}
+    assert cache.stats()["memory_hits"] == 1
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = tmp_path / "template.yml"
+    path.write_text("job:\n  script: a\n")
+    calls = []
+    cache = ParseCache()
+    cache.load(str(path), _counting_parser(calls))
+
+    # Rewritten within the same timestamp granularity: the content hash is checked.
+    path.write_text("job:\n  script: b\n")
+    assert cache.load(str(path), _counting_parser(calls)) == {"job": {"script": "b"}}
+
+    path.write_text("job:\n  script: changed\n")
+    assert cache.load(str(path), _counting_parser(calls)) == {"job": {"script": "changed"}}
+    assert len(calls) == 3
+
+def test_disk_cache_is_reused_by_a_new_process(tmp_path):
+    path = tmp_path / "template.yml"
+    path.write_text("base:\n  script: [echo base]\njob:\n  script: !reference [base, script]\n")
+    _make_old(path)
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    ParseCache(cache_dir).load(str(path), _counting_parser(calls))
+
+    cache = ParseCache(cache_dir)
+    document = cache.load(str(path), _counting_parser(calls))
+    assert len(calls) == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert isinstance(document["job"]["script"], ReferenceTag)
+    assert document["job"]["script"].path_components == ["base", "script"]
+
+def test_disk_cache_entries_are_json(tmp_path):
+    path = tmp_path / "template.yml"
+    path.write_text("job:\n  script: a\n")
+    _make_old(path)
+    cache_dir = tmp_path / "cache"
+    calls = []
+    ParseCache(str(cache_dir)).load(str(path), _counting_parser(calls))
+
+    # Replacing an entry with something that is not JSON only costs a parse.
+    (entry_file,) = cache_dir.iterdir()
+    assert json.loads(entry_file.read_text())["document"] == {"job": {"script": "a"}}
+    entry_file.write_bytes(pickle.dumps({"job": {"script": "b"}}))
+    cache = ParseCache(str(cache_dir))
+    assert cache.load(str(path), _counting_parser(calls)) == {"job": {"script": "a"}}
+    assert len(calls) == 2
+
+def test_touched_file_is_revalidated_by_content_hash(tmp_path):
+    path = tmp_path / "template.yml"
+    path.write_text("job:\n  script: a\n")
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    ParseCache(cache_dir).load(str(path), _counting_parser(calls))
+
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    ParseCache(cache_dir).load(str(path), _counting_parser(calls))
+    assert len(calls) == 1
+
+def test_file_included_twice_is_parsed_once(tmp_path):
+    (tmp_path / "shared.yml").write_text(".template:\n  script: echo shared\n")
+    (tmp_path / "a.yml").write_text("include: shared.yml\na:\n  extends: .template\n")
+    (tmp_path / "b.yml").write_text("include: shared.yml\nb:\n  extends: .template\n")
+    root = tmp_path / ".gitlab-ci.yml"
+    root.write_text("include:\n  - a.yml\n  - b.yml\n")
+
+    parses_before = yaml_parse_cache.stats()["parses"]
+    config, _ = load_and_resolve(str(root))
+    assert yaml_parse_cache.stats()["parses"] - parses_before == 4
+    assert set(config) == {".template", "a", "b"}
+
+def test_concurrent_disk_writes_do_not_interleave(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    path = tmp_path / "template.yml"
+    path.write_text("job:\n  script: a\n")
+    cache = ParseCache(str(tmp_path / "cache"))
+    document = {"job": {"script": ["x" * 1000] * 50}}
+    entry = {"version": 0, "path": str(path), "size": 0, "mtime_ns": 0, "recorded_ns": 0, "digest": ""}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: cache._write_disk_entry(str(path), entry, document), range(32)))
+
+    (entry_file,) = (tmp_path / "cache").iterdir()
+    assert json.loads(entry_file.read_text())["document"] == document
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from cimulator.loader import load_and_resolve, extract_jobs
+from cimulator.pipeline import Pipeline
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.condition_parser import compile_condition
+
+CI_CONTENT = """
+variables:
+  DEPLOY_ENV: staging
+workflow:
+  rules:
+    - if: '$CI_PIPELINE_SOURCE == "push" || $CI_PIPELINE_SOURCE == "merge_request_event"'
+.rules:
+  rules:
+    - if: '$CI_COMMIT_BRANCH == "main"'
+      variables:
+        DEPLOY_ENV: production
+    - if: '$CI_PIPELINE_SOURCE == "merge_request_event"'
+build:
+  script: echo build
+test:
+  extends: .rules
+  script: echo test
+  needs: [build]
+deploy:
+  extends: .rules
+  variables:
+    TARGET: $DEPLOY_ENV
+  script: echo $TARGET
+  rules:
+    - if: '$CI_COMMIT_BRANCH == "main"'
+"""
+
+PROFILES = [
+    {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main"},
+    {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "feature"},
+    {"CI_PIPELINE_SOURCE": "merge_request_event", "CI_COMMIT_BRANCH": "feature"},
+    {"CI_PIPELINE_SOURCE": "schedule", "CI_COMMIT_BRANCH": "main"},
+]
+
+def test_evaluate_matches_simulation(tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(CI_CONTENT)
+    pipeline = Pipeline.from_file(str(ci_file))
+    assert pipeline.extends_graph["test"] == [".rules"]
+    assert len(pipeline.conditions) == 3
+
+    config, _ = load_and_resolve(str(ci_file))
+    for variables in PROFILES:
+        plan = pipeline.evaluate(variables)
+        summary = simulate_pipeline(extract_jobs(config), config["workflow"], {**config["variables"], **variables})
+        assert plan.jobs_list == summary["jobs_list"]
+        assert plan.workflow_run == summary["workflow_run"]
+        assert pipeline.simulate(variables) == summary
+
+    plan = pipeline.evaluate(PROFILES[0])
+    assert plan.jobs_list == ["build", "deploy", "test"]
+    assert plan.decisions["test"]["applied_variables"] == {"DEPLOY_ENV": "production"}
+    assert pipeline.evaluate(PROFILES[1]).jobs_list == ["build"]
+
+def test_evaluate_uses_the_compiled_conditions(tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(CI_CONTENT)
+    pipeline = Pipeline.from_file(str(ci_file))
+
+    # Evaluations do not depend on the process-wide condition cache.
+    compile_condition.cache_clear()
+    for variables in PROFILES:
+        pipeline.evaluate(variables)
+    assert compile_condition.cache_info().misses == 0
+
+def test_evaluate_from_several_threads(tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(CI_CONTENT)
+    pipeline = Pipeline.from_file(str(ci_file))
+    expected = [pipeline.evaluate(variables).jobs_list for variables in PROFILES]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda variables: pipeline.evaluate(variables).jobs_list, PROFILES * 50))
+    assert results == expected * 50
@@ -0,0 +1,49 @@
+from cimulator.plan import plan_pipeline, project_jobs
+from cimulator.simulation_engine import simulate_pipeline
+
+ALL_JOBS = {
+    ".base": {
+        "image": "python:$PYTHON_VERSION",
+        "variables": {"PYTHON_VERSION": "3.11"},
+        "script": ["echo $TARGET $RULE_VAR"],
+    },
+    "build": {"extends": ".base", "needs": ["$SETUP_JOB"], "rules": [{"if": "$TARGET", "variables": {"RULE_VAR": "set"}}]},
+    "deploy": {"extends": ".base", "script": "deploy", "rules": [{"if": '$TARGET == "prod"'}]},
+    "lint": {"script": "lint $PYTHON_VERSION"},
+}
+
+WORKFLOW = {"rules": [{"if": '$TARGET != "none"', "variables": {"FROM_WORKFLOW": "yes"}}]}
+
+def test_project_jobs_keeps_rule_relevant_fields():
+    projected = project_jobs(ALL_JOBS)
+    assert projected[".base"] == {"variables": {"PYTHON_VERSION": "3.11"}}
+    assert set(projected["build"]) == {"extends", "needs", "rules"}
+    assert projected["lint"] == {}
+
+def test_plan_matches_simulation():
+    variables = {"TARGET": "dev", "SETUP_JOB": "setup"}
+    simulation_results = {}
+    simulation = simulate_pipeline(ALL_JOBS, WORKFLOW, variables, job_results=simulation_results)
+    plan = plan_pipeline(ALL_JOBS, WORKFLOW, variables)
+
+    assert plan.workflow_run is True
+    assert plan.jobs_list == simulation["jobs_list"] == ["build", "lint"]
+    assert plan.dependency_errors == simulation["dependency_errors"]
+    assert plan.workflow_applied_variables == {"FROM_WORKFLOW": "yes"}
+    for job_name, decision in plan.decisions.items():
+        assert decision["should_run"] == simulation_results[job_name]["should_run"]
+        assert decision["triggered_condition"] == simulation_results[job_name]["triggered_condition"]
+    assert plan.decisions["build"]["applied_variables"] == {"RULE_VAR": "set"}
+
+def test_plan_expands_requested_jobs_only():
+    variables = {"TARGET": "dev", "SETUP_JOB": "setup"}
+    simulation = simulate_pipeline(ALL_JOBS, WORKFLOW, variables)
+    plan = plan_pipeline(ALL_JOBS, WORKFLOW, variables)
+
+    for job_name in simulation["jobs"]:
+        assert plan.expand_job(job_name) == simulation["jobs"][job_name]
+    assert plan.expand_job("deploy") is None
+
+    summary = plan.to_summary(expand=["build", "deploy"])
+    assert summary["jobs"] == {"build": simulation["jobs"]["build"]}
+    assert "jobs" not in plan.to_summary()
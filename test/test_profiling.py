@@ -0,0 +1,49 @@
+import json
+import tracemalloc
+from cimulator.profiling import (
+    PhaseProfiler, add_phase_hook, phase, profiling_enabled, record_item, remove_phase_hook
+)
+from cimulator.simulation_engine import simulate_pipeline
+
+def test_phase_is_a_no_op_without_hooks():
+    assert not profiling_enabled()
+    with phase("load"):
+        record_item("file", "a.yml", 1.0)
+
+def test_hooks_receive_nested_phases_and_items():
+    events = []
+    hook = lambda kind, name, data: events.append((kind, name))
+    add_phase_hook(hook)
+    try:
+        with phase("simulate"):
+            with phase("jobs"):
+                record_item("job", "build", 0.5)
+    finally:
+        remove_phase_hook(hook)
+    assert events == [("item", "job"), ("phase", "simulate/jobs"), ("phase", "simulate")]
+
+def test_phase_profiler_aggregates_simulation_phases():
+    all_jobs = {
+        ".base": {"script": ["echo $TARGET"]},
+        "build": {"extends": ".base", "rules": [{"if": "$TARGET"}]},
+        "test": {"extends": ".base", "variables": {"TARGET": "unit"}},
+    }
+    with PhaseProfiler() as profiler:
+        with phase("simulate"):
+            simulate_pipeline(all_jobs, {}, {"TARGET": "all"})
+    assert not profiling_enabled()
+    assert not tracemalloc.is_tracing()
+
+    phases = profiler.phases
+    assert phases["simulate/jobs/variables"]["calls"] == 3
+    assert phases["simulate/jobs/rules"]["calls"] == 1
+    assert phases["simulate"]["wall_seconds"] >= phases["simulate/jobs"]["wall_seconds"]
+    assert "allocated_mb" in phases["simulate/extends"]
+    assert {item["name"] for item in profiler.top_items("job")} == {".base", "build", "test"}
+
+    report = json.loads(json.dumps(profiler.to_dict(top=2)))
+    assert len(report["top_items"]["job"]) == 2
+    table = profiler.format_table()
+    assert table.splitlines()[1].startswith("simulate ")
+    assert "\n    rules " in table
+    assert "Slowest jobs:" in table
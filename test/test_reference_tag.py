@@ -2,7 +2,10 @@ import os
 import tempfile
 import yaml
 import pytest
-from cimulator.loader import load_yaml, load_and_resolve, resolve_references
+from cimulator.loader import (
+    load_yaml, load_and_resolve, resolve_references, ensure_script_items_are_strings, GitLabCILoader,
+    ReferenceResolver
+)
 
 def test_reference_tag_handling():
     """Test that the !reference tag is handled correctly."""
@@ -36,3 +39,56 @@ job1:
         assert config["job1"]["variables"]["BASE_VAR"] == "base_value"
     finally:
         os.remove(file_path)
+
+def test_nested_references_in_script_lists():
+    """References to values containing references are resolved and flattened."""
+    config = yaml.load("""
+.setup:
+  script:
+    - echo setup
+.prepare:
+  script:
+    - !reference [.setup, script]
+    - echo prepare
+job:
+  before_script: !reference [.prepare, script]
+  script:
+    - !reference [.prepare, script]
+    - echo job
+""", Loader=GitLabCILoader)
+    config = ensure_script_items_are_strings(config)
+    config = resolve_references(config, config)
+
+    assert config["job"]["before_script"] == ["echo setup", "echo prepare"]
+    assert config["job"]["script"] == ["echo setup", "echo prepare", "echo job"]
+
+def test_circular_references_raise():
+    config = yaml.load("""
+a:
+  script: !reference [b, script]
+b:
+  script:
+    - !reference [a, script]
+""", Loader=GitLabCILoader)
+    with pytest.raises(ValueError, match="Circular !reference: b.script -> a.script -> b.script"):
+        resolve_references(config, config)
+
+def test_long_script_list_with_many_references():
+    references = "\n".join("    - !reference [.step, script]" for _ in range(5000))
+    config = yaml.load(f".step:\n  script:\n    - one\n    - two\njob:\n  script:\n{references}\n",
+                       Loader=GitLabCILoader)
+    config = resolve_references(config, config)
+    assert config["job"]["script"] == ["one", "two"] * 5000
+
+def test_resolver_records_referenced_keys():
+    config = yaml.load(
+        ".a:\n  script: [one]\n"
+        ".b:\n  script: !reference [.a, script]\n"
+        "job:\n  script: !reference [.b, script]\n  after_script: !reference [.a, script]\n"
+        "other:\n  script: [two]\n",
+        Loader=GitLabCILoader
+    )
+    resolver = ReferenceResolver(config)
+    resolver.resolve(config)
+    # Each key records the references written in it, even when they were resolved through another key.
+    assert resolver.references == {".b": {".a"}, "job": {".a", ".b"}}
@@ -0,0 +1,70 @@
+import threading
+from cimulator.regex_cache import PatternCache, split_regex_literal, rule_regex_cache
+from cimulator.simulation_engine import simulate_pipeline
+from cimulator.condition_parser import compile_condition
+
+def test_split_regex_literal():
+    assert split_regex_literal("/^main$/") == ("^main$", "")
+    assert split_regex_literal("/^release\\/.*/i") == ("^release\\/.*", "i")
+    assert split_regex_literal("^plain$") == ("^plain$", "")
+
+def test_pattern_cache_counts_hits_and_misses():
+    cache = PatternCache(maxsize=10)
+    first = cache.get_literal("/^feature/")
+    second = cache.get_literal("/^feature/")
+    assert first is second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_pattern_cache_counts_per_thread():
+    cache = PatternCache(maxsize=10)
+    cache.get("^main$")
+    other = threading.Thread(target=lambda: [cache.get("^main$") for _ in range(3)])
+    other.start()
+    other.join()
+    assert cache.stats()["hits"] == 3
+    assert cache.thread_stats() == {"hits": 0, "misses": 1}
+
+def test_pattern_cache_is_bounded():
+    cache = PatternCache(maxsize=2)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # Evicts "b", the least recently used pattern.
+    assert cache.stats()["size"] == 2
+    cache.get("a")
+    assert cache.stats()["hits"] == 2
+    cache.get("b")
+    assert cache.stats()["misses"] == 4
+
+def test_pattern_cache_case_insensitive_flag():
+    cache = PatternCache()
+    assert cache.get_literal("/^DRAFT/i").search("draft: wip") is not None
+    assert cache.get_literal("/^DRAFT/").search("draft: wip") is None
+
+def test_pattern_cache_invalid_pattern():
+    cache = PatternCache()
+    assert cache.get_literal("/(unclosed/") is None
+
+def test_constant_patterns_are_compiled_with_the_condition():
+    rule_regex_cache.clear()
+    condition = compile_condition('$CI_COMMIT_BRANCH =~ /^release\\// && $CI_COMMIT_TAG !~ /(unclosed/')
+    assert condition.evaluate({"CI_COMMIT_BRANCH": "release/1.0"}) is True
+    assert condition.evaluate({"CI_COMMIT_BRANCH": "main"}) is False
+    assert rule_regex_cache.stats()["hits"] + rule_regex_cache.stats()["misses"] == 0
+
+def test_simulation_summary_reports_regex_cache_usage_on_request():
+    all_jobs = {
+        f"job{i}": {
+            "script": "echo test",
+            "rules": [{"if": '$CI_COMMIT_BRANCH =~ $RELEASE_PATTERN'}]
+        }
+        for i in range(5)
+    }
+    variables = {"CI_COMMIT_BRANCH": "release/1.0", "RELEASE_PATTERN": "/^release\\//"}
+    assert "regex_cache" not in simulate_pipeline(all_jobs, {}, variables)
+
+    simulation = simulate_pipeline(all_jobs, {}, variables, sections=["jobs_list", "regex_cache"])
+    # Only this run is counted, whatever earlier runs did.
+    assert simulation["regex_cache"] == {"hits": 5, "misses": 0}
+    assert len(simulation["jobs_list"]) == 5
@@ -0,0 +1,25 @@
+import datetime
+import pytest
+from cimulator import serialization
+
+def test_round_trip_preserves_yaml_values():
+    data = {
+        "jobs": {"build": {"script": ["make"], "retry": 2, "allow_failure": False, "timeout": None}},
+        "reads": {"A": (True, "1"), "B": (False, None)},
+        "int_keys": {1: "one", (2, 3): "pair"},
+        "tagged": {"__type__": "not a tag"},
+        "set": {"a", "b"},
+        "when": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2024, 1, 2),
+        "blob": b"\x00\xff",
+        "ratio": 0.1,
+    }
+    assert serialization.loads(serialization.dumps(data)) == data
+
+def test_unsupported_and_malformed_data_are_rejected():
+    with pytest.raises(TypeError):
+        serialization.dumps({"value": object()})
+    with pytest.raises(ValueError):
+        serialization.loads('{"__type__": "dict"}')
+    with pytest.raises(ValueError):
+        serialization.loads('{"__type__": "os.system"}')
@@ -0,0 +1,107 @@
+import os
+import threading
+import pytest
+from cimulator import cli
+from cimulator.client import ServerUnavailable, send_request
+from cimulator.server import CimulatorServer
+from cimulator.workspace import Workspace
+
+def _make_old(*paths):
+    # Move the modification times out of the window where stat data is not trusted.
+    for path in paths:
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+def test_workspace_reuses_configuration_until_a_file_changes(tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text("include:\n  - local: jobs.yml\nbuild:\n  script: echo build\n")
+    jobs_file = tmp_path / "jobs.yml"
+    jobs_file.write_text("test:\n  script: echo test\n")
+    _make_old(ci_file, jobs_file)
+    workspace = Workspace()
+
+    first = workspace.load(str(ci_file))
+    assert workspace.load(str(ci_file)) is first
+    assert set(first.expanded_jobs()) == {"build", "test"}
+
+    jobs_file.write_text("test:\n  script: echo test\nlint:\n  script: echo lint\n")
+    _make_old(jobs_file)
+    assert workspace.refresh() == [str(ci_file)]
+    second = workspace.load(str(ci_file))
+    assert second is not first
+    assert set(second.jobs) == {"build", "test", "lint"}
+    assert workspace.stats() == {"loads": 2, "reuses": 2, "configurations": 1}
+
+def test_workspace_reloads_when_a_missing_include_appears(tmp_path):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text("include:\n  - local: extra.yml\njob_a:\n  script: echo a\n")
+    _make_old(ci_file)
+    workspace = Workspace()
+    assert list(workspace.load(str(ci_file)).jobs) == ["job_a"]
+    assert workspace.refresh() == []
+
+    extra_file = tmp_path / "extra.yml"
+    extra_file.write_text("job_b:\n  script: echo b\n")
+    _make_old(extra_file)
+    assert workspace.refresh() == [str(ci_file)]
+    assert set(workspace.load(str(ci_file)).jobs) == {"job_a", "job_b"}
+
+@pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"), reason="requires Unix domain sockets")
+def test_server_runs_client_commands(tmp_path, monkeypatch):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text('build:\n  script: "echo $CI_COMMIT_BRANCH"\n')
+    sim_file = tmp_path / "simulation.yml"
+    sim_file.write_text('Main:\n  CI_COMMIT_BRANCH: "main"\n')
+    _make_old(ci_file)
+    socket_path = str(tmp_path / "server.sock")
+
+    workspace = Workspace()
+    monkeypatch.setattr(cli, "workspace", workspace)
+    server = CimulatorServer(socket_path, workspace, cli.main)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert send_request({"command": "ping"}, socket_path, timeout=10) == {"ok": True}
+        for _ in range(2):
+            response = send_request({"argv": ["simulate", ".gitlab-ci.yml", "simulation.yml", "Main"],
+                                     "cwd": str(tmp_path)}, socket_path, timeout=30)
+            assert response["exit_code"] == 0
+            assert "Simulation successful" in response["stdout"]
+        assert (tmp_path / "simulation_output.yml").exists()
+
+        response = send_request({"argv": ["validate", "missing.yml"], "cwd": str(tmp_path)}, socket_path, timeout=30)
+        assert response["exit_code"] == 1
+        assert "Error" in response["stderr"]
+
+        stats = send_request({"command": "stats"}, socket_path, timeout=10)
+        assert stats["requests"] == 3
+        assert stats["workspace"]["reuses"] == 1
+        assert send_request({"command": "shutdown"}, socket_path, timeout=10) == {"ok": True}
+        thread.join(10)
+        assert not thread.is_alive()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(socket_path)
+
+def test_client_only_falls_back_when_no_server_listens(tmp_path):
+    with pytest.raises(ServerUnavailable):
+        send_request({"command": "ping"}, str(tmp_path / "missing.sock"), timeout=5)
+
+def test_server_rejects_watch_and_runs_serially(tmp_path, monkeypatch, capsys):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text('build:\n  script: "echo build"\n')
+    sim_file = tmp_path / "simulation.yml"
+    sim_file.write_text('Main:\n  CI_COMMIT_BRANCH: "main"\n')
+    monkeypatch.setattr(cli, "workspace", Workspace())
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["simulate", str(ci_file), str(sim_file), "Main", "--watch"])
+    assert exit_info.value.code == 2
+    assert "--watch" in capsys.readouterr().err
+
+    calls = []
+    monkeypatch.setattr(cli, "simulate_pipeline",
+                        lambda *args, **kwargs: calls.append(kwargs["processes"]) or {"jobs_list": []})
+    cli.main(["simulate", str(ci_file), str(sim_file), "Main", "--jobs", "4", "--sections", "jobs_list"])
+    assert calls == [1]
@@ -1,5 +1,7 @@
 from cimulator.variable_expander import expand_variables
-from cimulator.simulation_engine import simulate_pipeline
+from collections import ChainMap
+from cimulator.simulation_engine import simulate_pipeline, simulate_profiles
+from cimulator.workflow import RuleDecisionCache, evaluate_rules
 
 def test_expand_variables_in_string():
     variables = {"VAR": "value", "NAME": "GitLab"}
@@ -22,6 +24,50 @@ def test_expand_variables_in_dict():
     result = expand_variables(obj, variables)
     assert result == expected
 
+def test_expand_variables_escaped_dollar():
+    from cimulator.variable_expander import expand_variables_in_string
+    variables = {"VAR": "value"}
+    assert expand_variables_in_string("echo $$VAR $${VAR} $$$VAR", variables) == "echo $VAR ${VAR} $value"
+    assert expand_variables_in_string("cost: 5$ or $$", variables) == "cost: 5$ or $"
+
+def test_expand_variables_returns_unchanged_objects():
+    script = [f"echo step {index}" for index in range(2000)]
+    job = {"script": script, "cache": {"paths": [".cache/"]}, "image": "python:$VERSION"}
+    expanded = expand_variables(job, {"VERSION": "3.11"})
+    assert expanded == {"script": script, "cache": {"paths": [".cache/"]}, "image": "python:3.11"}
+    # Subtrees without variables are not copied.
+    assert expanded["script"] is script
+    assert expanded["cache"] is job["cache"]
+    assert expand_variables(script, {}) is script
+
+def test_expand_variables_interns_equal_results():
+    interned = {}
+    template = {"script": ["echo $TARGET", "make"], "cache": {"key": "$TARGET", "paths": [".cache/"]}}
+    first = expand_variables(template, {"TARGET": "prod"}, interned)
+    second = expand_variables(template, {"TARGET": "prod"}, interned)
+    other = expand_variables(template, {"TARGET": "dev"}, interned)
+    assert first == second == {"script": ["echo prod", "make"], "cache": {"key": "prod", "paths": [".cache/"]}}
+    assert second is first
+    assert other["script"] == ["echo dev", "make"]
+    # Values of different types are never merged.
+    assert expand_variables(["$A", 1], {"A": "x"}, interned) is not expand_variables(["$A", True], {"A": "x"}, interned)
+
+def test_simulate_pipeline_shares_equal_expanded_jobs():
+    all_jobs = {
+        ".base": {"script": [f"echo $STAGE_NAME {step}" for step in range(50)], "variables": {"STAGE_NAME": "build"}},
+        "build-a": {"extends": ".base", "stage": "build"},
+        "build-b": {"extends": ".base", "stage": "build"},
+    }
+    jobs = simulate_pipeline(all_jobs, {}, {})["jobs"]
+    assert jobs["build-a"]["script"][0] == "echo build 0"
+    assert jobs["build-a"]["script"] is jobs["build-b"]["script"]
+
+def test_simulate_pipeline_keeps_escaped_job_variables():
+    all_jobs = {"job": {"variables": {"LITERAL": "$$HOME"}, "script": "echo $LITERAL $$HOME"}}
+    simulation = simulate_pipeline(all_jobs, {}, {"HOME": "/root"})
+    assert simulation["jobs"]["job"]["variables"] == {"LITERAL": "$HOME"}
+    assert simulation["jobs"]["job"]["script"] == "echo $HOME $HOME"
+
 def test_simulate_pipeline():
     # Define a simple set of jobs.
     all_jobs = {
@@ -176,3 +222,73 @@ def test_simulate_pipeline_with_extends_and_variable_precedence():
     #     {'if': '1 == "1" && "specific_tool" == "specific_tool"'} # Correct expansion
     # ]
     # assert jobs["Specific Job"]["rules"] == expected_rules
+
+def test_simulate_profiles_matches_single_profile_simulation():
+    all_jobs = {
+        ".base": {"script": "echo $TARGET"},
+        "deploy": {
+            "extends": ".base",
+            "rules": [{"if": '$TARGET == "prod"', "variables": {"ENV": "production"}}],
+        },
+    }
+    gitlab_variables = {"TARGET": "dev"}
+    profiles = {"Dev": {}, "Prod": {"TARGET": "prod"}}
+
+    summaries = simulate_profiles(all_jobs, {}, gitlab_variables, profiles)
+
+    assert list(summaries) == ["Dev", "Prod"]
+    for profile, profile_variables in profiles.items():
+        expected = simulate_pipeline(all_jobs, {}, {**gitlab_variables, **profile_variables})
+        assert summaries[profile]["jobs_list"] == expected["jobs_list"]
+        assert summaries[profile]["jobs"] == expected["jobs"]
+    assert summaries["Dev"]["jobs_list"] == []
+    assert summaries["Prod"]["jobs_list"] == ["deploy"]
+
+def test_rule_decision_cache_is_keyed_by_read_variables():
+    rules = [
+        {"if": '$CI_PIPELINE_SOURCE == "push" && $CI_COMMIT_BRANCH == "main"', "variables": {"ENV": "$TARGET"}},
+        {"if": '$CI_PIPELINE_SOURCE == "schedule"', "when": "never"},
+    ]
+    cache = RuleDecisionCache()
+    profiles = [
+        {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main", "TARGET": "prod"},
+        {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main", "TARGET": "prod", "UNRELATED": "x"},
+        {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main", "TARGET": "dev"},
+        {"CI_PIPELINE_SOURCE": "schedule", "CI_COMMIT_BRANCH": "main"},
+        # The branch is not read when the pipeline source does not match.
+        {"CI_PIPELINE_SOURCE": "schedule", "CI_COMMIT_BRANCH": "dev"},
+        {"CI_PIPELINE_SOURCE": "web"},
+    ]
+    for variables in profiles:
+        scope = ChainMap({}, variables)
+        assert cache.evaluate(rules, scope) == evaluate_rules(rules, scope)
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert cache.evaluate(rules, {"CI_PIPELINE_SOURCE": "push", "CI_COMMIT_BRANCH": "main",
+                                  "TARGET": "dev"})[2] == {"ENV": "dev"}
+    assert cache.hits == 3
+
+def test_simulate_pipeline_sections():
+    all_jobs = {
+        ".base": {"script": "echo $TARGET"},
+        "build": {"extends": ".base", "needs": ["$SETUP_JOB"]},
+        "deploy": {"script": "deploy", "rules": [{"if": '$TARGET == "prod"'}]},
+    }
+    variables = {"TARGET": "dev", "SETUP_JOB": "setup"}
+    full = simulate_pipeline(all_jobs, {}, variables)
+
+    job_results = {}
+    sections = ["jobs_list", "dependency_errors"]
+    partial = simulate_pipeline(all_jobs, {}, variables, job_results=job_results, sections=sections)
+
+    assert list(partial) == sections
+    assert partial == {section: full[section] for section in sections}
+    assert partial["dependency_errors"][0]["message"] == \
+        "Job 'build' needs job 'setup' which will not run in this pipeline"
+    # Job bodies are only expanded as far as dependency checks need.
+    assert job_results["build"]["expanded_job"] == {"needs": ["setup"]}
+    assert job_results["build"]["all_expanded_job"] is None
+
+def test_simulate_pipeline_unknown_section():
+    import pytest
+    with pytest.raises(ValueError, match="Unknown summary sections: nope"):
+        simulate_pipeline({}, {}, {}, sections=["jobs_list", "nope"])
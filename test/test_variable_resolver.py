@@ -0,0 +1,53 @@
+import logging
+from cimulator.variable_resolver import find_variable_references, order_variables, resolve_variables
+from cimulator.simulation_engine import simulate_pipeline
+
+def test_find_variable_references():
+    value = {"value": "$A/${B}", "options": ["$C", "plain"]}
+    assert find_variable_references(value) == {"A", "B", "C"}
+    assert find_variable_references("no references") == set()
+
+def test_order_variables_dependencies_first():
+    layer = {"A": "$B", "B": "$C", "C": "value"}
+    assert order_variables(layer) == [["C"], ["B"], ["A"]]
+
+def test_order_variables_is_cached_by_content():
+    assert order_variables({"A": "$B", "B": "x"}) is order_variables({"A": "$B", "B": "x"})
+    # Definitions with options are not hashable; they are ordered without the cache.
+    layer = {"A": {"value": "$B", "description": "a"}, "B": "x"}
+    assert order_variables(layer) == [["B"], ["A"]]
+
+def test_resolve_variables_arbitrary_depth():
+    layer = {"V1": "$V2-1", "V2": "$V3-2", "V3": "$V4-3", "V4": "$V5-4", "V5": "base"}
+    resolved = resolve_variables(layer, {})
+    assert resolved["V1"] == "base-4-3-2-1"
+    assert list(resolved) == ["V1", "V2", "V3", "V4", "V5"]
+
+def test_resolve_variables_uses_base_layer():
+    resolved = resolve_variables({"URL": "http://$HOST:$PORT"}, {"HOST": "localhost", "PORT": "80"})
+    assert resolved == {"URL": "http://localhost:80"}
+
+def test_self_reference_uses_lower_layer():
+    resolved = resolve_variables({"PATH": "$PATH:/opt/bin"}, {"PATH": "/usr/bin"})
+    assert resolved == {"PATH": "/usr/bin:/opt/bin"}
+
+def test_cycle_is_reported(caplog):
+    layer = {"A": "$B", "B": "$A", "C": "$A-c"}
+    with caplog.at_level(logging.WARNING):
+        resolved = resolve_variables(layer, {})
+    assert "Circular variable reference between: A, B" in caplog.text
+    assert set(resolved) == {"A", "B", "C"}
+    assert resolved["C"] == resolved["A"] + "-c"
+
+def test_simulation_resolves_global_and_job_layers():
+    all_jobs = {
+        "job": {
+            "script": "echo $DEPLOY_URL",
+            "variables": {"DEPLOY_URL": "$BASE_URL/$ENV_NAME", "ENV_NAME": "$STAGE-env"}
+        }
+    }
+    global_variables = {"BASE_URL": "https://$DOMAIN", "DOMAIN": "example.com", "STAGE": "prod"}
+    simulation = simulate_pipeline(all_jobs, {}, global_variables)
+    job = simulation["jobs"]["job"]
+    assert job["script"] == "echo https://example.com/prod-env"
+    assert simulation["all_expanded_jobs"]["job"]["script"] == "echo https://example.com/prod-env"
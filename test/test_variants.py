@@ -0,0 +1,90 @@
+import itertools
+import yaml
+from cimulator.pipeline import Pipeline
+from cimulator.variants import enumerate_variants, regex_example
+
+CI_CONTENT = """
+variables:
+  DEPLOY_ENV: staging
+  BRANCH: $CI_COMMIT_BRANCH
+workflow:
+  rules:
+    - if: '$CI_PIPELINE_SOURCE == "push" || $CI_PIPELINE_SOURCE == "merge_request_event"'
+build:
+  script: echo build
+test:
+  script: echo test
+  rules:
+    - if: '$CI_PIPELINE_SOURCE == "merge_request_event" && $CI_MERGE_REQUEST_TITLE =~ /^Draft:/'
+      when: never
+    - if: '$CI_PIPELINE_SOURCE == "merge_request_event"'
+    - if: '$BRANCH == "main"'
+release:
+  script: echo release
+  rules:
+    - if: '$CI_COMMIT_TAG =~ /^v\\d+\\.\\d+$/'
+deploy:
+  script: echo deploy
+  rules:
+    - if: '$BRANCH == "main" && $DEPLOY_ENV == "production"'
+"""
+
+def _pipeline(tmp_path, content=CI_CONTENT):
+    ci_file = tmp_path / ".gitlab-ci.yml"
+    ci_file.write_text(content)
+    return Pipeline.from_file(str(ci_file))
+
+def test_regex_example():
+    assert regex_example("/^release\\/\\d+/") == "release/0"
+    assert regex_example("/^(feature|fix)-[a-z]+$/i") == "feature-a"
+    assert regex_example("/[^abc]x/") == "0x"
+    assert regex_example("/^(?:rc|beta){2}(?=-)-\\w+$/") == "rcrc-a"
+    assert regex_example("/^(?P<major>\\d+)\\.x/") == "0.x"
+    # Back references are not supported, and invalid patterns match nothing.
+    assert regex_example("/(a)\\1/") is None
+    assert regex_example("/(/") is None
+
+def test_variants_cover_every_value_combination(tmp_path):
+    pipeline = _pipeline(tmp_path)
+    result = enumerate_variants(pipeline)
+    variants = result["variants"]
+
+    assert all(variant["verified"] for variant in variants)
+    outcomes = {(variant["workflow_run"], tuple(variant["jobs_list"])) for variant in variants}
+    assert len(outcomes) == len(variants)
+    # DEPLOY_ENV is defined by the CI file, so deploy never runs.
+    assert set(result["symbolic_variables"]) == {
+        "CI_PIPELINE_SOURCE", "CI_MERGE_REQUEST_TITLE", "CI_COMMIT_BRANCH", "CI_COMMIT_TAG"
+    }
+    # The branch is only compared through its alias BRANCH.
+    assert "main" in result["symbolic_variables"]["CI_COMMIT_BRANCH"]
+    assert "v0.0" in result["symbolic_variables"]["CI_COMMIT_TAG"]
+    assert (True, ("build", "release", "test")) in outcomes
+    assert (True, ("build",)) in outcomes
+
+    # Brute force over the same values finds no other outcome.
+    names = sorted(result["symbolic_variables"])
+    seen = set()
+    for values in itertools.product(*(result["symbolic_variables"][name] for name in names)):
+        plan = pipeline.evaluate({name: value for name, value in zip(names, values) if value is not None})
+        seen.add((plan.workflow_run, tuple(sorted(plan.jobs_list))))
+    assert seen == outcomes
+
+def test_fixed_variables_are_not_symbolic(tmp_path):
+    pipeline = _pipeline(tmp_path)
+    result = enumerate_variants(pipeline, {"CI_PIPELINE_SOURCE": "push", "DEPLOY_ENV": "production"})
+
+    assert "CI_PIPELINE_SOURCE" not in result["symbolic_variables"]
+    assert "CI_MERGE_REQUEST_TITLE" not in result["symbolic_variables"]
+    assert all(variant["workflow_run"] for variant in result["variants"])
+    deploy = [variant for variant in result["variants"] if "deploy" in variant["jobs_list"]]
+    assert deploy and deploy[0]["variables"]["CI_COMMIT_BRANCH"] == "main"
+
+def test_identical_jobs_are_decided_once(tmp_path):
+    jobs = {f"job-{index}": {"script": "echo", "rules": [{"if": f'$CI_COMMIT_BRANCH == "b{index % 3}"'}]}
+            for index in range(300)}
+    pipeline = _pipeline(tmp_path, yaml.dump(jobs))
+    variants = enumerate_variants(pipeline, verify=False)["variants"]
+
+    # One variant per branch compared with, and one where no job runs.
+    assert sorted(len(variant["jobs_list"]) for variant in variants) == [0, 100, 100, 100]
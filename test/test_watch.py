@@ -0,0 +1,92 @@
+import os
+import threading
+import pytest
+from cimulator.job_expander import expand_all_jobs
+from cimulator.watch import WatchedPipeline, wait_for_changes, write_simulation_atomically
+
+def _write_pipeline(directory):
+    (directory / ".gitlab-ci.yml").write_text(
+        "include:\n  - local: templates.yml\n  - local: jobs.yml\n"
+        "variables:\n  TARGET: linux\n"
+    )
+    (directory / "templates.yml").write_text(
+        ".base:\n  image: alpine\n  script: [echo base]\n"
+        ".setup:\n  before_script: [echo setup]\n"
+    )
+    (directory / "jobs.yml").write_text(
+        "build:\n  extends: .base\n"
+        "test:\n  script: [echo test]\n  before_script: !reference [.setup, before_script]\n"
+        "lint:\n  script: [echo lint]\n"
+    )
+    (directory / "simulation.yml").write_text('Main:\n  CI_COMMIT_BRANCH: "main"\n')
+    return str(directory / ".gitlab-ci.yml"), str(directory / "simulation.yml")
+
+def test_reload_expands_only_jobs_depending_on_changed_files(tmp_path):
+    ci_file, sim_file = _write_pipeline(tmp_path)
+    pipeline = WatchedPipeline(ci_file, sim_file, "Main")
+    lint = pipeline.expanded_jobs["lint"]
+
+    templates = str(tmp_path / "templates.yml")
+    with open(templates, "w") as f:
+        f.write(".base:\n  image: debian\n  script: [echo base]\n.setup:\n  before_script: [echo setup2]\n")
+    reexpanded = pipeline.reload([templates])
+
+    assert set(reexpanded) == {".base", ".setup", "build", "test"}
+    assert pipeline.expanded_jobs["lint"] is lint
+    assert pipeline.expanded_jobs == expand_all_jobs(pipeline.jobs, shared=True)
+    assert pipeline.expanded_jobs["test"]["before_script"] == ["echo setup2"]
+
+    # Only the profile changed: nothing is expanded again.
+    (tmp_path / "simulation.yml").write_text('Main:\n  CI_COMMIT_BRANCH: "feature"\n')
+    assert pipeline.reload([sim_file]) == []
+    assert pipeline.global_variables["CI_COMMIT_BRANCH"] == "feature"
+
+def test_missing_include_is_watched_until_it_appears(tmp_path):
+    ci_file, sim_file = _write_pipeline(tmp_path)
+    with open(ci_file, "a") as f:
+        f.write("include:\n  - local: templates.yml\n  - local: jobs.yml\n  - local: extra.yml\n")
+    pipeline = WatchedPipeline(ci_file, sim_file, "Main")
+    assert "deploy" not in pipeline.jobs
+    assert pipeline.changed_files() == []
+
+    extra = str(tmp_path / "extra.yml")
+    with open(extra, "w") as f:
+        f.write("deploy:\n  script: [echo deploy]\n")
+    assert pipeline.changed_files() == [extra]
+    assert pipeline.reload([extra]) == ["deploy"]
+    assert pipeline.changed_files() == []
+
+def test_failed_reload_keeps_previous_state(tmp_path):
+    ci_file, sim_file = _write_pipeline(tmp_path)
+    pipeline = WatchedPipeline(ci_file, sim_file, "Main")
+    jobs_file = str(tmp_path / "jobs.yml")
+
+    (tmp_path / "jobs.yml").write_text("build:\n  extends: .missing\n")
+    with pytest.raises(Exception):
+        pipeline.reload([jobs_file])
+    assert set(pipeline.jobs) == {".base", ".setup", "build", "test", "lint"}
+    assert pipeline.changed_files() == []
+
+    # The next reload still accounts for the file changed by the failed one.
+    (tmp_path / "templates.yml").write_text(".base:\n  script: [echo base]\n.setup:\n  script: [echo]\n")
+    (tmp_path / "jobs.yml").write_text("build:\n  extends: .base\n")
+    pipeline.reload([str(tmp_path / "templates.yml")])
+    assert pipeline.expanded_jobs == expand_all_jobs(pipeline.jobs, shared=True)
+
+def test_wait_for_changes_debounces_and_stops(tmp_path):
+    ci_file, sim_file = _write_pipeline(tmp_path)
+    pipeline = WatchedPipeline(ci_file, sim_file, "Main")
+    jobs_file = tmp_path / "jobs.yml"
+    with open(jobs_file, "a") as f:
+        f.write("# edited\n")
+    assert wait_for_changes(pipeline, interval=0.01, debounce=0.05) == [str(jobs_file)]
+
+    stop = threading.Event()
+    stop.set()
+    assert wait_for_changes(pipeline, interval=0.01, debounce=0.05, stop=stop) == []
+
+def test_write_simulation_atomically(tmp_path):
+    output = tmp_path / "out.json"
+    write_simulation_atomically({"jobs_list": ["build"]}, str(output), "json")
+    assert '"build"' in output.read_text()
+    assert os.listdir(tmp_path) == ["out.json"]
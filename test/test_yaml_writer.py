@@ -0,0 +1,46 @@
+import io
+import yaml
+from cimulator.yaml_writer import write_summary
+
+def _summary():
+    long_command = "echo " + " ".join(f"word{index}" for index in range(40))
+    return {
+        "workflow_run": True,
+        "jobs_list": ["build", "test"],
+        "jobs": {
+            "test": {"script": [long_command, "key: value"], "needs": ["build"]},
+            "build": {"script": ["make"], "variables": {"EMPTY": "", "NUMBER": "1"}},
+        },
+        "all_expanded_jobs": {
+            ".template": {"script": ["make"]},
+            "build": {"script": ["make"]},
+        },
+        "dependency_errors": [],
+        "workflow_triggered_rule": None,
+    }
+
+def test_write_summary_matches_full_dump_with_blank_lines_between_jobs():
+    summary = _summary()
+    stream = io.StringIO()
+    write_summary(summary, stream)
+    output = stream.getvalue()
+
+    expected = yaml.dump(summary, default_flow_style=False)
+    assert output.replace("\n\n", "\n") == expected
+    assert "\n\n  test:\n" in output
+    assert "\n\n  build:\n" not in output
+    assert yaml.safe_load(output) == summary
+
+def test_write_summary_does_not_emit_aliases_for_shared_objects():
+    script = ["make"]
+    summary = {"jobs": {"a": {"script": script}, "b": {"script": script}}, "extra": [script, script]}
+    stream = io.StringIO()
+    write_summary(summary, stream)
+
+    assert "&id" not in stream.getvalue()
+    assert yaml.safe_load(stream.getvalue()) == summary
+
+def test_write_summary_empty_job_section():
+    stream = io.StringIO()
+    write_summary({"jobs": {}, "jobs_list": []}, stream)
+    assert stream.getvalue() == "jobs: {}\njobs_list: []\n"